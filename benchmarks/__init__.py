@@ -0,0 +1,8 @@
+"""
+Performance tooling for Composition Assistant.
+
+- fixtures:    synthetic audio, MIDI and note fixtures
+- fake_ollama: local stand-in for the Ollama HTTP API
+- stats:       latency/throughput summaries
+- run:         stage-level benchmark suite (python -m benchmarks.run)
+"""
@@ -0,0 +1,267 @@
+"""
+Local stand-in for the Ollama HTTP API.
+
+Implements the endpoints the app uses (/api/chat, /api/generate, /api/tags)
+with configurable latency, so benchmarks and load tests can exercise the
+real client code without a GPU box. /api/chat answers with the notes it was
+sent, transposed up a whole step, in the same JSON shape a real model returns.
+
+Run standalone:
+    python -m benchmarks.fake_ollama --port 11435 --latency lognormal:0.8,0.4
+"""
+
+import argparse
+import ast
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+_SUMMARY_RE = re.compile(r"MIDI summary:\s*(.*?)\s*Return transformation actions", re.S)
+
+
+class LatencyModel:
+    """
+    Response latency in seconds.
+
+    Spec formats:
+        fixed:<seconds>                 constant latency
+        uniform:<low>,<high>            uniform between low and high
+        lognormal:<median>,<sigma>      long-tailed, like a loaded LLM server
+    """
+
+    def __init__(self, spec: str = "fixed:0", seed: int = None):
+        kind, _, args = spec.partition(":")
+        self.kind = kind
+        self.args = [float(a) for a in args.split(",") if a]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency model: {spec}")
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == "fixed":
+                return self.args[0] if self.args else 0.0
+            if self.kind == "uniform":
+                return self._random.uniform(self.args[0], self.args[1])
+            median, sigma = self.args
+            return self._random.lognormvariate(0.0, sigma) * median
+
+
+def _edit_notes(prompt: str) -> Optional[list]:
+    """
+    Recover the notes from the prompt and transpose them up two semitones.
+    None if the prompt holds no notes this server can read.
+    """
+    match = _SUMMARY_RE.search(prompt)
+    if not match:
+        return None
+    try:
+        notes = ast.literal_eval(match.group(1))
+    except (ValueError, SyntaxError):
+        try:
+            notes = json.loads(match.group(1))
+        except ValueError:
+            return None
+    return [{**n, "pitch": min(127, int(n["pitch"]) + 2)} for n in notes]
+
+
+class FakeOllamaServer:
+    """Threaded HTTP server speaking enough of the Ollama API for the app."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: str = "fixed:0",
+                 models=("qwen2.5:7b",), max_parallel: int = 0, fail_rate: float = 0.0,
+                 seed: int = None):
+        """
+        Args:
+            port: 0 picks a free port (see ``url``)
+            latency: LatencyModel spec applied to chat requests
+            models: Model names reported by /api/tags
+            max_parallel: Emulate OLLAMA_NUM_PARALLEL; 0 means unlimited
+            fail_rate: Fraction of chat requests answered with HTTP 500
+        """
+        self.latency = LatencyModel(latency, seed)
+        self.models = list(models)
+        self.fail_rate = fail_rate
+        self._random = random.Random(seed)
+        self._slots = threading.BoundedSemaphore(max_parallel) if max_parallel else None
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Prompts whose notes could not be read, answered with HTTP 400
+        self.parse_failures = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_json(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [
+                        {"name": m, "model": m, "size": 0, "digest": "", "details": {}}
+                        for m in server.models
+                    ]})
+                elif self.path in ("/", "/api/version"):
+                    self._send_json({"version": "0.0.0-fake"})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                payload = self._read_json()
+                if self.path == "/api/generate":
+                    self._send_json(server._generate(payload))
+                elif self.path == "/api/chat":
+                    server._chat(self, payload)
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _generate(self, payload):
+        return {
+            "model": payload.get("model", ""),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "response": "",
+            "done": True,
+        }
+
+    def _chat(self, handler, payload):
+        with self._stats_lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self._slots:
+                self._slots.acquire()
+            try:
+                started = time.perf_counter()
+                delay = self.latency.sample()
+                time.sleep(delay)
+                if self.fail_rate and self._random.random() < self.fail_rate:
+                    handler._send_json({"error": "simulated failure"}, 500)
+                    return
+
+                prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []))
+                notes = _edit_notes(prompt)
+                if notes is None:
+                    with self._stats_lock:
+                        self.parse_failures += 1
+                    handler._send_json({"error": "fake Ollama found no notes in the prompt"}, 400)
+                    return
+                content = json.dumps(notes)
+                elapsed_ns = int((time.perf_counter() - started) * 1e9)
+                prompt_tokens = max(1, len(prompt) // 4)
+                eval_tokens = max(1, len(content) // 4)
+                final = {
+                    "model": payload.get("model", ""),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "done": True,
+                    "done_reason": "stop",
+                    "total_duration": elapsed_ns,
+                    "load_duration": 0,
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": elapsed_ns // 4,
+                    "eval_count": eval_tokens,
+                    "eval_duration": elapsed_ns - elapsed_ns // 4,
+                }
+
+                if payload.get("stream"):
+                    self._stream_chat(handler, final, content)
+                else:
+                    final["message"] = {"role": "assistant", "content": content}
+                    handler._send_json(final)
+            finally:
+                if self._slots:
+                    self._slots.release()
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+
+    def _stream_chat(self, handler, final, content, chunk_chars=64):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def write(obj):
+            line = (json.dumps(obj) + "\n").encode()
+            handler.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+
+        for i in range(0, len(content), chunk_chars):
+            write({
+                "model": final["model"],
+                "created_at": final["created_at"],
+                "message": {"role": "assistant", "content": content[i:i + chunk_chars]},
+                "done": False,
+            })
+        write({**final, "message": {"role": "assistant", "content": ""}})
+        handler.wfile.write(b"0\r\n\r\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Ollama API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", default="fixed:0.5", help="fixed:S | uniform:LO,HI | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--models", default="qwen2.5:7b", help="comma-separated model names")
+    parser.add_argument("--max-parallel", type=int, default=0, help="emulated OLLAMA_NUM_PARALLEL (0 = unlimited)")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(
+        args.host, args.port, args.latency, args.models.split(","),
+        max_parallel=args.max_parallel, fail_rate=args.fail_rate,
+    )
+    print(f"Fake Ollama listening on {server.url} (latency {args.latency})")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
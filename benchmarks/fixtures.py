@@ -0,0 +1,128 @@
+"""
+Synthetic fixtures for benchmarks and load tests.
+
+Audio fixtures are deterministic (seeded) sine melodies and dense polyphonic
+clips written as 16-bit mono WAV files, so runs on different machines and
+commits measure the same inputs.
+"""
+
+import os
+import random
+import wave
+from typing import Dict, List
+
+import numpy as np
+import pretty_midi
+
+SAMPLE_RATE = 22050
+
+# C major over two octaves, as MIDI pitches
+_SCALE = [60, 62, 64, 65, 67, 69, 71, 72, 74, 76, 77, 79, 81, 83]
+
+REPO_TEST_WAV = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tmp", "input", "test.wav"
+)
+
+
+def _tone(pitch: int, length: int, sr: int) -> np.ndarray:
+    t = np.arange(length, dtype=np.float32) / sr
+    freq = 440.0 * 2 ** ((pitch - 69) / 12)
+    # Short attack/release so note boundaries are clear to the transcriber
+    ramp = min(length // 4, int(0.01 * sr))
+    envelope = np.ones(length, dtype=np.float32)
+    if ramp:
+        envelope[:ramp] = np.linspace(0, 1, ramp)
+        envelope[-ramp:] = np.linspace(1, 0, ramp)
+    return np.sin(2 * np.pi * freq * t) * envelope
+
+
+def sine_melody(duration: float, note_length: float = 0.25, sr: int = SAMPLE_RATE,
+                seed: int = 0) -> np.ndarray:
+    """Monophonic melody of random scale tones."""
+    rng = random.Random(seed)
+    total = int(duration * sr)
+    step = int(note_length * sr)
+    audio = np.zeros(total, dtype=np.float32)
+    for start in range(0, total, step):
+        length = min(step, total - start)
+        audio[start:start + length] = 0.5 * _tone(rng.choice(_SCALE), length, sr)
+    return audio
+
+
+def polyphonic_clip(duration: float, voices: int = 6, sr: int = SAMPLE_RATE,
+                    seed: int = 0) -> np.ndarray:
+    """Dense clip: ``voices`` overlapping melodies with random note lengths."""
+    rng = random.Random(seed)
+    total = int(duration * sr)
+    audio = np.zeros(total, dtype=np.float32)
+    for _ in range(voices):
+        pos = int(rng.uniform(0, 0.5) * sr)
+        while pos < total:
+            length = min(int(rng.uniform(0.1, 0.6) * sr), total - pos)
+            pitch = rng.choice(_SCALE) + rng.choice([-12, 0, 0, 12])
+            audio[pos:pos + length] += _tone(pitch, length, sr)
+            pos += length
+    return 0.9 * audio / max(1.0, float(np.abs(audio).max()))
+
+
+def write_wav(path: str, samples: np.ndarray, sr: int = SAMPLE_RATE) -> str:
+    """Write float samples in [-1, 1] as a 16-bit mono WAV."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sr)
+        f.writeframes(pcm.tobytes())
+    return path
+
+
+def build_audio_fixtures(out_dir: str, durations=(5, 15, 30, 60),
+                         include_repo_sample: bool = True) -> List[Dict]:
+    """
+    Write melody and polyphonic fixtures of increasing length.
+
+    Returns:
+        list of dicts with name, kind, duration and path
+    """
+    fixtures = []
+    for duration in durations:
+        for kind, generate in (("melody", sine_melody), ("polyphonic", polyphonic_clip)):
+            name = f"{kind}_{duration}s"
+            path = os.path.join(out_dir, f"{name}.wav")
+            if not os.path.exists(path):
+                write_wav(path, generate(duration, seed=duration))
+            fixtures.append({"name": name, "kind": kind, "duration": float(duration), "path": path})
+
+    if include_repo_sample and os.path.exists(REPO_TEST_WAV):
+        with wave.open(REPO_TEST_WAV, "rb") as f:
+            duration = f.getnframes() / f.getframerate()
+        fixtures.append({"name": "test.wav", "kind": "recording", "duration": duration, "path": REPO_TEST_WAV})
+    return fixtures
+
+
+def synthetic_notes(count: int, polyphony: int = 4, seed: int = 0) -> List[Dict]:
+    """Note events shaped like midi_to_json output."""
+    rng = random.Random(seed)
+    notes = []
+    for i in range(count):
+        start = (i // polyphony) * 0.25 + rng.uniform(0, 0.02)
+        notes.append({
+            "pitch": rng.choice(_SCALE) + rng.choice([-12, 0, 12]),
+            "start": round(start, 4),
+            "end": round(start + rng.uniform(0.1, 0.5), 4),
+            "velocity": rng.randint(40, 120),
+        })
+    return notes
+
+
+def synthetic_midi(count: int, polyphony: int = 4, seed: int = 0) -> pretty_midi.PrettyMIDI:
+    """PrettyMIDI object holding ``count`` synthetic notes on one piano track."""
+    midi = pretty_midi.PrettyMIDI()
+    instrument = pretty_midi.Instrument(program=0)
+    for n in synthetic_notes(count, polyphony, seed):
+        instrument.notes.append(pretty_midi.Note(
+            velocity=n["velocity"], pitch=n["pitch"], start=n["start"], end=n["end"]
+        ))
+    midi.instruments.append(instrument)
+    return midi
@@ -0,0 +1,315 @@
+"""
+Open-loop load test for the Composition Assistant API.
+
+Starts a fake Ollama server and the FastAPI app (uvicorn, as a subprocess),
+then drives the app with Poisson arrivals at one or more rates. Arrivals are
+independent of completions (open loop), so queueing shows up as latency
+instead of being hidden by a slowed-down client. Uploads are drawn from a mix
+of sizes.
+
+The report covers throughput, p50/p95/p99 latency, error and rejection rates
+per rate step, plus a once-per-second timeline of in-flight requests and the
+server's active workflows and admission queue depth. Each step is checked
+against SLO thresholds:
+
+    python -m benchmarks.loadtest --rates 0.5,1,2 --step-duration 60 \\
+        --sizes 5,15,30 --ollama-latency lognormal:2,0.5 --slo-p95 30
+
+The exit code is non-zero if any step misses its SLOs.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import requests
+
+from benchmarks.fake_ollama import FakeOllamaServer
+from benchmarks.fixtures import build_audio_fixtures, synthetic_midi
+from benchmarks.stats import summarize_latencies
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "tmp", "benchmarks")
+
+_GAUGE_RE = re.compile(r"^(composition_assistant_[a-z_]+)(?:\{[^}]*\})? ([0-9.e+-]+)$", re.M)
+TIMELINE_GAUGES = (
+    "composition_assistant_workflow_active",
+    "composition_assistant_admission_queue_depth",
+    "composition_assistant_admission_in_flight",
+)
+
+
+def build_uploads(kind: str, sizes: List[float], work_dir: str) -> List[Dict]:
+    """Upload payloads for each size: WAV seconds, or MIDI note counts."""
+    uploads = []
+    if kind == "wav":
+        for fixture in build_audio_fixtures(os.path.join(work_dir, "fixtures"), durations=[int(s) for s in sizes],
+                                            include_repo_sample=False):
+            if fixture["kind"] != "melody":
+                continue
+            with open(fixture["path"], "rb") as f:
+                uploads.append({"name": fixture["name"] + ".wav", "size": fixture["duration"], "data": f.read()})
+    else:
+        for count in sizes:
+            path = os.path.join(work_dir, f"load_{int(count)}.mid")
+            synthetic_midi(int(count)).write(path)
+            with open(path, "rb") as f:
+                uploads.append({"name": os.path.basename(path), "size": count, "data": f.read()})
+    return uploads
+
+
+class LoadRunner:
+    """Fires requests on a Poisson schedule and records every outcome."""
+
+    def __init__(self, base_url: str, endpoint: str, uploads: List[Dict], prompt: str,
+                 timeout: float, seed: int = 0):
+        self.base_url = base_url
+        self.endpoint = endpoint
+        self.uploads = uploads
+        self.prompt = prompt
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self.records: List[Dict] = []
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def _send(self, step: int, upload: Dict):
+        with self._lock:
+            self.in_flight += 1
+        start = time.time()
+        record = {"step": step, "size": upload["size"], "start": start}
+        try:
+            resp = requests.post(
+                f"{self.base_url}{self.endpoint}",
+                files={"file": (upload["name"], upload["data"])},
+                data={"prompt": self.prompt},
+                timeout=self.timeout,
+            )
+            record["status"] = resp.status_code
+        except requests.RequestException as e:
+            record["status"] = None
+            record["error"] = type(e).__name__
+        finally:
+            record["latency"] = time.time() - start
+            with self._lock:
+                self.in_flight -= 1
+                self.records.append(record)
+
+    def run_step(self, step: int, rate: float, duration: float):
+        """Open-loop Poisson arrivals at ``rate`` requests/s for ``duration`` seconds."""
+        end = time.time() + duration
+        next_at = time.time()
+        while True:
+            next_at += self.random.expovariate(rate)
+            if next_at >= end:
+                break
+            time.sleep(max(0.0, next_at - time.time()))
+            thread = threading.Thread(
+                target=self._send, args=(step, self.random.choice(self.uploads)), daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def wait(self):
+        for thread in self._threads:
+            thread.join()
+
+
+class TimelineSampler:
+    """Samples client in-flight count and server gauges once per interval."""
+
+    def __init__(self, runner: LoadRunner, base_url: str, interval: float = 1.0):
+        self.runner = runner
+        self.base_url = base_url
+        self.interval = interval
+        self.samples: List[Dict] = []
+        self.step = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._t0 = time.time()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            sample = {
+                "t": round(time.time() - self._t0, 2),
+                "step": self.step,
+                "client_in_flight": self.runner.in_flight,
+            }
+            try:
+                text = requests.get(f"{self.base_url}/metrics", timeout=5).text
+                for name, value in _GAUGE_RE.findall(text):
+                    if name in TIMELINE_GAUGES:
+                        key = name.replace("composition_assistant_", "")
+                        sample[key] = sample.get(key, 0) + float(value)
+            except requests.RequestException:
+                pass
+            self.samples.append(sample)
+
+
+def summarize_step(records: List[Dict], rate: float, duration: float, slo: Dict) -> Dict:
+    ok = [r for r in records if r.get("status") == 200]
+    rejected = [r for r in records if r.get("status") == 429]
+    errors = [r for r in records if r.get("status") not in (200, 429)]
+    total = len(records)
+    latency = summarize_latencies([r["latency"] for r in ok])
+    error_rate = len(errors) / total if total else 0.0
+
+    checks = {}
+    if slo.get("p95") is not None:
+        checks["p95"] = latency["p95"] is not None and latency["p95"] <= slo["p95"]
+    if slo.get("p99") is not None:
+        checks["p99"] = latency["p99"] is not None and latency["p99"] <= slo["p99"]
+    if slo.get("error_rate") is not None:
+        checks["error_rate"] = error_rate <= slo["error_rate"]
+    return {
+        "offered_rate": rate,
+        "requests": total,
+        "succeeded": len(ok),
+        "rejected": len(rejected),
+        "errors": len(errors),
+        "throughput": round(len(ok) / duration, 4),
+        "error_rate": round(error_rate, 4),
+        "rejection_rate": round(len(rejected) / total, 4) if total else 0.0,
+        "latency": latency,
+        "slo": checks,
+        "slo_met": all(checks.values()),
+    }
+
+
+def _wait_for_server(base_url: str, timeout: float):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"API did not come up at {base_url} within {timeout}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Open-loop load test for the Composition Assistant API")
+    parser.add_argument("--rates", default="0.5,1,2", help="comma-separated arrival rates (requests/s), one step each")
+    parser.add_argument("--step-duration", type=float, default=30, help="seconds per rate step")
+    parser.add_argument("--input", choices=("wav", "midi"), default="wav", help="upload type")
+    parser.add_argument("--sizes", default="5,15,30", help="WAV seconds or MIDI note counts, mixed uniformly")
+    parser.add_argument("--prompt", default="Transpose up a whole step")
+    parser.add_argument("--ollama-latency", default="lognormal:1.0,0.5", help="fake Ollama latency model")
+    parser.add_argument("--ollama-parallel", type=int, default=0, help="fake Ollama parallel slots (0 = unlimited)")
+    parser.add_argument("--ollama-fail-rate", type=float, default=0.0)
+    parser.add_argument("--url", help="use a running API instead of starting one (its Ollama is not replaced)")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the started API, e.g. PIPELINE_WORKERS=2")
+    parser.add_argument("--timeout", type=float, default=600, help="per-request timeout in seconds")
+    parser.add_argument("--slo-p95", type=float, default=None, help="p95 latency SLO in seconds")
+    parser.add_argument("--slo-p99", type=float, default=None, help="p99 latency SLO in seconds")
+    parser.add_argument("--slo-error-rate", type=float, default=0.01, help="max fraction of failed requests")
+    parser.add_argument("--output", help="report JSON path (default: tmp/benchmarks/load-<timestamp>.json)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rates = [float(r) for r in args.rates.split(",")]
+    sizes = [float(s) for s in args.sizes.split(",")]
+    work_dir = os.path.join(DEFAULT_OUTPUT_DIR, "load")
+    os.makedirs(work_dir, exist_ok=True)
+    uploads = build_uploads(args.input, sizes, work_dir)
+    endpoint = "/process-wav/" if args.input == "wav" else "/process-midi/"
+
+    fake = None
+    app = None
+    base_url = args.url
+    if not base_url:
+        fake = FakeOllamaServer(
+            latency=args.ollama_latency, max_parallel=args.ollama_parallel,
+            fail_rate=args.ollama_fail_rate, seed=args.seed,
+        ).start()
+        env = {**os.environ, "OLLAMA_HOST": fake.url, "WARMUP_ON_STARTUP": "false"}
+        for item in args.app_env:
+            key, _, value = item.partition("=")
+            env[key] = value
+        app = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(args.port)],
+            cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        _wait_for_server(base_url, timeout=120)
+        runner = LoadRunner(base_url, endpoint, uploads, args.prompt, args.timeout, seed=args.seed)
+        sampler = TimelineSampler(runner, base_url).start()
+        for step, rate in enumerate(rates):
+            sampler.step = step
+            print(f"step {step}: {rate} req/s for {args.step_duration}s")
+            runner.run_step(step, rate, args.step_duration)
+        runner.wait()
+        sampler.stop()
+    finally:
+        if app is not None:
+            app.terminate()
+            app.wait(timeout=30)
+        if fake is not None:
+            fake.stop()
+
+    slo = {"p95": args.slo_p95, "p99": args.slo_p99, "error_rate": args.slo_error_rate}
+    steps = [
+        summarize_step([r for r in runner.records if r["step"] == i], rate, args.step_duration, slo)
+        for i, rate in enumerate(rates)
+    ]
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "endpoint": endpoint,
+            "sizes": sizes,
+            "step_duration": args.step_duration,
+            "ollama_latency": args.ollama_latency if fake else None,
+            "ollama_parse_failures": fake.parse_failures if fake else None,
+            "app_env": args.app_env,
+        },
+        "slo": slo,
+        "steps": steps,
+        "timeline": sampler.samples,
+        "slo_met": all(s["slo_met"] for s in steps),
+    }
+
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, "load-" + datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'rate':>6} {'reqs':>6} {'ok':>6} {'429':>6} {'err%':>7} {'tput':>8} "
+          f"{'p50':>8} {'p95':>8} {'p99':>8}  SLO")
+
+    def fmt(v):
+        return f"{v:8.3f}" if v is not None else f"{'-':>8}"
+
+    for s in steps:
+        lat = s["latency"]
+        print(f"{s['offered_rate']:>6} {s['requests']:>6} {s['succeeded']:>6} {s['rejected']:>6} "
+              f"{s['error_rate'] * 100:>6.1f}% {s['throughput']:>8.3f} "
+              f"{fmt(lat['p50'])} {fmt(lat['p95'])} {fmt(lat['p99'])}  {'met' if s['slo_met'] else 'MISSED'}")
+    print(f"Report written to {output}")
+    return 0 if report["slo_met"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
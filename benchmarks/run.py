@@ -0,0 +1,353 @@
+"""
+Stage-level benchmark suite.
+
+Times each pipeline stage on synthetic inputs, plus the full run_agent
+pipeline against a local fake Ollama server, and reports latency
+percentiles, throughput and peak memory. Results are saved as JSON so runs
+can be compared across commits:
+
+    python -m benchmarks.run                      # full suite
+    python -m benchmarks.run --quick              # small inputs, few repeats
+    python -m benchmarks.run --stages parse,llm
+    python -m benchmarks.run --compare tmp/benchmarks/baseline.json
+
+Stages whose dependencies are missing (basic-pitch, FluidSynth, the
+SoundFont) are reported as skipped instead of failing the run.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.fake_ollama import FakeOllamaServer
+from benchmarks.fixtures import build_audio_fixtures, synthetic_midi, synthetic_notes
+from benchmarks.stats import summarize_latencies
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCAL_SOUNDFONT = os.path.join(PROJECT_ROOT, "transcriptionLibs", "FluidR3_GM", "FluidR3_GM.sf2")
+DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "tmp", "benchmarks")
+
+STAGES = ("transcription", "midi_to_json", "reduce", "llm", "parse", "render", "pipeline")
+GOAL = "Transpose up a whole step"
+
+
+class Skip(Exception):
+    """Raised when a stage cannot run in this environment."""
+
+
+def _peak_rss() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(fn: Callable[[], None], repeats: int, warmup: int = 1) -> Dict:
+    """
+    Time ``fn`` over ``repeats`` runs after ``warmup`` runs, then measure its
+    peak memory in one extra run (tracemalloc slows execution, so it is kept
+    out of the timed runs).
+    """
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+
+    rss_before = _peak_rss()
+    tracemalloc.start()
+    try:
+        fn()
+        python_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    rss_after = _peak_rss()
+
+    return {
+        "latency": summarize_latencies(latencies),
+        "memory": {
+            "python_peak_bytes": python_peak,
+            "rss_peak_growth_bytes": None if rss_before is None else rss_after - rss_before,
+        },
+    }
+
+
+def _result(stage: str, case: str, params: Dict, measured: Dict, units: float, unit: str) -> Dict:
+    p50 = measured["latency"]["p50"]
+    return {
+        "stage": stage,
+        "case": case,
+        "params": params,
+        **measured,
+        "throughput": {
+            "unit": f"{unit}/s",
+            "p50": round(units / p50, 3) if p50 else None,
+        },
+    }
+
+
+def bench_transcription(ctx) -> List[Dict]:
+    try:
+        import basic_pitch  # noqa: F401
+    except ImportError as e:
+        raise Skip(f"basic-pitch not installed: {e}")
+    from src.utils.transcribe import transcribe_audio
+
+    results = []
+    for fixture in ctx["audio_fixtures"]:
+        measured = measure(lambda: transcribe_audio(fixture["path"]), ctx["repeats"])
+        results.append(_result(
+            "transcription", fixture["name"], {"kind": fixture["kind"], "duration": fixture["duration"]},
+            measured, fixture["duration"], "audio_seconds",
+        ))
+    return results
+
+
+def bench_midi_to_json(ctx) -> List[Dict]:
+    from src.utils.midi_json import midi_to_json
+
+    results = []
+    for count in ctx["note_counts"]:
+        midi = synthetic_midi(count)
+        measured = measure(lambda: midi_to_json(midi), ctx["repeats"])
+        results.append(_result("midi_to_json", f"{count}_notes", {"notes": count}, measured, count, "notes"))
+    return results
+
+
+def bench_reduce(ctx) -> List[Dict]:
+    from src.utils.note_reduction import reduce_notes
+
+    results = []
+    for count in ctx["note_counts"]:
+        notes = synthetic_notes(count)
+        measured = measure(lambda: reduce_notes(notes), ctx["repeats"])
+        results.append(_result("reduce", f"{count}_notes", {"notes": count}, measured, count, "notes"))
+    return results
+
+
+def bench_llm(ctx) -> List[Dict]:
+    from src.clients.llm import query_llm
+
+    results = []
+    for count in ctx["llm_note_counts"]:
+        notes = synthetic_notes(count)
+        measured = measure(lambda: query_llm(GOAL, notes, host=ctx["ollama_url"]), ctx["repeats"])
+        results.append(_result("llm", f"{count}_notes", {"notes": count, "fake_latency": 0}, measured, count, "notes"))
+    return results
+
+
+def bench_parse(ctx) -> List[Dict]:
+    from src.agents.agent import parse_llm_output
+
+    results = []
+    for count in ctx["note_counts"]:
+        as_json = json.dumps(synthetic_notes(count))
+        as_literal = repr(synthetic_notes(count))
+        for case, text in (("json", as_json), ("python_literal", as_literal)):
+            measured = measure(lambda: parse_llm_output(text), ctx["repeats"])
+            results.append(_result("parse", f"{case}_{count}_notes", {"notes": count, "format": case},
+                                   measured, count, "notes"))
+    return results
+
+
+def bench_render(ctx) -> List[Dict]:
+    from src.utils.midi_json import json_to_wav
+
+    try:
+        import fluidsynth  # noqa: F401
+    except ImportError as e:
+        raise Skip(f"pyfluidsynth not installed: {e}")
+    if not os.path.isfile(ctx["soundfont"]):
+        raise Skip(f"SoundFont not found at {ctx['soundfont']}")
+
+    results = []
+    output = os.path.join(ctx["work_dir"], "render.wav")
+    for count in ctx["llm_note_counts"]:
+        notes = synthetic_notes(count)
+        measured = measure(lambda: json_to_wav(notes, output, ctx["soundfont"]), ctx["repeats"])
+        audio_seconds = max(n["end"] for n in notes)
+        results.append(_result("render", f"{count}_notes", {"notes": count, "audio_seconds": audio_seconds},
+                               measured, audio_seconds, "audio_seconds"))
+    return results
+
+
+def bench_pipeline(ctx) -> List[Dict]:
+    from src.agents.agent import run_agent
+
+    try:
+        import fluidsynth  # noqa: F401
+    except ImportError as e:
+        raise Skip(f"pyfluidsynth not installed: {e}")
+
+    results = []
+    output = os.path.join(ctx["work_dir"], "pipeline.wav")
+
+    # MIDI entry point: no transcription
+    midi_path = os.path.join(ctx["work_dir"], "pipeline_input.mid")
+    synthetic_midi(ctx["llm_note_counts"][0]).write(midi_path)
+    measured = measure(lambda: run_agent(midi_path, GOAL, input_type="midi", output_path=output), ctx["repeats"])
+    results.append(_result("pipeline", "midi_input", {"input_type": "midi"}, measured, 1, "jobs"))
+
+    try:
+        import basic_pitch  # noqa: F401
+    except ImportError:
+        return results
+    for fixture in ctx["audio_fixtures"][:2]:
+        measured = measure(lambda: run_agent(fixture["path"], GOAL, output_path=output), ctx["repeats"])
+        results.append(_result("pipeline", f"audio_{fixture['name']}", {"input_type": "audio"},
+                               measured, fixture["duration"], "audio_seconds"))
+    return results
+
+
+BENCHMARKS = {
+    "transcription": bench_transcription,
+    "midi_to_json": bench_midi_to_json,
+    "reduce": bench_reduce,
+    "llm": bench_llm,
+    "parse": bench_parse,
+    "render": bench_render,
+    "pipeline": bench_pipeline,
+}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """Return cases whose p50 latency grew by more than ``threshold`` (a fraction)."""
+    base = {(r["stage"], r["case"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in current["results"]:
+        old = base.get((r["stage"], r["case"]))
+        if not old or not old["latency"]["p50"] or not r["latency"]["p50"]:
+            continue
+        change = r["latency"]["p50"] / old["latency"]["p50"] - 1
+        if change > threshold:
+            regressions.append({
+                "stage": r["stage"],
+                "case": r["case"],
+                "baseline_p50": old["latency"]["p50"],
+                "current_p50": r["latency"]["p50"],
+                "change": round(change, 4),
+            })
+    return regressions
+
+
+def _print_table(results: List[Dict]):
+    print(f"{'stage':<14} {'case':<28} {'p50 (s)':>10} {'p95 (s)':>10} {'p99 (s)':>10} "
+          f"{'throughput':>22} {'py peak MB':>11}")
+    for r in results:
+        lat = r["latency"]
+        tp = r["throughput"]
+        print(f"{r['stage']:<14} {r['case']:<28} {lat['p50']:>10.4f} {lat['p95']:>10.4f} {lat['p99']:>10.4f} "
+              f"{(tp['p50'] or 0):>12.1f} {tp['unit']:<9} "
+              f"{r['memory']['python_peak_bytes'] / 1e6:>11.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Composition Assistant stage benchmarks")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of: " + ", ".join(STAGES))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="small inputs and 3 repeats")
+    parser.add_argument("--output", help="results JSON path (default: tmp/benchmarks/<timestamp>.json)")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p50 growth that counts as a regression")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    work_dir = tempfile.mkdtemp(prefix="ca-bench-")
+    fake = FakeOllamaServer(latency="fixed:0").start()
+    # Point the app at the fake server before any src module reads its config
+    os.environ["OLLAMA_HOST"] = fake.url
+    if not os.getenv("SOUNDFONT_PATH") and os.path.isfile(LOCAL_SOUNDFONT):
+        os.environ["SOUNDFONT_PATH"] = LOCAL_SOUNDFONT
+    sys.path.insert(0, PROJECT_ROOT)
+
+    quick = args.quick
+    ctx = {
+        "repeats": 3 if quick else args.repeats,
+        "work_dir": work_dir,
+        "ollama_url": fake.url,
+        "soundfont": os.environ.get("SOUNDFONT_PATH", LOCAL_SOUNDFONT),
+        "note_counts": (100, 1000) if quick else (100, 1000, 10000),
+        "llm_note_counts": (20, 200) if quick else (20, 200, 1000),
+        "audio_fixtures": build_audio_fixtures(
+            os.path.join(DEFAULT_OUTPUT_DIR, "fixtures"),
+            durations=(5,) if quick else (5, 15, 30, 60),
+        ),
+    }
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeats": ctx["repeats"],
+            "quick": quick,
+        },
+        "results": [],
+        "skipped": {},
+    }
+    try:
+        for stage in stages:
+            try:
+                report["results"].extend(BENCHMARKS[stage](ctx))
+            except Skip as e:
+                report["skipped"][stage] = str(e)
+    finally:
+        fake.stop()
+    # Requests the fake server could not answer were timed as errors, not edits
+    report["meta"]["ollama_parse_failures"] = fake.parse_failures
+
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            report["regressions"] = compare(report, json.load(f), args.threshold)
+        exit_code = 1 if report["regressions"] else 0
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    _print_table(report["results"])
+    for stage, reason in report["skipped"].items():
+        print(f"skipped {stage}: {reason}")
+    for r in report.get("regressions", []):
+        print(f"REGRESSION {r['stage']}/{r['case']}: p50 {r['baseline_p50']:.4f}s -> "
+              f"{r['current_p50']:.4f}s ({r['change']:+.0%})")
+    print(f"Results written to {output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""Latency and throughput summaries shared by the benchmark and load-test tools."""
+
+import math
+from typing import Dict, List, Optional, Sequence
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Linear-interpolated percentile, ``q`` in [0, 100]."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100.0
+    low, high = math.floor(rank), math.ceil(rank)
+    if low == high:
+        return ordered[low]
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, Optional[float]]:
+    """Count, mean, min/max and p50/p95/p99 of a list of latencies in seconds."""
+    if not latencies:
+        return {"count": 0, "mean": None, "min": None, "max": None, "p50": None, "p95": None, "p99": None}
+    return {
+        "count": len(latencies),
+        "mean": _round(sum(latencies) / len(latencies)),
+        "min": _round(min(latencies)),
+        "max": _round(max(latencies)),
+        "p50": _round(percentile(latencies, 50)),
+        "p95": _round(percentile(latencies, 95)),
+        "p99": _round(percentile(latencies, 99)),
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 6)
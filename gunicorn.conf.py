@@ -0,0 +1,90 @@
+"""
+Gunicorn configuration for multi-worker deployments.
+
+Run with:
+    PROMETHEUS_MULTIPROC_DIR=/tmp/prometheus gunicorn -c gunicorn.conf.py src.main:app
+
+Each worker writes its metrics to per-PID files in PROMETHEUS_MULTIPROC_DIR,
+and /metrics on any worker aggregates all of them.
+
+With GUNICORN_PRELOAD (the default) the master imports the app and the heavy
+libraries once before forking, so workers share them copy-on-write instead of
+each loading its own copy. To keep those pages shared, the master's garbage
+collector is disabled and everything it allocated is frozen before each fork,
+so collections in the workers don't write to the shared objects. Models and
+threads are only created in the workers (see src/utils/warmup.py).
+
+Preloading imports src.utils.metrics in the master, which opens per-PID metric
+files for it. gunicorn runs on_starting after preloading, so those files are
+cleared with the leftovers of previous runs, and prometheus_client switches
+each worker to files of its own PID on its first update.
+"""
+import gc
+import os
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# The app splits OLLAMA_MAX_PARALLEL between the workers; each process keeps
+# its own per-host cap, so a host sees up to max(OLLAMA_MAX_PARALLEL, workers)
+# calls at once
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+if multiproc_dir:
+    # Preloaded metrics open their files before on_starting runs
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+if preload_app:
+    # Objects freed in the master leave holes in pages the workers share
+    gc.disable()
+
+
+def on_starting(server):
+    """Clear metric files left over from a previous run (or from preloading)."""
+    if not multiproc_dir:
+        return
+    for name in os.listdir(multiproc_dir):
+        if name.endswith(".db"):
+            os.remove(os.path.join(multiproc_dir, name))
+
+
+def when_ready(server):
+    """Load the shared libraries in the master once the app is imported."""
+    if not preload_app:
+        return
+    from src.utils.warmup import preload_shared
+
+    result = preload_shared()
+    server.log.info(
+        "Preloaded %s in %.1fs", ", ".join(result["loaded"]) or "nothing", result["duration_seconds"]
+    )
+    for name, error in result["skipped"].items():
+        server.log.warning("Not preloaded: %s (%s)", name, error)
+    if result["threads"] > 1:
+        server.log.warning(
+            "Master has %d threads after preloading; forking it is not safe", result["threads"]
+        )
+
+
+def pre_fork(server, worker):
+    """Keep the master's objects out of the workers' garbage collections."""
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """Workers collect garbage as usual."""
+    if preload_app:
+        gc.enable()
+
+
+def child_exit(server, worker):
+    """Drop the exited worker's live gauges from the aggregated metrics."""
+    if not multiproc_dir:
+        return
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid, multiproc_dir)
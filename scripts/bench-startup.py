@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Composition Assistant - Startup Benchmark
+
+Measures how long the API takes to become useful after a cold start:
+
+  import     time to `import src.main` in a fresh interpreter
+  health     time from launching uvicorn until /health answers 200
+  ready      time from launching uvicorn until /ready answers 200
+
+Run from the project root: python scripts/bench-startup.py [--runs N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def measure_import() -> float:
+    """Time `import src.main` in a fresh interpreter."""
+    code = (
+        "import time; t = time.perf_counter(); import src.main; "
+        "print(time.perf_counter() - t)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "WARMUP_ON_STARTUP": "false"},
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _wait_for(url: str, deadline: float) -> float:
+    """Poll ``url`` until it answers 200; return the time it did, or None."""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def measure_server(port: int, ready_timeout: float) -> dict:
+    """Start uvicorn and time /health and /ready."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + ready_timeout
+        base = f"http://127.0.0.1:{port}"
+        health_at = _wait_for(f"{base}/health", deadline)
+        ready_at = _wait_for(f"{base}/ready", deadline) if health_at else None
+        return {
+            "health": health_at - start if health_at else None,
+            "ready": ready_at - start if ready_at else None,
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def _summarize(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {
+        "min": round(min(values), 3),
+        "median": round(statistics.median(values), 3),
+        "max": round(max(values), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3, help="number of cold starts")
+    parser.add_argument("--port", type=int, default=8765, help="port for the test server")
+    parser.add_argument("--ready-timeout", type=float, default=300, help="seconds to wait for /ready")
+    args = parser.parse_args()
+
+    imports, healths, readies = [], [], []
+    for _ in range(args.runs):
+        imports.append(measure_import())
+        server = measure_server(args.port, args.ready_timeout)
+        healths.append(server["health"])
+        readies.append(server["ready"])
+
+    print(json.dumps({
+        "runs": args.runs,
+        "import_seconds": _summarize(imports),
+        "health_seconds": _summarize(healths),
+        "ready_seconds": _summarize(readies),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
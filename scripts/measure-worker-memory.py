@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Composition Assistant - Worker Memory Measurement
+
+Starts gunicorn (gunicorn.conf.py) with and without GUNICORN_PRELOAD and
+reports each process's memory once the workers have warmed up:
+
+  rss     resident memory, shared pages counted in full
+  pss     proportional set size: shared pages split between their sharers
+  uss     unique set size: memory only this process uses (freed if it exits)
+
+The sum of PSS over master and workers is what the deployment really uses;
+a worker's USS is what each extra worker costs. Linux only (reads
+/proc/<pid>/smaps_rollup).
+
+Run from the project root: python scripts/measure-worker-memory.py [--workers N]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+# smaps_rollup fields in kB
+_FIELDS = ("Rss", "Pss", "Private_Clean", "Private_Dirty")
+
+
+def memory_of(pid: int) -> dict:
+    """RSS, PSS and USS of ``pid`` in MiB."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in _FIELDS:
+                values[name] = int(rest.split()[0])
+    return {
+        "rss": round(values["Rss"] / 1024, 1),
+        "pss": round(values["Pss"] / 1024, 1),
+        "uss": round((values["Private_Clean"] + values["Private_Dirty"]) / 1024, 1),
+    }
+
+
+def children_of(pid: int) -> list:
+    """PIDs whose parent is ``pid``."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields resume after ")"
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def _wait_for(url: str, deadline: float) -> bool:
+    """Poll ``url`` until it answers 200 or ``deadline`` passes."""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def measure(preload: bool, workers: int, port: int, settle: float) -> dict:
+    """Start gunicorn, wait for /ready (at most ``settle`` seconds) and measure."""
+    env = {
+        **os.environ,
+        "GUNICORN_PRELOAD": "true" if preload else "false",
+        "WEB_CONCURRENCY": str(workers),
+        "API_HOST": "127.0.0.1",
+        "API_PORT": str(port),
+        "PROMETHEUS_MULTIPROC_DIR": tempfile.mkdtemp(prefix="prometheus-"),
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "src.main:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.perf_counter() + settle
+        base = f"http://127.0.0.1:{port}"
+        if not _wait_for(f"{base}/health", deadline):
+            raise RuntimeError(f"gunicorn did not answer /health within {settle}s")
+        # Without Ollama /ready never answers 200; the transcription model
+        # still loads, so measure at the deadline
+        ready = _wait_for(f"{base}/ready", deadline)
+        worker_pids = children_of(proc.pid)
+        worker_memory = [memory_of(pid) for pid in worker_pids]
+        master = memory_of(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    def mean(key):
+        return round(sum(m[key] for m in worker_memory) / len(worker_memory), 1) if worker_memory else None
+
+    return {
+        "preload": preload,
+        "ready": ready,
+        "master": master,
+        "workers": worker_memory,
+        "worker_mean": {key: mean(key) for key in ("rss", "pss", "uss")},
+        "total_pss": round(master["pss"] + sum(m["pss"] for m in worker_memory), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    parser.add_argument("--port", type=int, default=8766, help="port for the test server")
+    parser.add_argument("--settle", type=float, default=120,
+                        help="seconds to wait for /ready before measuring anyway")
+    args = parser.parse_args()
+
+    runs = [measure(preload, args.workers, args.port, args.settle) for preload in (False, True)]
+    separate, shared = runs
+    print(json.dumps({
+        "workers": args.workers,
+        "runs": runs,
+        "saved_uss_per_worker_mib": round(separate["worker_mean"]["uss"] - shared["worker_mean"]["uss"], 1),
+        "saved_total_pss_mib": round(separate["total_pss"] - shared["total_pss"], 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
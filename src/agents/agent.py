@@ -1,24 +1,46 @@
 import json
 import ast
+import contextvars
+import functools
+import hashlib
 import os
-from src.clients.llm import query_llm
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from src.clients.llm import SYSTEM_PROMPT, query_llm
+from src.clients.router import model_router
 from src.utils.transcribe import transcribe_audio
-from src.utils.midi_json import json_to_wav, midi_to_json  # our new function
+from src.utils.midi_json import json_to_wav, join_tracks, midi_to_json, split_tracks
+from src.utils.note_reduction import reduce_notes
+from src.utils.metrics import metrics_collector
+from src.utils import tracing
+from src.utils import profiler
+from src.utils import events
+from src.utils.profiler import profile_session
+from src.utils.artifact_store import artifact_store
+from src.utils.single_flight import SingleFlight
+from src.core.config import NOTE_REDUCTION, TRACK_WORKERS, VARIANT_WORKERS
 
-def run_agent(audio_file, goal):
-    # Ensure output folder exists
-    os.makedirs("output", exist_ok=True)
+# Fan-out pool for variants: each variant's LLM call and render run here,
+# so variants of one job overlap instead of queueing behind each other
+variant_executor = ThreadPoolExecutor(max_workers=VARIANT_WORKERS, thread_name_prefix="variant")
+# Per-track pool for multi-track inputs: each track's LLM call and synthesis
+# run here. Separate from the variant pool, which submits to it.
+track_executor = ThreadPoolExecutor(max_workers=TRACK_WORKERS, thread_name_prefix="track")
 
-    # 1️⃣ Transcribe audio → MIDI in memory
-    midi_obj = transcribe_audio(audio_file)
+# Identical transcriptions and LLM edits in flight at once run only once
+transcription_flight = SingleFlight("transcription")
+llm_flight = SingleFlight("llm")
 
-    # 2️⃣ Convert MIDI → JSON note events
-    notes_json = midi_to_json(midi_obj)
 
-    # 3️⃣ Send JSON + user goal/focus to LLM
-    llm_output = query_llm(goal, notes_json)
+def parse_llm_output(llm_output):
+    """
+    Parse the LLM response into a list of note dicts.
 
-    # 4️⃣ Parse LLM response (edited note events)
+    Raises:
+        ValueError: if the response is neither JSON nor a Python literal
+        TypeError: if the parsed value is not a list of dicts
+    """
     try:
         edited_notes = json.loads(llm_output)  # try normal JSON first
     except json.JSONDecodeError:
@@ -36,8 +58,419 @@ def run_agent(audio_file, goal):
     if len(edited_notes) > 0 and not isinstance(edited_notes[0], dict):
         raise TypeError(f"Expected dicts inside list, got {type(edited_notes[0])}")
 
+    return edited_notes
+
+
+def validate_notes(notes, source_notes=None):
+    """
+    Check that parsed notes can be rendered.
+
+    Args:
+        source_notes: The notes the LLM was asked to edit, if any
+
+    Raises:
+        ValueError: if a note lacks a field or has one out of range, or the
+            LLM answered no notes at all for non-empty ``source_notes``
+    """
+    if not notes and source_notes:
+        raise ValueError(f"No notes returned for {len(source_notes)} input notes")
+    for i, note in enumerate(notes):
+        try:
+            pitch, velocity = int(note["pitch"]), int(note["velocity"])
+            start, end = float(note["start"]), float(note["end"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Note {i} is malformed: {note!r}") from e
+        if not (0 <= pitch <= 127 and 0 <= velocity <= 127 and 0 <= start <= end):
+            raise ValueError(f"Note {i} is out of range: {note!r}")
+
+
+def _check_llm_output(llm_output, source_notes=None):
+    """Let a hedged LLM request's valid answer win over an unusable one."""
+    validate_notes(parse_llm_output(llm_output), source_notes)
+
+
+@contextmanager
+def _stage(name, timings, **attributes):
+    """
+    Time a pipeline stage in metrics and the job timings, measure its memory
+    growth, trace it as a span, attribute profiler samples to it and report
+    its start and end on the job's event stream.
+    """
+    memory = {}
+    start_time = time.time()
+    events.emit("stage", stage=name, status="started")
+    with tracing.span(name, **attributes) as span:
+        try:
+            with metrics_collector.track_stage(name, timings), \
+                    metrics_collector.track_memory(name, memory), \
+                    profiler.stage(name):
+                yield span
+        except Exception as e:
+            events.emit("stage", stage=name, status="failed", error=type(e).__name__)
+            raise
+        else:
+            events.emit("stage", stage=name, status="completed",
+                        duration=round(time.time() - start_time, 4))
+        finally:
+            span.set_attributes(**{f"memory_{kind}_bytes": v for kind, v in memory.items()})
+
+
+def _audio_seconds(audio_file):
+    """Input duration for progress estimates; 0 if it cannot be read cheaply."""
+    from src.utils.audio_utils import get_audio_duration
+
+    try:
+        return get_audio_duration(audio_file)
+    except Exception:
+        return 0.0
+
+
+def _file_key(path):
+    """
+    Identity of a file's content for coalescing. Uploads are content-addressed,
+    so identical uploads share a path; size and mtime cover other files.
+    """
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def _notes_key(notes_json):
+    return hashlib.sha256(json.dumps(notes_json, sort_keys=True).encode()).hexdigest()
+
+
+def extract_notes(audio_file, input_type="audio", timings=None):
+    """
+    Stages 1-2: turn an input file into JSON note events.
+
+    Concurrent calls on the same file share one transcription.
+
+    Args:
+        audio_file: Path to the input file (WAV audio or a MIDI file)
+        input_type: "audio" to transcribe the input first, or "midi" to
+            parse an existing MIDI file and skip transcription entirely
+        timings: Optional dict that receives per-stage durations
+
+    Returns:
+        list of note dicts
+    """
+    if input_type not in ("audio", "midi"):
+        raise ValueError(f"Unsupported input_type: {input_type}")
+
+    (notes_json, stage_timings), _ = transcription_flight.do(
+        (_file_key(audio_file), input_type), _extract_notes, audio_file, input_type
+    )
+    if timings is not None:
+        timings.update(stage_timings)
+    return notes_json
+
+
+def _extract_notes(audio_file, input_type):
+    timings = {}
+    if input_type == "midi":
+        # 1️⃣ MIDI uploads are parsed directly, no transcription needed
+        midi_obj = audio_file
+    else:
+        # 1️⃣ Transcribe audio → MIDI in memory
+        audio_seconds = _audio_seconds(audio_file) if events.current() else 0.0
+        with _stage("transcription", timings), events.stage_progress("transcription", audio_seconds):
+            midi_obj = transcribe_audio(audio_file)
+
+    # 2️⃣ Convert MIDI → JSON note events
+    with _stage("midi_to_json", timings) as span:
+        notes_json = midi_to_json(midi_obj)
+        span.set_attributes(notes=len(notes_json))
+    metrics_collector.record_notes_extracted(len(notes_json))
+
+    # Drop and merge noise notes before they cost LLM tokens
+    if NOTE_REDUCTION == "all" or NOTE_REDUCTION == input_type:
+        with _stage("reduce", timings, notes_in=len(notes_json)) as span:
+            notes_json, stats = reduce_notes(notes_json)
+            span.set_attributes(**{f"notes_{k}": v for k, v in stats.items() if k != "before"})
+        metrics_collector.record_note_reduction(stats)
+    return notes_json, timings
+
+
+def edit_notes(notes_json, goal, timings=None, latency_budget=None):
+    """
+    Stages 3-4: ask the LLM to apply ``goal`` and parse its edited notes.
+
+    Each track (instrument) is edited by its own LLM call, concurrently on
+    the track pool, so a multi-track piece costs several small prompts
+    instead of one large mixed one. Edited notes keep their track's fields;
+    stage timings are those of the slowest track.
+
+    The model is picked per track by the router (see src.clients.router)
+    from the size of the notes, the kind of goal and ``latency_budget``
+    (seconds). Output that fails to parse or validate is retried on the next
+    larger model. Concurrent calls with the same notes, goal and route share
+    one LLM call.
+    """
+    tracks = split_tracks(notes_json)
+    if len(tracks) <= 1:
+        edited = [(track, _edit_track(notes, goal, timings, latency_budget)) for track, notes in tracks]
+        return join_tracks(edited)
+
+    # Each task gets a copy of the current context so its spans join the trace
+    track_timings = [{} for _ in tracks]
+    with tracing.span("tracks", tracks=len(tracks)):
+        futures = [
+            track_executor.submit(
+                contextvars.copy_context().run, _edit_track, notes, goal, track_timings[i], latency_budget
+            )
+            for i, (_, notes) in enumerate(tracks)
+        ]
+        edited = [(track, future.result()) for (track, _), future in zip(tracks, futures)]
+    if timings is not None:
+        for stage in {stage for t in track_timings for stage in t}:
+            timings[stage] = max(t.get(stage, 0) for t in track_timings)
+    return join_tracks(edited)
+
+
+def _edit_track(notes_json, goal, timings=None, latency_budget=None):
+    route = model_router.route(notes_json, goal, latency_budget, SYSTEM_PROMPT)
+    key = (_notes_key(notes_json), goal, tuple(route.models))
+    (edited_notes, stage_timings), _ = llm_flight.do(key, _edit_notes, notes_json, goal, route)
+    if timings is not None:
+        timings.update(stage_timings)
+    return edited_notes
+
+
+def _edit_notes(notes_json, goal, route):
+    timings = {}
+    events.emit("llm_route", **route.to_dict())
+    tracing.set_attributes(llm_model=route.model, llm_route=route.reason, goal_category=route.category)
+    for attempt, model in enumerate(route.models):
+        # 3️⃣ Send JSON + user goal/focus to LLM
+        with _stage("llm", timings, notes_in=len(notes_json), model=model):
+            llm_output = query_llm(goal, notes_json, model=model,
+                                   on_token=events.token_reporter(goal=goal[:80]),
+                                   validate=functools.partial(_check_llm_output, source_notes=notes_json))
+
+        # 4️⃣ Parse LLM response (edited note events)
+        try:
+            with _stage("parse", timings, response_chars=len(llm_output)) as span:
+                edited_notes = parse_llm_output(llm_output)
+                validate_notes(edited_notes, notes_json)
+                span.set_attributes(notes_out=len(edited_notes))
+        except (ValueError, TypeError) as e:
+            if attempt == len(route.models) - 1:
+                raise
+            larger = route.models[attempt + 1]
+            model_router.record_fallback(model, larger)
+            events.emit("llm_fallback", from_model=model, to_model=larger, error=str(e)[:200])
+            # Keep the time spent on the rejected answer visible in the breakdown
+            timings["llm_fallback"] = round(
+                timings.get("llm_fallback", 0) + timings["llm"] + timings["parse"], 4
+            )
+            continue
+        break
+    metrics_collector.record_notes_modified(len(edited_notes))
+    return edited_notes, timings
+
+
+def render_notes(edited_notes, output_path=None, timings=None):
+    """
+    Stage 5: render note events to WAV.
+
+    Args:
+        output_path: Where to write the WAV. By default the render goes into
+            the artifact store and is addressed by its hash.
+
+    Returns:
+        (path of the WAV, output artifact ID or None if ``output_path`` was given)
+    """
+    store_output = output_path is None
+    if store_output:
+        output_path = artifact_store.temp_path(suffix=".wav")
+    else:
+        # Ensure output folder exists
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
     # 5️⃣ Convert edited JSON → WAV and save
-    output_path = "./tmp/output/agent_output.wav"
-    json_to_wav(edited_notes, output_path)
+    piece_seconds = max((float(n.get("end", 0)) for n in edited_notes), default=0.0)
+    with _stage("render", timings, notes=len(edited_notes)), \
+            events.stage_progress("render", piece_seconds):
+        json_to_wav(edited_notes, output_path, executor=track_executor)
+    if not store_output:
+        return output_path, None
+
+    meta = artifact_store.put_file(output_path, "output", "audio/wav", filename="output.wav")
+    return artifact_store.path(meta["id"]), meta["id"]
+
+
+def _resumed(checkpoint, name):
+    """Artifact saved for checkpoint ``name`` by an earlier attempt, or None."""
+    if checkpoint is None:
+        return None
+    artifact_id = checkpoint.load(name)
+    if artifact_id is not None:
+        events.emit("checkpoint", checkpoint=name, status="reused", artifact=artifact_id)
+        tracing.set_attributes(**{f"resumed_{name.replace(':', '_')}": artifact_id})
+    return artifact_id
+
+
+def _save(checkpoint, name, artifact_id):
+    if checkpoint is not None:
+        checkpoint.save(name, artifact_id)
+
+
+def _notes_for(audio_file, input_type, timings, checkpoint=None):
+    """Stages 1-2, or the notes checkpointed by an earlier attempt."""
+    notes_id = _resumed(checkpoint, "notes")
+    if notes_id is not None:
+        return artifact_store.read_json(notes_id), notes_id
+
+    notes_json = extract_notes(audio_file, input_type, timings)
+    notes_id = artifact_store.put_json(notes_json, "notes")["id"]
+    _save(checkpoint, "notes", notes_id)
+    return notes_json, notes_id
+
+
+def run_goal(notes_json, goal, output_path=None, timings=None, checkpoint=None, prefix="",
+             latency_budget=None):
+    """
+    Stages 3-5 for one goal on already extracted notes.
+
+    Args:
+        checkpoint: Optional job checkpoint (see src.utils.job_store); stages
+            with a saved checkpoint are skipped and their artifact reused
+        prefix: Checkpoint name prefix, to keep variants of one job apart
+        latency_budget: Optional seconds the LLM call should fit in, for
+            model routing
+
+    Returns:
+        dict with output_path, notes_out and the IDs of the stored artifacts
+    """
+    edited_id = _resumed(checkpoint, prefix + "edited_notes")
+    if edited_id is not None:
+        edited_notes = artifact_store.read_json(edited_id)
+    else:
+        edited_notes = edit_notes(notes_json, goal, timings, latency_budget)
+        edited_id = artifact_store.put_json(edited_notes, "edited_notes")["id"]
+        _save(checkpoint, prefix + "edited_notes", edited_id)
+    artifacts = {"edited_notes": edited_id}
+
+    output_id = _resumed(checkpoint, prefix + "output") if output_path is None else None
+    if output_id is not None:
+        output_path = artifact_store.path(output_id)
+    else:
+        output_path, output_id = render_notes(edited_notes, output_path, timings)
+        if output_id is not None:
+            _save(checkpoint, prefix + "output", output_id)
+    if output_id is not None:
+        artifacts["output"] = output_id
+    return {"output_path": output_path, "notes_out": len(edited_notes), "artifacts": artifacts}
+
+
+@metrics_collector.track_workflow()
+@profile_session.job()
+def run_agent(audio_file, goal, input_type="audio", output_path=None, checkpoint=None,
+              latency_budget=None):
+    """
+    Run the transformation pipeline on an uploaded file.
+
+    Args:
+        audio_file: Path to the input file (WAV audio or a MIDI file)
+        goal: User's transformation goal/instructions
+        input_type: "audio" to transcribe the input first, or "midi" to
+            parse an existing MIDI file and skip transcription entirely
+        output_path: Where to write the rendered WAV. By default the render
+            goes into the artifact store and is addressed by its hash.
+        checkpoint: Optional job checkpoint; completed stages are saved to it
+            and stages it already holds are skipped
+        latency_budget: Optional seconds the LLM call should fit in; the
+            router may pick a smaller model to meet it
+
+    Returns:
+        dict with output_path, notes_in, notes_out, the IDs of the stored
+        artifacts, a per-stage timings breakdown in seconds and, when
+        resuming, the checkpoints that were reused
+    """
+    start_time = time.time()
+    timings = {}
+
+    notes_json, notes_id = _notes_for(audio_file, input_type, timings, checkpoint)
+    result = run_goal(notes_json, goal, output_path, timings, checkpoint, latency_budget=latency_budget)
+
+    timings["total"] = round(time.time() - start_time, 4)
+    print(f"Final playable WAV saved to {result['output_path']}")
+
+    response = {
+        "output_path": result["output_path"],
+        "notes_in": len(notes_json),
+        "notes_out": result["notes_out"],
+        "artifacts": {"notes": notes_id, **result["artifacts"]},
+        "timings": timings,
+    }
+    if checkpoint is not None and checkpoint.resumed:
+        response["resumed"] = list(checkpoint.resumed)
+    return response
+
+
+def _run_variant(notes_json, goal, checkpoint=None, index=0, latency_budget=None):
+    """One variant of a fan-out job, run on the variant pool."""
+    start_time = time.time()
+    timings = {}
+    with tracing.span("variant", goal=goal[:80]):
+        result = run_goal(notes_json, goal, timings=timings, checkpoint=checkpoint,
+                          prefix=f"variant:{index}:", latency_budget=latency_budget)
+    timings["total"] = round(time.time() - start_time, 4)
+    return {"goal": goal, **result, "timings": timings}
+
+
+@metrics_collector.track_workflow()
+@profile_session.job()
+def run_variants(audio_file, goals, input_type="audio", checkpoint=None, latency_budget=None):
+    """
+    Run several goals on one input: transcribe once, then fan out.
+
+    Notes are extracted once; each goal's LLM call and render then run
+    concurrently on the variant pool, so the job takes about one extraction
+    plus the slowest variant.
+
+    Args:
+        audio_file: Path to the input file (WAV audio or a MIDI file)
+        goals: List of transformation goals, one output per goal
+        input_type: "audio" or "midi", as for run_agent
+        checkpoint: Optional job checkpoint, as for run_agent
+        latency_budget: Optional seconds each variant's LLM call should fit in
+
+    Returns:
+        dict with notes_in, the shared artifacts, shared timings and one
+        entry per goal (in order) holding either its output or its error
+    """
+    start_time = time.time()
+    timings = {}
+
+    notes_json, notes_id = _notes_for(audio_file, input_type, timings, checkpoint)
+
+    # Each task gets a copy of the current context so its spans join the trace
+    futures = [
+        variant_executor.submit(
+            contextvars.copy_context().run, _run_variant, notes_json, goal, checkpoint, index,
+            latency_budget
+        )
+        for index, goal in enumerate(goals)
+    ]
+    variants = []
+    for goal, future in zip(goals, futures):
+        try:
+            variants.append(future.result())
+        except Exception as e:
+            variants.append({"goal": goal, "error": f"{type(e).__name__}: {e}"})
+    if all("error" in v for v in variants):
+        raise RuntimeError(f"All {len(goals)} variants failed: {variants[0]['error']}")
+
+    timings["variants"] = round(time.time() - start_time - sum(timings.values()), 4)
+    timings["total"] = round(time.time() - start_time, 4)
+    print(f"Rendered {sum('error' not in v for v in variants)}/{len(goals)} variants")
 
-    print(f"Final playable WAV saved to {output_path}")
+    response = {
+        "notes_in": len(notes_json),
+        "artifacts": {"notes": notes_id},
+        "variants": variants,
+        "timings": timings,
+    }
+    if checkpoint is not None and checkpoint.resumed:
+        response["resumed"] = list(checkpoint.resumed)
+    return response
@@ -0,0 +1,291 @@
+"""
+Batch jobs: many (input, prompt) items under one batch ID.
+
+Items that share an input file (same content hash) form a group, and each
+group is one pipeline job: the input is transcribed once and every prompt in
+the group reuses the extracted notes, with the group's prompts running
+concurrently on the variant pool. Groups are admitted as background work
+(see ``AdmissionController.admit_when_idle``), so a large batch fills idle
+workers without starving interactive requests. The uploads and outputs of
+unfinished batches are pinned in the artifact store, so they are not evicted
+while groups wait for a worker.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import Dict, List, Optional
+
+from src.agents.agent import extract_notes, run_goal, variant_executor
+from src.core.config import BATCH_HISTORY_SIZE
+from src.utils import tracing
+from src.utils.admission import Ticket, admission_controller, estimate_job_cost
+from src.utils.artifact_store import artifact_store
+from src.utils.metrics import metrics_collector
+
+
+class BatchItem:
+    """One (input, prompt) pair of a batch."""
+
+    def __init__(self, index: int, filename: str, prompt: str, input_type: str, upload_id: str):
+        self.index = index
+        self.filename = filename
+        self.prompt = prompt
+        self.input_type = input_type
+        self.upload_id = upload_id
+        self.status = "pending"
+        self.trace_id: Optional[str] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        item = {
+            "index": self.index,
+            "file": self.filename,
+            "prompt": self.prompt,
+            "input_type": self.input_type,
+            "status": self.status,
+            "trace_id": self.trace_id,
+        }
+        if self.result is not None:
+            item.update(
+                filename=f"{self.result['artifacts']['output']}.wav",
+                notes_in=self.result["notes_in"],
+                notes_out=self.result["notes_out"],
+                artifacts=self.result["artifacts"],
+                timings=self.result["timings"],
+            )
+        if self.error is not None:
+            item["error"] = self.error
+        return item
+
+
+class Batch:
+    """A submitted batch and the progress of its items."""
+
+    def __init__(self, items: List[BatchItem]):
+        self.id = uuid.uuid4().hex
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.items = items
+        self.results_id: Optional[str] = None
+        self.done = threading.Event()
+
+    def groups(self) -> Dict[tuple, List[BatchItem]]:
+        """Items keyed by (upload artifact, input type), in submission order."""
+        groups: Dict[tuple, List[BatchItem]] = {}
+        for item in self.items:
+            groups.setdefault((item.upload_id, item.input_type), []).append(item)
+        return groups
+
+    def counts(self) -> Dict[str, int]:
+        counts = {"pending": 0, "running": 0, "completed": 0, "failed": 0}
+        for item in self.items:
+            counts[item.status] += 1
+        return counts
+
+    @property
+    def status(self) -> str:
+        if not self.done.is_set():
+            counts = self.counts()
+            return "pending" if counts["pending"] == len(self.items) else "running"
+        return "failed" if all(i.status == "failed" for i in self.items) else "completed"
+
+    def to_dict(self, include_items: bool = True) -> dict:
+        counts = self.counts()
+        finished = counts["completed"] + counts["failed"]
+        summary = {
+            "batch_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "total": len(self.items),
+            "groups": len(self.groups()),
+            "progress": round(finished / len(self.items), 4) if self.items else 1.0,
+            **counts,
+        }
+        if include_items:
+            summary["items"] = [item.to_dict() for item in self.items]
+        return summary
+
+
+class BatchManager:
+    """Schedules batch groups onto the pipeline executor and keeps recent batches."""
+
+    def __init__(self, executor: Executor, max_batches: int = BATCH_HISTORY_SIZE):
+        self.executor = executor
+        self.max_batches = max_batches
+        self._batches: "OrderedDict[str, Batch]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        artifact_store.add_pin_source(self.active_artifacts)
+
+    def submit(self, items: List[BatchItem]) -> Batch:
+        """Register a batch and start feeding its groups to the workers."""
+        batch = Batch(items)
+        with self._lock:
+            self._batches[batch.id] = batch
+            while len(self._batches) > self.max_batches:
+                self._batches.popitem(last=False)
+        threading.Thread(
+            target=self._feed, args=(batch,), name=f"batch-{batch.id[:8]}", daemon=True
+        ).start()
+        return batch
+
+    def get(self, batch_id: str) -> Optional[Batch]:
+        with self._lock:
+            return self._batches.get(batch_id)
+
+    def active_artifacts(self) -> List[str]:
+        """Uploads, notes and outputs of unfinished batches, which must not be collected."""
+        with self._lock:
+            batches = [batch for batch in self._batches.values() if not batch.done.is_set()]
+        artifact_ids = []
+        for batch in batches:
+            for item in batch.items:
+                artifact_ids.append(item.upload_id)
+                if item.result is not None:
+                    artifact_ids.extend(item.result["artifacts"].values())
+        return artifact_ids
+
+    def shutdown(self):
+        """Stop admitting further groups; groups already running finish."""
+        self._stop.set()
+
+    def _feed(self, batch: Batch):
+        futures = []
+        for group_index, ((upload_id, input_type), items) in enumerate(batch.groups().items()):
+            input_path = artifact_store.path(upload_id)
+            if input_path is None:
+                # Evicted before the batch was registered, or removed by hand
+                for item in items:
+                    item.status, item.error = "failed", "Upload expired; submit the file again"
+                continue
+            try:
+                cost = estimate_job_cost(input_path, input_type)
+            except Exception:
+                cost = 0.0  # unreadable input; the pipeline reports the real error
+
+            ticket = admission_controller.admit_when_idle(cost, stop=self._stop)
+            if ticket is None:
+                for item in items:
+                    item.status, item.error = "failed", "Server shutting down"
+                continue
+            trace_id = f"{batch.id}-{group_index}"
+            futures.append(self.executor.submit(
+                self._run_group, time.time(), ticket, trace_id, input_path, input_type, items
+            ))
+
+        for future in futures:
+            future.exception()  # wait; item errors are recorded on the items
+        batch.finished_at = time.time()
+        batch.done.set()
+
+    def _run_group(self, submitted_at: float, ticket: Ticket, trace_id: str,
+                   input_path: str, input_type: str, items: List[BatchItem]):
+        """Transcribe a group's input once, then run each of its prompts."""
+        admission_controller.start(ticket)
+        try:
+            queue_wait = time.time() - submitted_at
+            metrics_collector.record_queue_wait(queue_wait)
+            with tracing.start_trace(trace_id), tracing.span("batch_group", items=len(items)):
+                for item in items:
+                    item.trace_id = trace_id
+
+                shared_timings = {"queue_wait": round(queue_wait, 4)}
+                try:
+                    notes_json = extract_notes(input_path, input_type, shared_timings)
+                    notes_id = artifact_store.put_json(notes_json, "notes")["id"]
+                except Exception as e:
+                    for item in items:
+                        item.status, item.error = "failed", f"{type(e).__name__}: {e}"
+                    return
+
+                # The group's prompts run concurrently on the variant pool; each
+                # task gets a copy of the current context so its spans join the trace
+                futures = [
+                    variant_executor.submit(
+                        contextvars.copy_context().run, _run_group_item,
+                        item, notes_json, notes_id, shared_timings,
+                    )
+                    for item in items
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            admission_controller.finish(ticket)
+
+    def results_archive(self, batch: Batch) -> dict:
+        """
+        Zip the batch's rendered outputs plus a ``results.json`` summary and
+        store it as an artifact. Finished batches reuse their archive.
+
+        Outputs evicted from the artifact store are left out; their items are
+        marked ``output_missing`` and listed in the summary's ``missing_outputs``.
+        """
+        if batch.results_id is not None and artifact_store.get(batch.results_id) is not None:
+            return artifact_store.get(batch.results_id)
+
+        finished = batch.done.is_set()
+        zip_path = artifact_store.temp_path(suffix=".zip")
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            summary = batch.to_dict()
+            summary["missing_outputs"] = []
+            for item in summary["items"]:
+                if item["status"] != "completed":
+                    continue
+                stem = os.path.splitext(os.path.basename(item["file"]))[0] or "item"
+                archive_name = f"{item['index']:04d}_{stem}.wav"
+                output_path = artifact_store.path(item["artifacts"]["output"])
+                try:
+                    if output_path is None:
+                        raise FileNotFoundError(item["artifacts"]["output"])
+                    # WAV barely compresses; store it as-is
+                    archive.write(output_path, archive_name)
+                except FileNotFoundError:
+                    item["output_missing"] = True
+                    summary["missing_outputs"].append(item["index"])
+                    continue
+                item["archive_name"] = archive_name
+            archive.writestr("results.json", json.dumps(summary, indent=2),
+                             compress_type=zipfile.ZIP_DEFLATED)
+
+        meta = artifact_store.put_file(zip_path, "batch_results", "application/zip",
+                                       filename=f"batch_{batch.id}.zip")
+        if finished:
+            batch.results_id = meta["id"]
+        return meta
+
+
+def _run_group_item(item: BatchItem, notes_json: list, notes_id: str, shared_timings: dict):
+    """Run one prompt of a group on the group's notes, recording the outcome on ``item``."""
+    item.status = "running"
+    timings = dict(shared_timings)
+    try:
+        with tracing.span("batch_item", index=item.index):
+            result = _run_item(notes_json, item.prompt, timings)
+    except Exception as e:
+        item.status, item.error = "failed", f"{type(e).__name__}: {e}"
+        return
+    item.result = {
+        "notes_in": len(notes_json),
+        "notes_out": result["notes_out"],
+        "artifacts": {"upload": item.upload_id, "notes": notes_id, **result["artifacts"]},
+        "timings": timings,
+    }
+    item.status = "completed"
+
+
+@metrics_collector.track_workflow()
+def _run_item(notes_json, goal, timings):
+    start_time = time.time()
+    result = run_goal(notes_json, goal, timings=timings)
+    timings["total"] = round(time.time() - start_time + timings.get("transcription", 0)
+                             + timings.get("midi_to_json", 0) + timings.get("reduce", 0), 4)
+    return result
@@ -0,0 +1,102 @@
+"""
+Hedged LLM requests.
+
+Tail latency of LLM calls comes mostly from one slow or overloaded host. A
+request that hasn't answered after the model's usual latency (a percentile
+of its recent responses) is duplicated, to another host or a smaller model;
+the first valid answer wins and the other request is cancelled. Requests run
+on a shared thread pool, off the caller's thread, so the caller stops waiting
+at its deadline even while an HTTP read is stuck.
+"""
+
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+from src.clients.transport import LLMTimeout
+from src.core.config import LLM_REQUEST_WORKERS
+
+# A request: called with an Event that is set once its answer is no longer wanted
+Request = Callable[[threading.Event], Any]
+
+llm_request_executor = ThreadPoolExecutor(max_workers=LLM_REQUEST_WORKERS, thread_name_prefix="llm")
+
+
+def race(primary: Request, hedge: Optional[Request] = None, hedge_after: Optional[float] = None,
+         deadline: Optional[float] = None,
+         validate: Optional[Callable[[Any], None]] = None) -> Tuple[Any, str]:
+    """
+    Run ``primary``, and ``hedge`` as well if ``primary`` hasn't answered
+    validly within ``hedge_after`` seconds (or failed before that).
+
+    An answer for which ``validate`` raises ValueError or TypeError loses to
+    a valid one; if neither is valid, the primary's answer is returned
+    anyway so the caller's own validation reports it.
+
+    Returns:
+        (answer, winner) with winner "primary" or "hedge"
+
+    Raises:
+        LLMTimeout: Nothing answered before ``deadline``
+        The primary's exception if every request failed
+    """
+    results: queue.Queue = queue.Queue()
+    cancels = []
+
+    def launch(name: str, request: Request):
+        cancelled = threading.Event()
+        cancels.append(cancelled)
+        context = contextvars.copy_context()
+
+        def run():
+            try:
+                answer = context.run(request, cancelled)
+            except Exception as e:
+                results.put((name, None, e, True))
+                return
+            try:
+                if validate is not None:
+                    validate(answer)
+            except (ValueError, TypeError):
+                results.put((name, answer, None, False))
+                return
+            results.put((name, answer, None, True))
+
+        llm_request_executor.submit(run)
+
+    launch("primary", primary)
+    pending = 1
+    hedge_at = time.time() + hedge_after if hedge is not None and hedge_after is not None else None
+    errors, invalid = {}, {}
+    try:
+        while pending or hedge_at is not None:
+            if not pending:
+                hedge_at = time.time()  # the primary failed: hedge right away
+            wakeups = [t for t in (hedge_at, deadline) if t is not None]
+            timeout = max(0.0, min(wakeups) - time.time()) if wakeups else None
+            try:
+                name, answer, error, valid = results.get(timeout=timeout)
+            except queue.Empty:
+                if hedge_at is not None and time.time() >= hedge_at:
+                    launch("hedge", hedge)
+                    pending += 1
+                    hedge_at = None
+                    continue
+                raise LLMTimeout("LLM request deadline exceeded")
+            pending -= 1
+            if error is not None:
+                errors[name] = error
+            elif not valid:
+                invalid[name] = answer
+            else:
+                return answer, name
+        if invalid:
+            name = "primary" if "primary" in invalid else "hedge"
+            return invalid[name], name
+        raise errors.get("primary") or errors["hedge"]
+    finally:
+        for cancelled in cancels:
+            cancelled.set()
@@ -0,0 +1,227 @@
+"""
+Pool of Ollama hosts.
+
+Spreads LLM calls over several Ollama servers (OLLAMA_HOSTS) so the LLM tier
+scales horizontally behind one API:
+
+* each call goes to the available host with the fewest outstanding calls
+  (queued for a slot or running);
+* a background prober checks every host's health and model list (see
+  ``check_ollama_connection``); hosts that are down or lack the model are
+  skipped;
+* a host failing several calls in a row is ejected for a while, with
+  exponential backoff on repeated ejections, and re-admitted once a probe
+  succeeds after that time;
+* if no host is available the least loaded host is tried anyway, so a
+  flapping single-host setup degrades into errors rather than refusals.
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from src.clients.transport import LLMCancelled
+from src.core.config import (
+    OLLAMA_HOSTS,
+    OLLAMA_PROBE_INTERVAL,
+    OLLAMA_PROBE_TIMEOUT,
+    OLLAMA_EJECT_FAILURES,
+    OLLAMA_EJECT_SECONDS,
+)
+from src.utils.metrics import metrics_collector
+
+# Longest ejection, as a multiple of OLLAMA_EJECT_SECONDS
+_MAX_EJECTION_FACTOR = 16
+
+
+def _model_listed(model: str, models: List[str]) -> bool:
+    """Ollama lists "name:tag"; a configured model without a tag means ":latest"."""
+    return model in models or (":" not in model and f"{model}:latest" in models)
+
+
+class OllamaHost:
+    """Health and load bookkeeping of one Ollama endpoint."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.up = True  # optimistic until the first probe
+        self.models: List[str] = []
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until: Optional[float] = None
+        self.last_probe: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def available(self, model: Optional[str] = None) -> bool:
+        # An ejected host stays out until a probe after its ejection succeeds
+        if not self.up or self.ejected_until is not None:
+            return False
+        return model is None or not self.models or _model_listed(model, self.models)
+
+    def to_dict(self, now: float) -> dict:
+        return {
+            "url": self.url,
+            "up": self.up,
+            "available": self.available(),
+            "outstanding": self.outstanding,
+            "consecutive_failures": self.consecutive_failures,
+            "ejected_for": round(self.ejected_until - now, 1) if self.ejected_until else None,
+            "models": self.models,
+            "last_probe": self.last_probe,
+            "last_error": self.last_error,
+        }
+
+
+class OllamaHostPool:
+    """Least-outstanding-requests routing over health-checked Ollama hosts."""
+
+    def __init__(self, urls: List[str], eject_failures: int = OLLAMA_EJECT_FAILURES,
+                 eject_seconds: float = OLLAMA_EJECT_SECONDS):
+        """
+        Args:
+            urls: Ollama base URLs
+            eject_failures: Consecutive failed calls that eject a host (0 never ejects)
+            eject_seconds: First ejection's length; doubles per repeat
+        """
+        self.hosts = [OllamaHost(url) for url in urls]
+        self.eject_failures = eject_failures
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+        for host in self.hosts:
+            metrics_collector.set_ollama_host_available(host.url, True)
+
+    @property
+    def urls(self) -> List[str]:
+        return [host.url for host in self.hosts]
+
+    def _host(self, url: str) -> Optional[OllamaHost]:
+        return next((h for h in self.hosts if h.url == url), None)
+
+    def available(self, model: Optional[str] = None, exclude: tuple = ()) -> List[str]:
+        """URLs of the hosts currently available for ``model``, minus ``exclude``."""
+        with self._lock:
+            return [h.url for h in self.hosts if h.url not in exclude and h.available(model)]
+
+    def pick(self, model: Optional[str] = None, exclude: tuple = ()) -> OllamaHost:
+        """The available host with the fewest outstanding calls (ties broken randomly)."""
+        with self._lock:
+            candidates = [h for h in self.hosts if h.url not in exclude] or self.hosts
+            available = [h for h in candidates if h.available(model)] or candidates
+            fewest = min(h.outstanding for h in available)
+            host = random.choice([h for h in available if h.outstanding == fewest])
+            host.outstanding += 1
+            metrics_collector.set_ollama_host_outstanding(host.url, host.outstanding)
+            return host
+
+    @contextmanager
+    def use(self, model: Optional[str] = None, exclude: tuple = ()) -> Iterator[str]:
+        """
+        Route one call: yields a host URL, and counts the call's outcome
+        towards that host's health.
+        """
+        host = self.pick(model, exclude)
+        try:
+            yield host.url
+        except LLMCancelled:
+            raise  # abandoned for another host's answer; says nothing about this one
+        except Exception as e:
+            self.record_failure(host.url, e)
+            raise
+        else:
+            self.record_success(host.url)
+        finally:
+            with self._lock:
+                host.outstanding -= 1
+                metrics_collector.set_ollama_host_outstanding(host.url, host.outstanding)
+
+    def record_success(self, url: str):
+        metrics_collector.record_ollama_host_request(url, "success")
+        with self._lock:
+            host = self._host(url)
+            if host is not None:
+                host.consecutive_failures = 0
+                host.ejections = 0
+
+    def record_failure(self, url: str, error: Exception):
+        metrics_collector.record_ollama_host_request(url, "error")
+        with self._lock:
+            host = self._host(url)
+            if host is None:
+                return
+            host.consecutive_failures += 1
+            host.last_error = f"{type(error).__name__}: {error}"
+            if (self.eject_failures > 0 and host.ejected_until is None
+                    and host.consecutive_failures >= self.eject_failures):
+                self._eject(host)
+
+    def _eject(self, host: OllamaHost):
+        factor = min(2 ** host.ejections, _MAX_EJECTION_FACTOR)
+        host.ejected_until = time.time() + self.eject_seconds * factor
+        host.ejections += 1
+        metrics_collector.record_ollama_host_ejection(host.url)
+        print(f"Ejected Ollama host {host.url} for {self.eject_seconds * factor:g}s: {host.last_error}")
+
+    def probe(self, host: OllamaHost):
+        """Check one host's health and models, re-admitting it if its ejection is over."""
+        from src.clients.llm import check_ollama_connection
+
+        status = check_ollama_connection(host.url, timeout=OLLAMA_PROBE_TIMEOUT)
+        now = time.time()
+        with self._lock:
+            host.last_probe = now
+            host.up = status["connected"]
+            if status["connected"]:
+                host.models = status["models"]
+                if host.ejected_until is not None and now >= host.ejected_until:
+                    host.ejected_until = None
+                    host.consecutive_failures = 0
+                    print(f"Re-admitted Ollama host {host.url}")
+            else:
+                host.last_error = status.get("error")
+        metrics_collector.set_ollama_host_available(host.url, host.available())
+
+    def probe_all(self):
+        for host in self.hosts:
+            self.probe(host)
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        with self._lock:
+            return {"hosts": [host.to_dict(now) for host in self.hosts]}
+
+
+class HostProber:
+    """Background thread that probes the pool's hosts periodically."""
+
+    def __init__(self, pool: OllamaHostPool, interval: float = OLLAMA_PROBE_INTERVAL):
+        self.pool = pool
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ollama-prober", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            self.pool.probe_all()
+            if self._stop.wait(self.interval):
+                return
+
+
+ollama_pool = OllamaHostPool(OLLAMA_HOSTS)
+ollama_prober = HostProber(ollama_pool)
@@ -2,8 +2,31 @@
 LLM Client for Composition Assistant.
 Uses Ollama for music theory transformations.
 """
-from ollama import Client
-from src.core.config import OLLAMA_HOST, OLLAMA_MODEL
+import threading
+import time
+from typing import Callable, Optional
+
+from src.core.config import (
+    OLLAMA_HOST,
+    OLLAMA_MODEL,
+    LLM_TIMEOUT,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+)
+from src.clients.hedging import race
+from src.clients.host_pool import ollama_pool
+from src.clients.router import estimate_tokens, model_router
+from src.clients.serving import llm_serving
+from src.clients.transport import LLMCancelled, LLMTimeout, OllamaTransport, get_transport
+from src.utils.metrics import metrics_collector
+from src.utils import events
+from src.utils import tracing
+
+
+def _get_client(host: str, **kwargs):
+    """Ollama client for listing and loading models (chats go through the transport)."""
+    return OllamaTransport().client(host, **kwargs)
+
 
 SYSTEM_PROMPT = """
 You are a music-theory assistant.
@@ -38,18 +61,41 @@ Do not include explanations, text, or comments. Only output valid JSON.
 """
 
 
-def query_llm(goal: str, midi_summary: str, model: str = None, host: str = None) -> str:
+def query_llm(
+    goal: str,
+    midi_summary: str,
+    model: str = None,
+    host: str = None,
+    on_token: Optional[Callable[..., None]] = None,
+    deadline: Optional[float] = None,
+    validate: Optional[Callable[[str], None]] = None,
+) -> str:
     """
     Query the LLM for music transformation.
     
+    Without an explicit ``host``, a request slower than LLM_HEDGE_PERCENTILE
+    of the model's recent latencies is hedged: a duplicate goes to another
+    healthy host, or to the next smaller model if there is none, and the
+    first valid answer wins.
+
     Args:
         goal: User's transformation goal/instructions
         midi_summary: JSON representation of MIDI notes
         model: Ollama model to use (defaults to config)
-        host: Ollama host URL (defaults to config)
+        host: Ollama host URL (by default the pool picks the least loaded
+            healthy host of OLLAMA_HOSTS)
+        on_token: If given, called as ``on_token(tokens_so_far)`` per
+            streamed chunk and ``on_token(total, done=True)`` at the end
+        deadline: ``time.time()`` by which to give up (defaults to
+            LLM_TIMEOUT from now)
+        validate: Raises ValueError or TypeError for an unusable response,
+            which then loses to a hedged request's answer
     
     Returns:
         LLM response with transformed JSON notes
+
+    Raises:
+        LLMTimeout: No answer before the deadline
     """
     prompt = f"""
 Goal: {goal}
@@ -61,29 +107,159 @@ Return transformation actions.
 """
 
     # Use provided values or fall back to config
-    ollama_host = host or OLLAMA_HOST
     ollama_model = model or OLLAMA_MODEL
+    prompt_tokens = estimate_tokens(midi_summary, goal, SYSTEM_PROMPT)
+    if deadline is None and LLM_TIMEOUT > 0:
+        deadline = time.time() + LLM_TIMEOUT
+
+    # Progress comes from whichever request streams first
+    streaming, counts = [], {}
+
+    def reporter(name: str):
+        if on_token is None:
+            return None
+
+        def report(tokens: int):
+            counts[name] = tokens
+            if not streaming:
+                streaming.append(name)
+            if streaming[0] == name:
+                on_token(tokens)
 
-    # Create client with configured host
-    client = Client(host=ollama_host)
+        return report
 
-    response = client.chat(
-        model=ollama_model,
-        messages=[
+    hosts = {}
+
+    def request(name: str, request_model: str, elsewhere: bool = False):
+        def send(cancelled):
+            if host:
+                return _query_host(host, request_model, prompt, prompt_tokens, reporter(name),
+                                   deadline, cancelled)
+            exclude = (hosts["primary"],) if elsewhere and "primary" in hosts else ()
+            with ollama_pool.use(request_model, exclude) as ollama_host:
+                hosts[name] = ollama_host
+                return _query_host(ollama_host, request_model, prompt, prompt_tokens, reporter(name),
+                                   deadline, cancelled)
+
+        return send
+
+    hedge, hedge_after, hedged = None, None, []
+    target = None if host else _hedge_target(ollama_model)
+    if target is not None and LLM_HEDGE_PERCENTILE > 0:
+        hedge_after = model_router.percentile_seconds(ollama_model, prompt_tokens, LLM_HEDGE_PERCENTILE,
+                                                      LLM_HEDGE_MIN_SAMPLES)
+    if hedge_after is not None:
+        kind, hedge_model = target
+        send_hedge = request("hedge", hedge_model, elsewhere=kind == "host")
+
+        def send_hedge_request(cancelled):
+            hedged.append(time.time())
+            events.emit("llm_hedge", kind=kind, model=hedge_model, after=round(hedge_after, 3))
+            return send_hedge(cancelled)
+
+        hedge = send_hedge_request
+
+    winner = "none"
+    try:
+        content, winner = race(request("primary", ollama_model), hedge, hedge_after, deadline, validate)
+    except LLMTimeout:
+        metrics_collector.record_llm_timeout(ollama_model)
+        raise
+    finally:
+        if hedged:
+            metrics_collector.record_llm_hedge(kind, winner)
+            tracing.set_attributes(llm_hedge=kind, llm_winner=winner)
+    if on_token is not None:
+        on_token(counts.get(winner, 0), done=True)
+    return content
+
+
+def _hedge_target(model: str) -> Optional[tuple]:
+    """
+    Where a hedge of a request on ``model`` goes, as (kind, model): the same
+    model on another available host, else the next smaller routed model.
+    """
+    if len(ollama_pool.available(model)) > 1:
+        return "host", model
+    names = model_router.names
+    if model in names and names.index(model) > 0:
+        return "model", names[names.index(model) - 1]
+    return None
+
+
+def _query_host(ollama_host: str, ollama_model: str, prompt: str, prompt_tokens: int,
+                on_token: Optional[Callable[[int], None]], deadline: Optional[float] = None,
+                cancelled: Optional[threading.Event] = None) -> str:
+    """Send one edit request to one Ollama host through the LLM transport."""
+    # keep_alive and a num_ctx that fits this prompt
+    chat_options = llm_serving.request_options(ollama_host, ollama_model, prompt_tokens)
+
+    @metrics_collector.track_llm_request(ollama_model)
+    def _chat() -> str:
+        messages = [
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt},
-        ],
+        ]
+        with tracing.span("ollama_chat", model=ollama_model, host=ollama_host, stream=on_token is not None,
+                          num_ctx=chat_options["options"]["num_ctx"]):
+            start_time = time.time()
+            response = get_transport().chat(ollama_host, ollama_model, messages, chat_options,
+                                            deadline=deadline, on_token=on_token, cancelled=cancelled)
+            _trace_llm_phases(response)
+        # Teach the router this model's speed
+        tokens = (response.get("prompt_eval_count") or 0) + (response.get("eval_count") or 0)
+        model_router.observe(ollama_model, tokens, time.time() - start_time)
+        return response["message"]["content"]
+
+    # Wait for one of the host's parallel slots; the wait isn't request latency
+    with llm_serving.slot(ollama_host, deadline, cancelled):
+        if cancelled is not None and cancelled.is_set():
+            raise LLMCancelled(f"{ollama_model} on {ollama_host}")
+        return _chat()
+
+
+def _trace_llm_phases(response) -> None:
+    """
+    Record Ollama's server-side phases as child spans of the current span.
+
+    Ollama reports durations (in nanoseconds) but not timestamps, so the
+    phases are laid out back to back, ending when the response arrived.
+    """
+    end = time.time()
+    load = (response.get("load_duration") or 0) / 1e9
+    prompt_eval = (response.get("prompt_eval_duration") or 0) / 1e9
+    generation = (response.get("eval_duration") or 0) / 1e9
+
+    tracing.set_attributes(
+        prompt_tokens=response.get("prompt_eval_count"),
+        completion_tokens=response.get("eval_count"),
     )
 
-    return response["message"]["content"]
+    start = end - (load + prompt_eval + generation)
+    parent = tracing.current_span()
+    if parent is not None:
+        start = max(start, parent.start)
+    if load:
+        tracing.add_span("model_load", start, start + load)
+    start += load
+    tracing.add_span(
+        "prompt_eval", start, start + prompt_eval,
+        tokens=response.get("prompt_eval_count"),
+    )
+    start += prompt_eval
+    tracing.add_span(
+        "generation", start, start + generation,
+        tokens=response.get("eval_count"),
+    )
 
 
-def check_ollama_connection(host: str = None) -> dict:
+def check_ollama_connection(host: str = None, timeout: Optional[float] = None) -> dict:
     """
     Check if Ollama is accessible and list available models.
     
     Args:
         host: Ollama host URL (defaults to config)
+        timeout: Seconds to wait for the host (no limit by default)
     
     Returns:
         Dict with connection status and available models
@@ -91,9 +267,10 @@ def check_ollama_connection(host: str = None) -> dict:
     ollama_host = host or OLLAMA_HOST
     
     try:
-        client = Client(host=ollama_host)
+        client = _get_client(ollama_host, timeout=timeout)
         models = client.list()
-        model_names = [m["name"] for m in models.get("models", [])]
+        # Current ollama clients name the field "model"; older servers sent "name"
+        model_names = [m.get("model") or m.get("name") for m in models.get("models", [])]
         
         return {
             "connected": True,
@@ -111,3 +288,18 @@ def check_ollama_connection(host: str = None) -> dict:
             "configured_model": OLLAMA_MODEL,
             "model_available": False,
         }
+
+
+def warm_up_model(model: str = None, host: str = None) -> None:
+    """
+    Ask Ollama to load a model into memory ahead of the first request.
+
+    An empty generate call loads the model without producing any tokens,
+    with the serving manager's keep_alive so it stays resident.
+
+    Args:
+        model: Ollama model to load (defaults to config)
+        host: Ollama host URL (defaults to config)
+    """
+    ollama_host = host or OLLAMA_HOST
+    llm_serving.prewarm(_get_client(ollama_host), ollama_host, model or OLLAMA_MODEL)
@@ -0,0 +1,200 @@
+"""
+LLM model routing.
+
+Picks one of the configured Ollama models per request: small models for small
+or simple edits ("transpose up a step" on 20 notes), larger ones as the
+prompt grows or the goal needs more music theory (a modal reharmonization of
+3,000 notes). A caller's latency budget can trade size for speed, and a
+response that fails validation is retried on the next larger model.
+"""
+
+import math
+import re
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+from src.core.config import OLLAMA_MODEL, OLLAMA_MODELS
+from src.utils.metrics import metrics_collector
+
+# Goal categories by keyword, most demanding first. Each category's weight
+# scales the prompt size when matching it against the models' capacities.
+# Keywords match whole words; a trailing "*" makes one a stem that matches
+# any word starting with it ("harmon*" for harmony, harmonize...).
+GOAL_CATEGORIES = (
+    ("harmonic", 2.0, ("harmon*", "reharmon*", "chord*", "modal", "mode", "modes", "scale", "scales",
+                       "key", "keys", "minor", "major", "dorian", "lydian", "mixolydian", "phrygian",
+                       "locrian", "counterpoint")),
+    ("rhythmic", 1.5, ("rhythm*", "swing*", "syncopat*", "tempo", "tempos", "groove*", "quantiz*",
+                       "triplet*", "shuffle*", "faster", "slower")),
+    ("simple", 1.0, ("transpos*", "octave*", "up", "down", "louder", "softer", "velocity", "shift*",
+                     "semitone*", "step", "steps")),
+)
+_DEFAULT_CATEGORY = ("general", 1.5)
+
+# Rough characters per token for the JSON-ish prompts sent to Ollama
+_CHARS_PER_TOKEN = 4
+# Weight of the newest observation in the per-model seconds-per-token average
+_EWMA_ALPHA = 0.2
+# Recent responses per model kept for latency percentiles
+_LATENCY_WINDOW = 200
+
+
+def parse_models(spec: str, default_model: str = OLLAMA_MODEL) -> List[dict]:
+    """
+    Parse OLLAMA_MODELS ("name=max_tokens,...", smallest first) into
+    ``[{"name", "max_tokens"}]``. The last model is always unbounded.
+    """
+    models = []
+    for entry in (e.strip() for e in spec.split(",")):
+        if not entry:
+            continue
+        name, _, limit = entry.rpartition("=")
+        if not name:
+            name, limit = limit, ""
+        models.append({"name": name.strip(), "max_tokens": int(limit) if limit.strip() else None})
+    if not models:
+        models = [{"name": default_model, "max_tokens": None}]
+    models[-1]["max_tokens"] = None
+    return models
+
+
+def _matches(word: str, keyword: str) -> bool:
+    if keyword.endswith("*"):
+        return word.startswith(keyword[:-1])
+    return word == keyword
+
+
+def classify_goal(goal: str) -> tuple:
+    """(category, weight) of a goal from its keywords."""
+    words = re.findall(r"[a-z]+", goal.lower())
+    for category, weight, keywords in GOAL_CATEGORIES:
+        if any(_matches(word, keyword) for word in words for keyword in keywords):
+            return category, weight
+    return _DEFAULT_CATEGORY
+
+
+def estimate_tokens(notes_json, goal: str, system_prompt: str = "") -> int:
+    """Prompt tokens of an edit request, from the length of what is sent."""
+    return (len(str(notes_json)) + len(goal) + len(system_prompt)) // _CHARS_PER_TOKEN
+
+
+class Route:
+    """A routing decision: the model to try first, then larger fallbacks."""
+
+    def __init__(self, models: List[str], category: str, reason: str, tokens: int,
+                 estimated_seconds: Optional[float]):
+        self.models = models
+        self.category = category
+        self.reason = reason
+        self.tokens = tokens
+        self.estimated_seconds = estimated_seconds
+
+    @property
+    def model(self) -> str:
+        return self.models[0]
+
+    def to_dict(self) -> dict:
+        return {
+            "model": self.model,
+            "fallbacks": self.models[1:],
+            "category": self.category,
+            "reason": self.reason,
+            "tokens": self.tokens,
+            "estimated_seconds": self.estimated_seconds,
+        }
+
+
+class ModelRouter:
+    """
+    Routes edit requests across models ordered from smallest to largest.
+
+    Latency estimates come from each model's observed seconds per token
+    (prompt plus completion). A model not yet observed is assumed to fit
+    any budget until its first response.
+    """
+
+    def __init__(self, models: Optional[List[dict]] = None):
+        self.models = models or parse_models(OLLAMA_MODELS)
+        self._seconds_per_token: Dict[str, float] = {}
+        self._recent_rates: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def names(self) -> List[str]:
+        return [m["name"] for m in self.models]
+
+    def estimate_seconds(self, model: str, tokens: int) -> Optional[float]:
+        """Expected latency of a request; the response is about as long as the prompt."""
+        with self._lock:
+            rate = self._seconds_per_token.get(model)
+        return None if rate is None else round(rate * tokens * 2, 3)
+
+    def percentile_seconds(self, model: str, tokens: int, percentile: float,
+                           min_samples: int = 1) -> Optional[float]:
+        """
+        The ``percentile`` latency of a ``tokens``-sized request on ``model``,
+        from its recent responses; None until it has ``min_samples`` of them.
+        """
+        with self._lock:
+            rates = sorted(self._recent_rates.get(model, ()))
+        if not rates or len(rates) < min_samples:
+            return None
+        index = min(len(rates) - 1, max(0, math.ceil(percentile / 100 * len(rates)) - 1))
+        return rates[index] * tokens * 2
+
+    def route(self, notes_json, goal: str, latency_budget: Optional[float] = None,
+              system_prompt: str = "") -> Route:
+        """
+        Choose a model for editing ``notes_json`` towards ``goal``.
+
+        The first model whose capacity covers the complexity-weighted prompt
+        size is chosen. If its estimated latency exceeds ``latency_budget``
+        (seconds), smaller models are tried until one fits. Larger models
+        follow as fallbacks for invalid output.
+        """
+        tokens = estimate_tokens(notes_json, goal, system_prompt)
+        category, weight = classify_goal(goal)
+        if len(self.models) == 1:
+            index, reason = 0, "single_model"
+        else:
+            weighted = tokens * weight
+            index = next(
+                i for i, m in enumerate(self.models)
+                if m["max_tokens"] is None or weighted <= m["max_tokens"]
+            )
+            reason = "complexity"
+            if latency_budget is not None:
+                while index > 0 and (self.estimate_seconds(self.models[index]["name"], tokens) or 0) > latency_budget:
+                    index -= 1
+                    reason = "latency_budget"
+
+        names = self.names[index:]
+        route = Route(names, category, reason, tokens, self.estimate_seconds(names[0], tokens))
+        metrics_collector.record_llm_route(route.model, category, reason)
+        return route
+
+    def observe(self, model: str, tokens: Optional[int], seconds: float):
+        """Learn a model's speed from a completed request."""
+        if not tokens:
+            return
+        with self._lock:
+            rate = self._seconds_per_token.get(model, seconds / tokens)
+            self._seconds_per_token[model] = rate + _EWMA_ALPHA * (seconds / tokens - rate)
+            self._recent_rates.setdefault(model, deque(maxlen=_LATENCY_WINDOW)).append(seconds / tokens)
+
+    def record_fallback(self, from_model: str, to_model: str):
+        metrics_collector.record_llm_fallback(from_model, to_model)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            rates = dict(self._seconds_per_token)
+        return {
+            "models": [
+                {**m, "seconds_per_token": round(rates[m["name"]], 5) if m["name"] in rates else None}
+                for m in self.models
+            ],
+        }
+
+
+model_router = ModelRouter()
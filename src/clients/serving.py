@@ -0,0 +1,220 @@
+"""
+LLM serving management for Ollama.
+
+Keeps models loaded and requests shaped so Ollama serves them without
+reloading or thrashing:
+
+* models are pre-loaded at startup and kept resident with ``keep_alive``;
+* ``num_ctx`` is sized from the prompt's token estimate. Ollama reloads a
+  model whenever ``num_ctx`` changes, so the context loaded for a model is
+  reused while it is large enough, and only grows (in powers of two);
+* in-flight calls per host are capped at the server's parallelism
+  (OLLAMA_NUM_PARALLEL on the Ollama side). Callers beyond the cap wait in a
+  fair queue that takes turns between jobs, so one job's fan-out of variants
+  cannot starve another job's single call. The cap is kept per process, so
+  with several server workers each gets an equal share of it (at least one
+  call, so a host may see up to one call per worker).
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Hashable, Optional, Tuple
+
+from src.core.config import (
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_MAX_PARALLEL,
+    OLLAMA_NUM_CTX_MIN,
+    OLLAMA_NUM_CTX_MAX,
+    WEB_CONCURRENCY,
+)
+from src.clients.transport import LLMCancelled, LLMTimeout, remaining
+from src.utils import events
+from src.utils import tracing
+from src.utils.metrics import metrics_collector
+
+# Tokens reserved on top of the prompt and the expected response
+_CTX_MARGIN = 256
+# How often a cancellable wait for a slot checks its cancellation
+_CANCEL_POLL_SECONDS = 0.05
+
+
+class FairSlots:
+    """
+    A counting semaphore whose waiters are served round-robin by owner
+    (FIFO within one owner) instead of in plain arrival order.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._cond = threading.Condition()
+        self._queues: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self._active = 0
+
+    def _head(self):
+        for queue in self._queues.values():
+            return queue[0]
+        return None
+
+    def acquire(self, owner: Hashable, timeout: Optional[float] = None,
+                cancelled: Optional[threading.Event] = None) -> bool:
+        """
+        Wait for a slot; False if ``timeout`` seconds passed first or
+        ``cancelled`` was set while waiting.
+        """
+        waiter = object()
+        end = None if timeout is None else time.time() + timeout
+        with self._cond:
+            self._queues.setdefault(owner, deque()).append(waiter)
+            while self._active >= self.limit or self._head() is not waiter:
+                left = None if end is None else end - time.time()
+                if (left is not None and left <= 0) or (cancelled is not None and cancelled.is_set()):
+                    self._withdraw(owner, waiter)
+                    return False
+                if cancelled is not None:
+                    # Setting the event doesn't wake the condition: check it regularly
+                    left = _CANCEL_POLL_SECONDS if left is None else min(left, _CANCEL_POLL_SECONDS)
+                self._cond.wait(left)
+            queue = self._queues.pop(owner)
+            queue.popleft()
+            if queue:
+                self._queues[owner] = queue  # back of the line for its next call
+            self._active += 1
+            # The next waiter may be able to go too
+            self._cond.notify_all()
+            return True
+
+    def _withdraw(self, owner: Hashable, waiter):
+        queue = self._queues[owner]
+        queue.remove(waiter)
+        if not queue:
+            del self._queues[owner]
+        # It may have been at the head, holding others up
+        self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "in_flight": self._active,
+                "waiting": sum(len(q) for q in self._queues.values()),
+            }
+
+
+def _owner() -> Hashable:
+    """Fairness key of the calling work: its job, else its trace, else its thread."""
+    job = events.current()
+    if job is not None:
+        return job.job_id
+    trace = tracing.current_trace()
+    if trace is not None:
+        return trace.trace_id
+    return threading.get_ident()
+
+
+class LLMServingManager:
+    """Per-host concurrency slots and per-model context sizing for Ollama."""
+
+    def __init__(self, max_parallel: int = OLLAMA_MAX_PARALLEL, keep_alive: str = OLLAMA_KEEP_ALIVE,
+                 num_ctx_min: int = OLLAMA_NUM_CTX_MIN, num_ctx_max: int = OLLAMA_NUM_CTX_MAX,
+                 workers: int = WEB_CONCURRENCY):
+        """
+        Args:
+            max_parallel: In-flight calls allowed per Ollama host, across all
+                ``workers`` processes
+            keep_alive: How long Ollama keeps a model loaded after a call
+                (Ollama duration such as "30m"; "-1" keeps it forever)
+            num_ctx_min / num_ctx_max: Bounds of the context window requested
+            workers: Server processes sharing the hosts
+        """
+        self.max_parallel = max(1, max_parallel // max(1, workers))
+        self.keep_alive = keep_alive
+        # The context grows by doubling from here, so it must be positive
+        self.num_ctx_min = max(1, num_ctx_min)
+        self.num_ctx_max = num_ctx_max
+        self._lock = threading.Lock()
+        self._slots: Dict[str, FairSlots] = {}
+        self._loaded_ctx: Dict[Tuple[str, str], int] = {}
+
+    def _slots_for(self, host: str) -> FairSlots:
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = FairSlots(self.max_parallel)
+            return self._slots[host]
+
+    @contextmanager
+    def slot(self, host: str, deadline: Optional[float] = None,
+             cancelled: Optional[threading.Event] = None):
+        """
+        Hold one of ``host``'s parallel slots for the enclosed call.
+
+        Raises:
+            LLMTimeout: No slot freed up before ``deadline``
+            LLMCancelled: ``cancelled`` was set while waiting
+        """
+        slots = self._slots_for(host)
+        start_time = time.time()
+        acquired = slots.acquire(_owner(), remaining(deadline), cancelled)
+        waited = time.time() - start_time
+        metrics_collector.record_llm_slot_wait(host, waited)
+        if waited > 0.001:
+            tracing.add_span("llm_queue", start_time, start_time + waited, host=host)
+        if not acquired:
+            if cancelled is not None and cancelled.is_set():
+                raise LLMCancelled(f"Abandoned while waiting for a slot on {host}")
+            raise LLMTimeout(f"No free slot on {host} before the deadline")
+        metrics_collector.set_llm_in_flight(host, slots.snapshot()["in_flight"])
+        try:
+            yield
+        finally:
+            slots.release()
+            metrics_collector.set_llm_in_flight(host, slots.snapshot()["in_flight"])
+
+    def num_ctx(self, host: str, model: str, prompt_tokens: int) -> int:
+        """
+        Context window for a prompt of ``prompt_tokens``: room for the prompt,
+        a response about as long (the edited notes) and a margin. Reuses the
+        model's current context when it is big enough to avoid a reload.
+        """
+        needed = min(self.num_ctx_max, 2 * prompt_tokens + _CTX_MARGIN)
+        with self._lock:
+            loaded = self._loaded_ctx.get((host, model), 0)
+            if loaded >= needed:
+                return loaded
+            size = self.num_ctx_min
+            while size < needed:
+                size *= 2
+            size = min(size, self.num_ctx_max)
+            self._loaded_ctx[(host, model)] = size
+            return size
+
+    def request_options(self, host: str, model: str, prompt_tokens: int) -> dict:
+        """Keyword arguments for ``Client.chat`` beyond model and messages."""
+        return {
+            "keep_alive": self.keep_alive,
+            "options": {"num_ctx": self.num_ctx(host, model, prompt_tokens)},
+        }
+
+    def prewarm(self, client, host: str, model: str):
+        """Load ``model`` on ``host`` with the smallest context and keep it resident."""
+        num_ctx = self.num_ctx(host, model, 0)
+        client.generate(model=model, prompt="", keep_alive=self.keep_alive, options={"num_ctx": num_ctx})
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            hosts = dict(self._slots)
+            loaded = dict(self._loaded_ctx)
+        return {
+            "keep_alive": self.keep_alive,
+            "hosts": {host: slots.snapshot() for host, slots in hosts.items()},
+            "num_ctx": {f"{host} {model}": ctx for (host, model), ctx in loaded.items()},
+        }
+
+
+llm_serving = LLMServingManager()
@@ -0,0 +1,125 @@
+"""
+Transport for LLM chat requests.
+
+``query_llm`` sends every request (including hedges) through the transport
+returned by ``get_transport``. The default speaks the Ollama HTTP API with
+the ollama library, so pointing OLLAMA_HOSTS at a local stub server (see
+benchmarks/fake_ollama.py) exercises the real code path; ``set_transport``
+swaps in another implementation, e.g. an in-process fake.
+
+A transport honours a deadline (absolute ``time.time()``) and a cancellation
+event. Cancellation is checked between streamed chunks: a blocking HTTP read
+can't be interrupted from another thread, but Ollama stops generating as
+soon as the client disconnects, so a cancelled request frees the server
+after at most one more token.
+"""
+
+import time
+import threading
+from typing import Callable, Optional
+
+
+class LLMTimeout(TimeoutError):
+    """An LLM request did not answer before its deadline."""
+
+    metric_status = "timeout"
+
+
+class LLMCancelled(Exception):
+    """An LLM request was abandoned because another one answered first."""
+
+    metric_status = "cancelled"
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until ``deadline``; raises LLMTimeout once it has passed."""
+    if deadline is None:
+        return None
+    left = deadline - time.time()
+    if left <= 0:
+        raise LLMTimeout("LLM request deadline exceeded")
+    return left
+
+
+def _as_dict(response) -> dict:
+    """Current ollama clients return pydantic models, older ones dicts."""
+    return response.model_dump() if hasattr(response, "model_dump") else dict(response)
+
+
+class OllamaTransport:
+    """Sends chat requests to an Ollama host over HTTP."""
+
+    def client(self, host: str, **kwargs):
+        """Create an Ollama client, importing the library on first use."""
+        from ollama import Client
+
+        return Client(host=host, **kwargs)
+
+    def chat(self, host: str, model: str, messages: list, options: dict,
+             deadline: Optional[float] = None,
+             on_token: Optional[Callable[[int], None]] = None,
+             cancelled: Optional[threading.Event] = None) -> dict:
+        """
+        Send one chat request.
+
+        The response is streamed when ``on_token`` or ``cancelled`` is given,
+        calling ``on_token(tokens_so_far)`` per chunk and checking both the
+        deadline and ``cancelled`` in between.
+
+        Returns:
+            Ollama's final response, with the full text in ``message.content``
+
+        Raises:
+            LLMTimeout: The deadline passed (also bounds each HTTP read)
+            LLMCancelled: ``cancelled`` was set
+        """
+        import httpx
+
+        try:
+            return self._chat(host, model, messages, options, deadline, on_token, cancelled)
+        except httpx.TimeoutException as e:
+            raise LLMTimeout(f"{model} on {host} did not answer before the deadline") from e
+
+    def _chat(self, host, model, messages, options, deadline, on_token, cancelled) -> dict:
+        client = self.client(host, timeout=remaining(deadline))
+        if on_token is None and cancelled is None:
+            return _as_dict(client.chat(model=model, messages=messages, **options))
+
+        parts = []
+        tokens = 0
+        final = None
+        stream = client.chat(model=model, messages=messages, stream=True, **options)
+        try:
+            for chunk in stream:
+                if cancelled is not None and cancelled.is_set():
+                    raise LLMCancelled(f"{model} on {host}")
+                remaining(deadline)
+                text = chunk["message"]["content"]
+                if text:
+                    parts.append(text)
+                    tokens += 1
+                    if on_token is not None:
+                        on_token(tokens)
+                final = chunk
+        finally:
+            # Closing the stream drops the connection, which stops generation
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        response = _as_dict(final) if final is not None else {}
+        response["message"] = {"role": "assistant", "content": "".join(parts)}
+        response["eval_count"] = response.get("eval_count") or tokens
+        return response
+
+
+_transport = OllamaTransport()
+
+
+def get_transport():
+    return _transport
+
+
+def set_transport(transport):
+    """Route LLM requests through ``transport`` (anything with OllamaTransport's ``chat``)."""
+    global _transport
+    _transport = transport
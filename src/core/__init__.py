@@ -3,14 +3,60 @@ from .config import (
     OLLAMA_HOST,
     OLLAMA_MODEL,
     OLLAMA_API_KEY,
+    OLLAMA_HOSTS,
+    OLLAMA_PROBE_INTERVAL,
+    OLLAMA_PROBE_TIMEOUT,
+    OLLAMA_EJECT_FAILURES,
+    OLLAMA_EJECT_SECONDS,
+    OLLAMA_MODELS,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_NUM_CTX_MIN,
+    OLLAMA_NUM_CTX_MAX,
+    OLLAMA_MAX_PARALLEL,
+    LLM_TIMEOUT,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_REQUEST_WORKERS,
     SOUNDFONT_PATH,
     API_HOST,
+    WEB_CONCURRENCY,
     API_PORT,
     UI_PORT,
     LOG_LEVEL,
+    PIPELINE_WORKERS,
+    VARIANTS_MAX_GOALS,
+    VARIANT_WORKERS,
+    TRACK_WORKERS,
+    NOTE_REDUCTION,
+    NOTE_MIN_DURATION,
+    NOTE_MIN_VELOCITY,
+    NOTE_ONSET_WINDOW,
+    NOTE_QUANTIZE_GRID,
+    COALESCE_REQUESTS,
+    ADMISSION_MAX_QUEUED,
+    ADMISSION_MAX_COST_SECONDS,
+    BATCH_MAX_ITEMS,
+    BATCH_HISTORY_SIZE,
+    JOB_STORE_PATH,
+    JOB_HEARTBEAT_INTERVAL,
+    JOB_RESUME_ON_STARTUP,
+    TRACE_BUFFER_SIZE,
+    JOB_EVENTS_BUFFER_SIZE,
+    METRICS_SAMPLE_INTERVAL,
+    METRICS_TRACEMALLOC,
+    METRICS_MULTIPROC_DIR,
+    METRICS_CACHE_TTL,
+    DEBUG_PROFILE_TOKEN,
+    DEBUG_PROFILE_MAX_SECONDS,
+    WARMUP_ON_STARTUP,
+    WARMUP_RETRY_INTERVAL,
     PROJECT_ROOT,
     TMP_INPUT_PATH,
     TMP_OUTPUT_PATH,
+    ARTIFACT_STORE_PATH,
+    ARTIFACT_TTL_SECONDS,
+    ARTIFACT_MAX_BYTES,
+    ARTIFACT_GC_INTERVAL,
     validate_config,
     get_config_summary,
 )
@@ -19,14 +65,60 @@ __all__ = [
     "OLLAMA_HOST",
     "OLLAMA_MODEL",
     "OLLAMA_API_KEY",
+    "OLLAMA_HOSTS",
+    "OLLAMA_PROBE_INTERVAL",
+    "OLLAMA_PROBE_TIMEOUT",
+    "OLLAMA_EJECT_FAILURES",
+    "OLLAMA_EJECT_SECONDS",
+    "OLLAMA_MODELS",
+    "OLLAMA_KEEP_ALIVE",
+    "OLLAMA_NUM_CTX_MIN",
+    "OLLAMA_NUM_CTX_MAX",
+    "OLLAMA_MAX_PARALLEL",
+    "LLM_TIMEOUT",
+    "LLM_HEDGE_PERCENTILE",
+    "LLM_HEDGE_MIN_SAMPLES",
+    "LLM_REQUEST_WORKERS",
     "SOUNDFONT_PATH",
     "API_HOST",
+    "WEB_CONCURRENCY",
     "API_PORT",
     "UI_PORT",
     "LOG_LEVEL",
+    "PIPELINE_WORKERS",
+    "VARIANTS_MAX_GOALS",
+    "VARIANT_WORKERS",
+    "TRACK_WORKERS",
+    "NOTE_REDUCTION",
+    "NOTE_MIN_DURATION",
+    "NOTE_MIN_VELOCITY",
+    "NOTE_ONSET_WINDOW",
+    "NOTE_QUANTIZE_GRID",
+    "COALESCE_REQUESTS",
+    "ADMISSION_MAX_QUEUED",
+    "ADMISSION_MAX_COST_SECONDS",
+    "BATCH_MAX_ITEMS",
+    "BATCH_HISTORY_SIZE",
+    "JOB_STORE_PATH",
+    "JOB_HEARTBEAT_INTERVAL",
+    "JOB_RESUME_ON_STARTUP",
+    "TRACE_BUFFER_SIZE",
+    "JOB_EVENTS_BUFFER_SIZE",
+    "METRICS_SAMPLE_INTERVAL",
+    "METRICS_TRACEMALLOC",
+    "METRICS_MULTIPROC_DIR",
+    "METRICS_CACHE_TTL",
+    "DEBUG_PROFILE_TOKEN",
+    "DEBUG_PROFILE_MAX_SECONDS",
+    "WARMUP_ON_STARTUP",
+    "WARMUP_RETRY_INTERVAL",
     "PROJECT_ROOT",
     "TMP_INPUT_PATH",
     "TMP_OUTPUT_PATH",
+    "ARTIFACT_STORE_PATH",
+    "ARTIFACT_TTL_SECONDS",
+    "ARTIFACT_MAX_BYTES",
+    "ARTIFACT_GC_INTERVAL",
     "validate_config",
     "get_config_summary",
 ]
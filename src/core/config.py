@@ -13,15 +13,105 @@ load_dotenv(dotenv_path=env_path)
 OLLAMA_HOST: str = os.getenv("OLLAMA_HOST", "http://host.docker.internal:11434")
 OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "qwen2.5:7b")
 OLLAMA_API_KEY: str = os.getenv("OLLAMA_API_KEY", "")  # Optional for cloud
+# Ollama host pool: comma-separated base URLs (defaults to OLLAMA_HOST), how
+# often hosts are health-checked, and consecutive failed calls that eject a host
+# for OLLAMA_EJECT_SECONDS (doubling on repeats)
+OLLAMA_HOSTS: list[str] = [
+    h.strip() for h in os.getenv("OLLAMA_HOSTS", OLLAMA_HOST).split(",") if h.strip()
+] or [OLLAMA_HOST]
+OLLAMA_PROBE_INTERVAL: float = float(os.getenv("OLLAMA_PROBE_INTERVAL", "15"))
+OLLAMA_PROBE_TIMEOUT: float = float(os.getenv("OLLAMA_PROBE_TIMEOUT", "5"))
+OLLAMA_EJECT_FAILURES: int = int(os.getenv("OLLAMA_EJECT_FAILURES", "3"))
+OLLAMA_EJECT_SECONDS: float = float(os.getenv("OLLAMA_EJECT_SECONDS", "30"))
+# Model routing: comma-separated models from smallest to largest, each with the
+# largest (complexity-weighted) prompt in tokens it handles, e.g.
+# "qwen2.5:3b=1500,qwen2.5:7b=6000,qwen2.5:14b"; the last one takes the rest.
+# Empty routes everything to OLLAMA_MODEL.
+OLLAMA_MODELS: str = os.getenv("OLLAMA_MODELS", "")
+# LLM serving: how long Ollama keeps models loaded after a call ("-1" = forever),
+# the bounds of the context window sized per prompt, and in-flight calls per
+# host (match the server's OLLAMA_NUM_PARALLEL)
+OLLAMA_KEEP_ALIVE: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_NUM_CTX_MIN: int = max(1, int(os.getenv("OLLAMA_NUM_CTX_MIN", "4096")))
+OLLAMA_NUM_CTX_MAX: int = int(os.getenv("OLLAMA_NUM_CTX_MAX", "32768"))
+OLLAMA_MAX_PARALLEL: int = int(os.getenv("OLLAMA_MAX_PARALLEL", "1"))
+# LLM deadlines and hedging: seconds an LLM call may take, slot wait included
+# (0 = no limit), and the latency percentile of the model's recent responses
+# after which a duplicate request goes to another host or a smaller model
+# (0 disables hedging; needs LLM_HEDGE_MIN_SAMPLES responses first)
+LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Threads sending LLM requests (primaries and hedges), shared by all calls
+LLM_REQUEST_WORKERS: int = int(os.getenv("LLM_REQUEST_WORKERS", "32"))
 
 # Audio Processing settings
 SOUNDFONT_PATH: str = os.getenv("SOUNDFONT_PATH", "/app/FluidR3_GM/FluidR3_GM.sf2")
 
 # Server settings
 API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
+# Server processes sharing the Ollama hosts (gunicorn/uvicorn workers); each
+# process gets its share of OLLAMA_MAX_PARALLEL
+WEB_CONCURRENCY: int = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
 API_PORT: int = int(os.getenv("API_PORT", "8000"))
 UI_PORT: int = int(os.getenv("UI_PORT", "3000"))
 
+# Pipeline settings
+PIPELINE_WORKERS: int = int(os.getenv("PIPELINE_WORKERS", "1"))
+
+# Variants: most goals accepted in one request, and threads running variants
+# (LLM call + render) concurrently across all jobs
+VARIANTS_MAX_GOALS: int = int(os.getenv("VARIANTS_MAX_GOALS", "8"))
+VARIANT_WORKERS: int = int(os.getenv("VARIANT_WORKERS", "4"))
+# Multi-track inputs: threads editing tracks (one LLM call each) and rendering
+# them concurrently across all jobs; LLM calls mostly wait, so at least 4
+TRACK_WORKERS: int = int(os.getenv("TRACK_WORKERS", str(max(4, os.cpu_count() or 1))))
+
+# Note reduction before the LLM: inputs it applies to ("audio" transcriptions,
+# "all" inputs, or "off"); notes shorter (seconds) or quieter than the minimums
+# are dropped, same-pitch notes that overlap or start in the same
+# NOTE_ONSET_WINDOW-second bucket are merged, and times snap to
+# NOTE_QUANTIZE_GRID seconds (0 = off)
+NOTE_REDUCTION: str = os.getenv("NOTE_REDUCTION", "audio").lower()
+NOTE_MIN_DURATION: float = float(os.getenv("NOTE_MIN_DURATION", "0.03"))
+NOTE_MIN_VELOCITY: int = int(os.getenv("NOTE_MIN_VELOCITY", "10"))
+NOTE_ONSET_WINDOW: float = float(os.getenv("NOTE_ONSET_WINDOW", "0.03"))
+NOTE_QUANTIZE_GRID: float = float(os.getenv("NOTE_QUANTIZE_GRID", "0"))
+
+# Coalesce identical concurrent work (same input, goal and model): whole jobs,
+# transcriptions and LLM calls run once and every caller gets the result
+COALESCE_REQUESTS: bool = os.getenv("COALESCE_REQUESTS", "true").lower() in ("1", "true", "yes")
+
+# Admission control: jobs waiting beyond PIPELINE_WORKERS, and the budget of
+# estimated cost (seconds of audio) across admitted jobs (0 disables it)
+ADMISSION_MAX_QUEUED: int = int(os.getenv("ADMISSION_MAX_QUEUED", "8"))
+ADMISSION_MAX_COST_SECONDS: float = float(os.getenv("ADMISSION_MAX_COST_SECONDS", "1800"))
+
+# Batch settings: largest manifest accepted, and how many recent batches are kept
+BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_HISTORY_SIZE: int = int(os.getenv("BATCH_HISTORY_SIZE", "50"))
+
+# Tracing settings
+TRACE_BUFFER_SIZE: int = int(os.getenv("TRACE_BUFFER_SIZE", "100"))
+
+# Progress events: number of recent jobs whose status and event stream are kept
+JOB_EVENTS_BUFFER_SIZE: int = int(os.getenv("JOB_EVENTS_BUFFER_SIZE", "100"))
+
+# Metrics settings
+METRICS_SAMPLE_INTERVAL: float = float(os.getenv("METRICS_SAMPLE_INTERVAL", "5"))
+METRICS_TRACEMALLOC: bool = os.getenv("METRICS_TRACEMALLOC", "false").lower() in ("1", "true", "yes")
+# prometheus_client reads this variable itself, so it must be set before startup
+METRICS_MULTIPROC_DIR: str = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+METRICS_CACHE_TTL: float = float(os.getenv("METRICS_CACHE_TTL", "1"))
+
+# Debug profiling (the /debug/profile endpoint is disabled unless a token is set)
+DEBUG_PROFILE_TOKEN: str = os.getenv("DEBUG_PROFILE_TOKEN", "")
+DEBUG_PROFILE_MAX_SECONDS: float = float(os.getenv("DEBUG_PROFILE_MAX_SECONDS", "120"))
+
+# Startup settings
+WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+WARMUP_RETRY_INTERVAL: float = float(os.getenv("WARMUP_RETRY_INTERVAL", "30"))
+
 # Logging
 LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 
@@ -30,6 +120,19 @@ PROJECT_ROOT = Path(__file__).parent.parent.parent
 TMP_INPUT_PATH: str = os.getenv("TMP_INPUT_PATH", str(PROJECT_ROOT / "tmp" / "input"))
 TMP_OUTPUT_PATH: str = os.getenv("TMP_OUTPUT_PATH", str(PROJECT_ROOT / "tmp" / "output"))
 
+# Artifact store (uploads, intermediate notes and rendered outputs, keyed by content hash)
+ARTIFACT_STORE_PATH: str = os.getenv("ARTIFACT_STORE_PATH", str(PROJECT_ROOT / "tmp" / "artifacts"))
+ARTIFACT_TTL_SECONDS: float = float(os.getenv("ARTIFACT_TTL_SECONDS", str(24 * 3600)))
+ARTIFACT_MAX_BYTES: int = int(os.getenv("ARTIFACT_MAX_BYTES", str(2 * 1024 ** 3)))
+ARTIFACT_GC_INTERVAL: float = float(os.getenv("ARTIFACT_GC_INTERVAL", "300"))
+
+# Durable job store: SQLite database of job state and stage checkpoints, and
+# how often a process marks itself alive (unfinished jobs of processes that
+# miss 3 heartbeats are resumed by another)
+JOB_STORE_PATH: str = os.getenv("JOB_STORE_PATH", str(PROJECT_ROOT / "tmp" / "jobs.db"))
+JOB_HEARTBEAT_INTERVAL: float = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "10"))
+JOB_RESUME_ON_STARTUP: bool = os.getenv("JOB_RESUME_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
 
 def validate_config() -> dict[str, bool]:
     """Validate that required configuration is present."""
@@ -45,7 +148,19 @@ def get_config_summary() -> dict:
     return {
         "ollama": {
             "host": OLLAMA_HOST,
+            "hosts": OLLAMA_HOSTS,
+            "probe_interval": OLLAMA_PROBE_INTERVAL,
+            "eject_failures": OLLAMA_EJECT_FAILURES,
+            "eject_seconds": OLLAMA_EJECT_SECONDS,
             "model": OLLAMA_MODEL,
+            "models": OLLAMA_MODELS or OLLAMA_MODEL,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "num_ctx_min": OLLAMA_NUM_CTX_MIN,
+            "num_ctx_max": OLLAMA_NUM_CTX_MAX,
+            "max_parallel": OLLAMA_MAX_PARALLEL,
+            "timeout": LLM_TIMEOUT,
+            "hedge_percentile": LLM_HEDGE_PERCENTILE,
+            "request_workers": LLM_REQUEST_WORKERS,
             "has_api_key": bool(OLLAMA_API_KEY),
         },
         "audio": {
@@ -56,6 +171,54 @@ def get_config_summary() -> dict:
             "api_port": API_PORT,
             "ui_port": UI_PORT,
         },
+        "pipeline": {
+            "workers": PIPELINE_WORKERS,
+            "web_concurrency": WEB_CONCURRENCY,
+            "variants_max_goals": VARIANTS_MAX_GOALS,
+            "variant_workers": VARIANT_WORKERS,
+            "track_workers": TRACK_WORKERS,
+            "note_reduction": NOTE_REDUCTION,
+            "note_min_duration": NOTE_MIN_DURATION,
+            "note_min_velocity": NOTE_MIN_VELOCITY,
+            "note_onset_window": NOTE_ONSET_WINDOW,
+            "note_quantize_grid": NOTE_QUANTIZE_GRID,
+            "coalesce_requests": COALESCE_REQUESTS,
+            "admission_max_queued": ADMISSION_MAX_QUEUED,
+            "admission_max_cost_seconds": ADMISSION_MAX_COST_SECONDS,
+        },
+        "jobs": {
+            "store_path": JOB_STORE_PATH,
+            "heartbeat_interval": JOB_HEARTBEAT_INTERVAL,
+            "resume_on_startup": JOB_RESUME_ON_STARTUP,
+        },
+        "batches": {
+            "max_items": BATCH_MAX_ITEMS,
+            "history_size": BATCH_HISTORY_SIZE,
+        },
+        "tracing": {
+            "buffer_size": TRACE_BUFFER_SIZE,
+            "job_events_buffer_size": JOB_EVENTS_BUFFER_SIZE,
+        },
+        "metrics": {
+            "sample_interval": METRICS_SAMPLE_INTERVAL,
+            "tracemalloc": METRICS_TRACEMALLOC,
+            "multiprocess_dir": METRICS_MULTIPROC_DIR,
+            "cache_ttl": METRICS_CACHE_TTL,
+        },
+        "debug": {
+            "profile_enabled": bool(DEBUG_PROFILE_TOKEN),
+            "profile_max_seconds": DEBUG_PROFILE_MAX_SECONDS,
+        },
+        "startup": {
+            "warmup_on_startup": WARMUP_ON_STARTUP,
+            "warmup_retry_interval": WARMUP_RETRY_INTERVAL,
+        },
+        "artifacts": {
+            "store_path": ARTIFACT_STORE_PATH,
+            "ttl_seconds": ARTIFACT_TTL_SECONDS,
+            "max_bytes": ARTIFACT_MAX_BYTES,
+            "gc_interval": ARTIFACT_GC_INTERVAL,
+        },
         "logging": {
             "level": LOG_LEVEL,
         },
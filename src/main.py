@@ -2,14 +2,24 @@
 Composition Assistant - Main FastAPI Application
 AI-powered music transformation and composition assistant
 """
-from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi import FastAPI, UploadFile, File, Form, Request, Header, Query
+from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, PlainTextResponse, HTMLResponse, Response
+from fastapi.responses import PlainTextResponse, HTMLResponse, Response, JSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import hmac
+import json
 import os
+import threading
 import time
+import uuid
 
-from src.agents.agent import run_agent
-from src.utils.metrics import metrics_collector, get_metrics_output
+from src.agents.agent import run_agent, run_variants
+from src.agents.batch import BatchItem, BatchManager
+from src.utils.metrics import metrics_collector, get_metrics_output, resource_sampler
 from src.utils.diagram_generator import generate_html_diagram
 from src.core.config import (
     OLLAMA_HOST,
@@ -18,10 +28,96 @@ from src.core.config import (
     API_PORT,
     UI_PORT,
     LOG_LEVEL,
+    PIPELINE_WORKERS,
+    BATCH_MAX_ITEMS,
+    VARIANTS_MAX_GOALS,
+    DEBUG_PROFILE_TOKEN,
+    DEBUG_PROFILE_MAX_SECONDS,
+    WARMUP_ON_STARTUP,
+    TMP_OUTPUT_PATH,
+    ARTIFACT_TTL_SECONDS,
+    JOB_RESUME_ON_STARTUP,
     get_config_summary,
     validate_config,
 )
 from src.clients.llm import check_ollama_connection
+from src.clients.router import model_router
+from src.clients.serving import llm_serving
+from src.clients.host_pool import ollama_pool, ollama_prober
+from src.utils.warmup import start_warmup, warmup_state
+from src.utils import tracing
+from src.utils import events
+from src.utils.events import JobEvents, event_recorder
+from src.utils.tracing import trace_recorder
+from src.utils.profiler import profile_session
+from src.utils.artifact_store import artifact_store, artifact_collector, is_artifact_id
+from src.utils.http_files import file_response, IMMUTABLE_CACHE_CONTROL
+from src.utils.job_store import job_store
+from src.utils.single_flight import SingleFlight
+from src.utils.admission import (
+    AdmissionRejected,
+    Ticket,
+    admission_controller,
+    estimate_job_cost,
+)
+
+# Pipeline jobs run off the event loop so the API keeps serving while they work
+pipeline_executor = ThreadPoolExecutor(
+    max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline"
+)
+batch_manager = BatchManager(pipeline_executor)
+# Set on shutdown so jobs waiting to be resumed stop waiting for a worker
+_shutting_down = threading.Event()
+# Identical jobs submitted while one is running wait for it instead
+job_flight = SingleFlight("job")
+# How often the event stream of another worker's job re-reads the job store
+_STORED_EVENTS_POLL_SECONDS = 1.0
+
+
+def _run_queued_job(submitted_at: float, ticket: Ticket, pipeline, *args, **kwargs) -> dict:
+    """Run ``pipeline`` on a pipeline worker, recording how long the job queued."""
+    admission_controller.start(ticket)
+    try:
+        started_at = time.time()
+        queue_wait = started_at - submitted_at
+        metrics_collector.record_queue_wait(queue_wait)
+        job_events = events.current()
+        if job_events is not None:
+            job_store.mark_running(job_events.job_id)
+            job_events.start(queue_wait=round(queue_wait, 4))
+        tracing.add_span("queue_wait", submitted_at, started_at)
+        with tracing.span("pipeline"):
+            result = pipeline(*args, **kwargs)
+        result["timings"]["queue_wait"] = round(queue_wait, 4)
+        return result
+    finally:
+        admission_controller.finish(ticket)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background warm-up so heavy models load after the API is serving."""
+    if WARMUP_ON_STARTUP:
+        start_warmup()
+    resource_sampler.start()
+    artifact_collector.start()
+    ollama_prober.start()
+    job_store.start_heartbeat()
+    if ARTIFACT_TTL_SECONDS > 0:
+        # Checkpoints of older jobs point at artifacts that have expired anyway
+        job_store.prune(time.time() - ARTIFACT_TTL_SECONDS)
+    if JOB_RESUME_ON_STARTUP:
+        resume_task = asyncio.create_task(_resume_orphaned_jobs())
+        _background_jobs.add(resume_task)
+        resume_task.add_done_callback(_background_jobs.discard)
+    yield
+    _shutting_down.set()
+    batch_manager.shutdown()
+    job_store.stop_heartbeat()
+    ollama_prober.stop()
+    artifact_collector.stop()
+    resource_sampler.stop()
+
 
 app = FastAPI(
     title="Composition Assistant API",
@@ -29,6 +125,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS so UI can talk to backend
@@ -40,10 +137,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Ensure folders exist
-os.makedirs("tmp/input", exist_ok=True)
-os.makedirs("tmp/output", exist_ok=True)
-
 
 @app.get("/health")
 async def health_check():
@@ -55,6 +148,24 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness check for the pipeline's heavy dependencies.
+
+    Unlike /health, this only reports ready once the transcription model,
+    the SoundFont and the Ollama model have been warmed up.
+
+    Returns:
+        Warm-up state per component (HTTP 503 until all are ready)
+    """
+    snapshot = warmup_state.snapshot()
+    return JSONResponse(
+        content=snapshot,
+        status_code=200 if snapshot["ready"] else 503,
+    )
+
+
 @app.get("/status")
 async def status_check():
     """
@@ -63,78 +174,733 @@ async def status_check():
     Returns:
         Detailed status of all components
     """
-    ollama_status = check_ollama_connection()
+    ollama_status = check_ollama_connection(ollama_pool.urls[0])
+    pool = ollama_pool.snapshot()
     config_valid = validate_config()
+    llm_reachable = ollama_status["connected"] or any(h["available"] for h in pool["hosts"][1:])
     
     return {
-        "status": "healthy" if ollama_status["connected"] else "degraded",
+        "status": "healthy" if llm_reachable else "degraded",
         "app": "Composition Assistant",
         "version": "1.0.0",
         "ollama": ollama_status,
         "config_valid": config_valid,
+        "admission": admission_controller.snapshot(),
+        "llm_routing": model_router.snapshot(),
+        "llm_serving": llm_serving.snapshot(),
+        "ollama_pool": pool,
+        "artifacts": artifact_store.usage(),
     }
 
 
+def _rejected_response(e: AdmissionRejected) -> JSONResponse:
+    return JSONResponse(
+        content={"error": str(e), "reason": e.reason, "retry_after": e.retry_after},
+        status_code=429,
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+async def _store_upload(file: UploadFile, input_type: str, start_time: float):
+    """
+    Read an upload, store it by content hash (re-uploads dedupe) and admit
+    the job against the cost budget.
+    
+    Returns:
+        (upload artifact metadata, input path, admission ticket, upload seconds)
+    
+    Raises:
+        AdmissionRejected
+    """
+    with tracing.span("upload") as span:
+        file_content = await file.read()
+        file_size = len(file_content)
+
+        # Hashing and writing a large upload would block the event loop
+        upload = await asyncio.to_thread(
+            artifact_store.put_bytes,
+            file_content,
+            "upload",
+            media_type=file.content_type or "application/octet-stream",
+            filename=file.filename,
+        )
+        input_path = artifact_store.path(upload["id"])
+        span.set_attributes(bytes=file_size, artifact=upload["id"])
+    upload_duration = time.time() - start_time
+
+    # Record audio file metrics
+    metrics_collector.record_audio_file(file_size, "success")
+
+    # Admit against the cost budget now that the duration is known
+    try:
+        # Reads the file's duration: parsing MIDI or WAV would block the event loop
+        cost = await asyncio.to_thread(estimate_job_cost, input_path, input_type)
+    except Exception:
+        cost = 0.0  # unreadable input; the pipeline reports the real error
+    ticket = admission_controller.admit(cost)
+    return upload, input_path, ticket, upload_duration
+
+
+def _create_job(job_id: str, input_type: str, upload: dict, prompt: str,
+                goals: Optional[List[str]], ticket: Ticket) -> JobEvents:
+    """
+    Record an admitted job in the job store and start its event stream.
+    Releases ``ticket`` if that fails, since no pipeline will run to release it.
+    """
+    try:
+        job_store.create(job_id, input_type, upload["id"], prompt, goals)
+        return event_recorder.create(job_id)
+    except BaseException:
+        admission_controller.finish(ticket)
+        raise
+
+
+async def _run_pipeline(
+    job_events: JobEvents,
+    upload: dict,
+    input_path: str,
+    input_type: str,
+    ticket: Ticket,
+    prompt: str,
+    goals: Optional[List[str]],
+    upload_duration: float,
+    latency_budget: Optional[float] = None,
+) -> dict:
+    """
+    Run an admitted job on a pipeline worker and build its response.
+
+    The job's event stream receives stage events while it runs, then the
+    response as its ``result`` event (or an ``error`` event). Completed
+    stages are checkpointed in the job store, so a retry or a restart
+    resumes after the last one.
+
+    A job identical to one already running (same upload, input type,
+    goals, models and latency budget) doesn't run: it frees its admission ticket and gets
+    the running job's result, or its error.
+    """
+    job_id = job_events.job_id
+    # Run agent WITH prompt on a pipeline worker, carrying the trace along
+    if goals is None:
+        job = (run_agent, input_path, prompt)
+    else:
+        job = (run_variants, input_path, goals)
+
+    async def run_job():
+        checkpoint = job_store.checkpoint(job_id)
+        loop = asyncio.get_running_loop()
+        submitted_at = time.time()
+        ctx = contextvars.copy_context()
+        result = await loop.run_in_executor(
+            pipeline_executor,
+            lambda: ctx.run(
+                _run_queued_job, submitted_at, ticket, *job,
+                input_type=input_type, checkpoint=checkpoint, latency_budget=latency_budget,
+            ),
+        )
+
+        # Record output file metrics
+        outputs = result["variants"] if goals is not None else [result]
+        for output in outputs:
+            output_path = output.get("output_path")
+            if output_path and os.path.exists(output_path):
+                output_size = os.path.getsize(output_path)
+                metrics_collector.record_output_file("wav", output_size, "success")
+        return result
+
+    key = (upload["id"], input_type, prompt if goals is None else tuple(goals),
+           tuple(model_router.names), latency_budget)
+    with events.bind(job_events):
+        try:
+            result, _ = await job_flight.do_async(
+                key, run_job, on_join=lambda: admission_controller.finish(ticket)
+            )
+            response = _job_response(job_id, upload, result, goals, upload_duration)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            job_store.fail(job_id, error)
+            job_events.fail(error)
+            raise
+        job_store.complete(job_id, response)
+        job_events.complete(response)
+        return response
+
+
+def _job_response(job_id: str, upload: dict, result: dict, goals: Optional[List[str]],
+                  upload_duration: float) -> dict:
+    timings = {"upload": round(upload_duration, 4), **result["timings"]}
+    resumed = {"resumed": result["resumed"]} if "resumed" in result else {}
+    if goals is not None:
+        variants = []
+        for variant in result["variants"]:
+            if "error" in variant:
+                variants.append(variant)
+                continue
+            filename = f"{variant['artifacts']['output']}.wav"
+            variants.append({
+                "goal": variant["goal"],
+                "filename": filename,
+                "download_url": f"/download/{filename}",
+                "notes_out": variant["notes_out"],
+                "artifacts": variant["artifacts"],
+                "timings": variant["timings"],
+            })
+        return {
+            "job_id": job_id,
+            "notes_in": result["notes_in"],
+            "variants": variants,
+            "artifacts": {"upload": upload["id"], **result["artifacts"]},
+            "timings": timings,
+            **resumed,
+        }
+    filename = f"{result['artifacts']['output']}.wav"
+    return {
+        "job_id": job_id,
+        "filename": filename,
+        "download_url": f"/download/{filename}",
+        "notes_in": result["notes_in"],
+        "notes_out": result["notes_out"],
+        "artifacts": {"upload": upload["id"], **result["artifacts"]},
+        "timings": timings,
+        **resumed,
+    }
+
+
+async def _process_upload(
+    file: UploadFile,
+    prompt: str,
+    input_type: str,
+    endpoint: str,
+    goals: Optional[List[str]] = None,
+    latency_budget: Optional[float] = None,
+) -> dict:
+    """
+    Store an uploaded file and run the agent pipeline on it.
+
+    Args:
+        file: Uploaded WAV or MIDI file
+        prompt: User's transformation goal/instructions
+        input_type: Pipeline entry point ("audio" or "midi")
+        endpoint: Endpoint path used to label request metrics
+        goals: Run these goals as variants of one job instead of ``prompt``
+        latency_budget: Seconds the LLM call should fit in, for model routing
+
+    Returns:
+        Download name of the processed audio file and the job's artifact IDs
+        (or one entry per variant)
+    """
+    start_time = time.time()
+    status_code = 200
+    job_id = uuid.uuid4().hex
+
+    try:
+        # Reject before reading the upload if the queue is already full
+        admission_controller.check_capacity()
+
+        with tracing.start_trace(job_id), tracing.span("job", input_type=input_type):
+            upload, input_path, ticket, upload_duration = await _store_upload(file, input_type, start_time)
+            job_events = _create_job(job_id, input_type, upload, prompt, goals, ticket)
+            return await _run_pipeline(
+                job_events, upload, input_path, input_type, ticket, prompt, goals, upload_duration,
+                latency_budget,
+            )
+    
+    except AdmissionRejected as e:
+        status_code = 429
+        return _rejected_response(e)
+
+    except Exception as e:
+        status_code = 500
+        metrics_collector.record_audio_file(0, "error")
+        raise
+    
+    finally:
+        duration = time.time() - start_time
+        metrics_collector.record_api_request(endpoint, "POST", status_code, duration)
+
+
+# Background jobs started by /jobs/; referenced so they are not garbage collected
+_background_jobs = set()
+
+
+async def _run_in_background(*args, input_type: str):
+    with tracing.span("job", input_type=input_type, background=True):
+        try:
+            await _run_pipeline(*args)
+        except Exception:
+            metrics_collector.record_audio_file(0, "error")  # reported on the event stream
+
+
+async def _resume_orphaned_jobs():
+    """
+    Resume unfinished jobs of processes that died (or of this process before
+    a restart) from their last checkpoint, as background work.
+    """
+    loop = asyncio.get_running_loop()
+    for job in await loop.run_in_executor(None, job_store.claim_orphaned):
+        job_id, input_type = job["job_id"], job["input_type"]
+        input_path = artifact_store.path(job["upload_id"])
+        if input_path is None:
+            job_store.fail(job_id, "Upload expired before the job could be resumed")
+            continue
+        try:
+            cost = estimate_job_cost(input_path, input_type)
+        except Exception:
+            cost = 0.0  # unreadable input; the pipeline reports the real error
+
+        # Like batch groups, resumed jobs only take workers nobody else wants
+        ticket = await loop.run_in_executor(
+            None, lambda: admission_controller.admit_when_idle(cost, stop=_shutting_down)
+        )
+        if ticket is None:
+            return  # shutting down; the next process resumes the rest
+        print(f"Resuming job {job_id} (attempt {job['attempts'] + 1})")
+        with tracing.start_trace(job_id):
+            job_events = event_recorder.create(job_id)
+            job_events.emit("queued", upload=job["upload_id"], resumed=True)
+            task = asyncio.create_task(_run_in_background(
+                job_events, {"id": job["upload_id"]}, input_path, input_type, ticket,
+                job["prompt"], job["goals"], 0.0,
+                input_type=input_type,
+            ))
+            _background_jobs.add(task)
+            task.add_done_callback(_background_jobs.discard)
+
+
+@app.post("/jobs/", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    prompt: str = Form(""),
+    prompts: Optional[List[str]] = Form(None),
+    input_type: Optional[str] = Form(None),
+    latency_budget: Optional[float] = Form(None),
+):
+    """
+    Submit a job without waiting for it to finish.
+
+    Follow it on ``/jobs/{job_id}/events`` (Server-Sent Events) or poll
+    ``/jobs/{job_id}``. Long jobs no longer hold a request open, so they are
+    not cut off by proxy timeouts.
+
+    Args:
+        file: WAV or MIDI file to process
+        prompt: User's transformation goal/instructions
+        prompts: Repeat instead of ``prompt`` to render one variant per goal
+        input_type: "audio" or "midi" (inferred from the file extension by default)
+        latency_budget: Optional seconds the LLM call should fit in; a
+            smaller model may be chosen to meet it
+
+    Returns:
+        Job ID and the URLs of its event stream and status (HTTP 202)
+    """
+    start_time = time.time()
+    status_code = 202
+    job_id = uuid.uuid4().hex
+
+    try:
+        goals = None
+        if prompts:
+            try:
+                goals = _variant_goals(prompts)
+            except ValueError as e:
+                status_code = 400
+                return JSONResponse({"error": str(e)}, status_code=400)
+        input_type = input_type or _input_type_for(file.filename or "")
+        if input_type not in ("audio", "midi"):
+            status_code = 400
+            return JSONResponse({"error": f"Unsupported input_type: {input_type}"}, status_code=400)
+
+        admission_controller.check_capacity()
+
+        with tracing.start_trace(job_id):
+            upload, input_path, ticket, upload_duration = await _store_upload(file, input_type, start_time)
+            job_events = _create_job(job_id, input_type, upload, prompt, goals, ticket)
+            job_events.emit("queued", upload=upload["id"])
+            # The task copies the current context, so it joins this job's trace
+            task = asyncio.create_task(_run_in_background(
+                job_events, upload, input_path, input_type, ticket, prompt, goals, upload_duration,
+                latency_budget, input_type=input_type,
+            ))
+            _background_jobs.add(task)
+            task.add_done_callback(_background_jobs.discard)
+
+        return JSONResponse(
+            {
+                "job_id": job_id,
+                "status": job_events.status,
+                "status_url": f"/jobs/{job_id}",
+                "events_url": f"/jobs/{job_id}/events",
+            },
+            status_code=202,
+        )
+
+    except AdmissionRejected as e:
+        status_code = 429
+        return _rejected_response(e)
+
+    finally:
+        duration = time.time() - start_time
+        metrics_collector.record_api_request("/jobs/", "POST", status_code, duration)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Get a job's status, and its result once finished.
+
+    Recent jobs are answered from their event stream (see
+    JOB_EVENTS_BUFFER_SIZE); older ones, and jobs of other workers or from
+    before a restart, from the job store.
+    """
+    job = event_recorder.get(job_id)
+    if job is not None:
+        return job.to_dict()
+    stored = job_store.get(job_id)
+    if stored is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    summary = {key: stored[key] for key in ("job_id", "status", "created_at", "attempts", "checkpoints")}
+    if stored["result"] is not None:
+        summary["result"] = stored["result"]
+    if stored["error"] is not None:
+        summary["error"] = stored["error"]
+    return summary
+
+
+async def _stored_job_events(job_id: str, heartbeat: float = 15.0):
+    """
+    Follow a job in the job store: ``queued`` / ``started`` as its status
+    changes, then ``result`` or ``error``. Yields None every ``heartbeat``
+    seconds without a change, like ``JobEvents.stream``.
+    """
+    status = None
+    quiet_since = time.time()
+    while True:
+        job = await asyncio.to_thread(job_store.get, job_id)
+        if job is None:
+            yield {"type": "error", "time": time.time(), "error": "Job not found"}
+            return
+        if job["status"] != status:
+            status = job["status"]
+            quiet_since = time.time()
+            event = {"type": status, "time": quiet_since}
+            if status == "running":
+                event["type"] = "started"
+            elif status == "completed":
+                yield {**event, "type": "result", **(job["result"] or {})}
+                return
+            elif status == "failed":
+                yield {**event, "type": "error", "error": job["error"]}
+                return
+            yield event
+        elif time.time() - quiet_since >= heartbeat:
+            quiet_since = time.time()
+            yield None
+        await asyncio.sleep(_STORED_EVENTS_POLL_SECONDS)
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, last_event_id: Optional[str] = Header(None)):
+    """
+    Stream a job's progress as Server-Sent Events.
+
+    Events: ``queued``, ``started``, ``stage`` (started/completed/failed),
+    ``progress`` (estimated percent for transcription and rendering),
+    ``llm_tokens`` (tokens generated so far), ``checkpoint`` (a stage
+    skipped because an earlier attempt completed it) and finally ``result`` (the
+    same body /process-wav/ returns, with download URLs) or ``error``.
+    Earlier events are replayed on connect; reconnecting clients resume
+    after ``Last-Event-ID``.
+
+    Jobs this worker doesn't hold events for (another worker's, or from
+    before a restart) are followed in the job store instead: only their
+    status changes and final ``result`` or ``error`` are streamed.
+    """
+    job = event_recorder.get(job_id)
+    if job is None:
+        if job_store.get(job_id) is None:
+            return JSONResponse({"error": "Job not found"}, status_code=404)
+        events = _stored_job_events(job_id)
+    else:
+        after_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+        events = job.stream(after_id)
+
+    async def event_source():
+        async for event in events:
+            if event is None:
+                yield ": keep-alive\n\n"
+            elif "id" in event:
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            else:
+                # No ID: these don't match the IDs of the job's own event stream
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/process-wav/")
 async def process_wav(
     request: Request,
     file: UploadFile = File(...),
-    prompt: str = Form("")
+    prompt: str = Form(""),
+    latency_budget: Optional[float] = Form(None),
 ):
     """
     Process a WAV audio file with AI-powered music transformation.
-    
+
     Args:
         file: WAV audio file to process
         prompt: User's transformation goal/instructions
-    
+        latency_budget: Optional seconds the LLM call should fit in; a
+            smaller model may be chosen to meet it
+
     Returns:
-        Filename of the processed audio file
+        Filename of the processed audio file, note counts and a per-stage
+        timing breakdown in seconds
+    """
+    return await _process_upload(file, prompt, "audio", "/process-wav/", latency_budget=latency_budget)
+
+
+@app.post("/process-midi/")
+async def process_midi(
+    request: Request,
+    file: UploadFile = File(...),
+    prompt: str = Form(""),
+    latency_budget: Optional[float] = Form(None),
+):
+    """
+    Process a MIDI file with AI-powered music transformation.
+
+    The MIDI file is parsed directly into note events, so the pipeline
+    starts at the LLM stage and skips audio transcription.
+
+    Args:
+        file: MIDI (.mid) file to process
+        prompt: User's transformation goal/instructions
+        latency_budget: Optional seconds the LLM call should fit in; a
+            smaller model may be chosen to meet it
+
+    Returns:
+        Filename of the processed audio file, note counts and a per-stage
+        timing breakdown in seconds
+    """
+    return await _process_upload(file, prompt, "midi", "/process-midi/", latency_budget=latency_budget)
+
+
+def _variant_goals(prompts: List[str]) -> List[str]:
+    """Validate the goals of a variants request; raises ValueError."""
+    goals = [p for p in prompts if p.strip()]
+    if not goals:
+        raise ValueError("At least one non-empty prompt is required")
+    if len(goals) > VARIANTS_MAX_GOALS:
+        raise ValueError(f"Got {len(goals)} prompts; the limit is {VARIANTS_MAX_GOALS}")
+    return goals
+
+
+@app.post("/process-wav/variants")
+async def process_wav_variants(
+    file: UploadFile = File(...),
+    prompts: List[str] = Form(...),
+    latency_budget: Optional[float] = Form(None),
+):
+    """
+    Render several variants of one WAV, one per prompt.
+
+    The audio is transcribed once; the prompts' LLM calls and renders then
+    run concurrently, so the job takes about one transcription plus the
+    slowest variant.
+
+    Args:
+        file: WAV audio file to process
+        prompts: One transformation goal per variant (repeat the field)
+        latency_budget: Optional seconds each variant's LLM call should fit in
+
+    Returns:
+        Note count, shared timings and one entry per prompt with its output
+        filename, artifacts and timings (or its error)
     """
-    start_time = time.time()
-    status_code = 200
-    
     try:
-        input_path = f"./tmp/input/{file.filename}"
-        output_path = "./tmp/output/agent_output.wav"
+        goals = _variant_goals(prompts)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return await _process_upload(file, "", "audio", "/process-wav/variants", goals=goals,
+                                 latency_budget=latency_budget)
 
-        # Read and save uploaded file
-        file_content = await file.read()
-        file_size = len(file_content)
-        
-        with open(input_path, "wb") as f:
-            f.write(file_content)
 
-        # Record audio file metrics
-        metrics_collector.record_audio_file(file_size, "success")
+@app.post("/process-midi/variants")
+async def process_midi_variants(
+    file: UploadFile = File(...),
+    prompts: List[str] = Form(...),
+    latency_budget: Optional[float] = Form(None),
+):
+    """
+    Render several variants of one MIDI file, one per prompt.
 
-        # Run agent WITH prompt
-        run_agent(input_path, prompt)
+    Like /process-wav/variants, without the transcription stage.
 
-        # Record output file metrics
-        if os.path.exists(output_path):
-            output_size = os.path.getsize(output_path)
-            metrics_collector.record_output_file("wav", output_size, "success")
+    Args:
+        file: MIDI (.mid) file to process
+        prompts: One transformation goal per variant (repeat the field)
+        latency_budget: Optional seconds each variant's LLM call should fit in
+
+    Returns:
+        Same shape as /process-wav/variants
+    """
+    try:
+        goals = _variant_goals(prompts)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return await _process_upload(file, "", "midi", "/process-midi/variants", goals=goals,
+                                 latency_budget=latency_budget)
+
+
+def _input_type_for(filename: str) -> str:
+    return "midi" if os.path.splitext(filename)[1].lower() in (".mid", ".midi") else "audio"
+
+
+@app.post("/batches/", status_code=202)
+async def submit_batch(
+    files: List[UploadFile] = File(...),
+    manifest: str = Form(...),
+):
+    """
+    Submit many (file, prompt) items as one batch.
+
+    Items whose files have the same content are grouped so the file is
+    transcribed once for all of their prompts. Groups run on idle pipeline
+    workers in the background; poll ``/batches/{batch_id}`` for progress.
+
+    Args:
+        files: The input files (WAV or MIDI), each uploaded once
+        manifest: JSON list of ``{"file": <uploaded filename>, "prompt": ...}``
+            objects, optionally with ``"input_type": "audio" | "midi"``
+            (inferred from the file extension by default)
+
+    Returns:
+        Batch ID and item/group counts (HTTP 202)
+    """
+    start_time = time.time()
+    status_code = 202
+
+    try:
+        try:
+            entries = json.loads(manifest)
+        except json.JSONDecodeError as e:
+            status_code = 400
+            return JSONResponse({"error": f"Invalid manifest JSON: {e}"}, status_code=400)
+        if not isinstance(entries, list) or not entries:
+            status_code = 400
+            return JSONResponse({"error": "Manifest must be a non-empty list"}, status_code=400)
+        if len(entries) > BATCH_MAX_ITEMS:
+            status_code = 400
+            return JSONResponse(
+                {"error": f"Manifest has {len(entries)} items; the limit is {BATCH_MAX_ITEMS}"},
+                status_code=400,
+            )
+
+        uploads = {}
+        for file in files:
+            content = await file.read()
+            metrics_collector.record_audio_file(len(content), "success")
+            uploads[file.filename] = (await asyncio.to_thread(
+                artifact_store.put_bytes,
+                content,
+                "upload",
+                media_type=file.content_type or "application/octet-stream",
+                filename=file.filename,
+            ))["id"]
+
+        items = []
+        for index, entry in enumerate(entries):
+            name = entry.get("file") if isinstance(entry, dict) else None
+            if name not in uploads:
+                status_code = 400
+                return JSONResponse(
+                    {"error": f"Manifest item {index} references a file that was not uploaded: {name}"},
+                    status_code=400,
+                )
+            input_type = entry.get("input_type") or _input_type_for(name)
+            if input_type not in ("audio", "midi"):
+                status_code = 400
+                return JSONResponse(
+                    {"error": f"Manifest item {index} has unsupported input_type: {input_type}"},
+                    status_code=400,
+                )
+            items.append(BatchItem(index, name, str(entry.get("prompt", "")), input_type, uploads[name]))
+
+        batch = batch_manager.submit(items)
+        return JSONResponse(
+            {
+                **batch.to_dict(include_items=False),
+                "status_url": f"/batches/{batch.id}",
+                "results_url": f"/batches/{batch.id}/results",
+            },
+            status_code=202,
+        )
 
-        return {"filename": os.path.basename(output_path)}
-    
-    except Exception as e:
-        status_code = 500
-        metrics_collector.record_audio_file(0, "error")
-        raise
-    
     finally:
         duration = time.time() - start_time
-        metrics_collector.record_api_request("/process-wav/", "POST", status_code, duration)
+        metrics_collector.record_api_request("/batches/", "POST", status_code, duration)
+
+
+@app.get("/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    """
+    Get a batch's progress and per-item results.
+
+    Only the most recent batches are kept (see BATCH_HISTORY_SIZE).
+
+    Returns:
+        Aggregate counts and progress, plus each item's status, output
+        filename, artifacts and timings once it has finished
+    """
+    batch = batch_manager.get(batch_id)
+    if batch is None:
+        return JSONResponse({"error": "Batch not found"}, status_code=404)
+    return batch.to_dict()
+
+
+@app.get("/batches/{batch_id}/results")
+async def get_batch_results(request: Request, batch_id: str):
+    """
+    Download a zip of a batch's rendered outputs and a ``results.json``
+    summary. Before the batch finishes, the zip holds the items completed
+    so far.
+
+    Returns:
+        The zip archive (supports Range and conditional GETs like /download)
+    """
+    batch = batch_manager.get(batch_id)
+    if batch is None:
+        return JSONResponse({"error": "Batch not found"}, status_code=404)
+
+    loop = asyncio.get_running_loop()
+    meta = await loop.run_in_executor(None, batch_manager.results_archive, batch)
+    return file_response(
+        request,
+        artifact_store.path(meta["id"]),
+        media_type="application/zip",
+        filename=f"batch_{batch.id}.zip",
+        etag=f'"{meta["id"]}"',
+        last_modified=meta["created_at"],
+    )
 
 
 @app.get("/download/{filename}")
 async def download_file(request: Request, filename: str):
     """
-    Download a processed audio file.
+    Download a processed audio file (or any stored artifact).
     
+    Supports conditional GETs (If-None-Match / If-Modified-Since answered
+    with 304) and single byte ranges (206), so players can seek and resume.
+    Artifacts carry their content hash as a strong ETag and are cacheable
+    forever.
+
     Args:
-        filename: Name of the file to download
+        filename: ``<artifact id>.wav`` as returned by the process endpoints;
+            plain names are looked up in the legacy output folder
     
     Returns:
         The audio file as a download
@@ -143,21 +909,125 @@ async def download_file(request: Request, filename: str):
     status_code = 200
     
     try:
-        path = f"./tmp/output/{filename}"
-        if os.path.exists(path):
-            return FileResponse(
-                path,
-                media_type="audio/wav",
-                filename=filename
-            )
+        artifact_id = os.path.splitext(filename)[0]
+        response = None
+        if is_artifact_id(artifact_id):
+            path = artifact_store.path(artifact_id)
+            # The artifact may be evicted between the two lookups
+            meta = artifact_store.get(artifact_id) if path is not None and os.path.exists(path) else None
+            if meta is not None:
+                artifact_store.touch(artifact_id)
+                try:
+                    response = file_response(
+                        request,
+                        path,
+                        media_type=meta["media_type"],
+                        filename=filename,
+                        etag=f'"{artifact_id}"',
+                        last_modified=meta["created_at"],
+                        cache_control=IMMUTABLE_CACHE_CONTROL,
+                    )
+                except FileNotFoundError:
+                    response = None
+        else:
+            path = os.path.join(TMP_OUTPUT_PATH, os.path.basename(filename))
+            if os.path.exists(path):
+                stat = os.stat(path)
+                response = file_response(
+                    request,
+                    path,
+                    media_type="audio/wav",
+                    filename=filename,
+                    etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+                    last_modified=stat.st_mtime,
+                )
+        if response is not None:
+            status_code = response.status_code
+            return response
         status_code = 404
-        return {"error": "File not found"}
+        return JSONResponse({"error": "File not found"}, status_code=404)
     
     finally:
         duration = time.time() - start_time
         metrics_collector.record_api_request("/download/", "GET", status_code, duration)
 
 
+@app.get("/jobs/{job_id}/trace")
+async def get_job_trace(job_id: str):
+    """
+    Get the span trace recorded for a job.
+
+    Only the most recent jobs are kept (see TRACE_BUFFER_SIZE).
+
+    Args:
+        job_id: Job ID returned by /process-wav/ or /process-midi/
+
+    Returns:
+        Chrome trace-event JSON (open in chrome://tracing or ui.perfetto.dev)
+    """
+    trace = trace_recorder.get(job_id)
+    if trace is None:
+        return JSONResponse(content={"error": "Trace not found"}, status_code=404)
+    return trace.to_chrome_trace()
+
+
+@app.get("/debug/profile")
+async def debug_profile(
+    seconds: float = Query(10.0, gt=0),
+    mode: str = Query("duration", pattern="^(duration|next_job)$"),
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$"),
+    interval: float = Query(0.01, ge=0.001, le=1.0),
+    x_debug_token: str = Header(""),
+):
+    """
+    Profile the live process with a low-overhead sampling profiler.
+
+    Disabled unless DEBUG_PROFILE_TOKEN is set; requests must send it in
+    the X-Debug-Token header.
+
+    Args:
+        seconds: How long to sample ("duration"), or how long to wait for
+            the next job to finish ("next_job")
+        mode: "duration" samples every thread for ``seconds``; "next_job"
+            samples the next run_agent call only
+        format: "collapsed" stacks (text) or "speedscope" JSON
+        interval: Seconds between samples
+
+    Returns:
+        The profile; samples are prefixed with the pipeline stage they ran in
+    """
+    if not DEBUG_PROFILE_TOKEN:
+        return JSONResponse(content={"error": "Not found"}, status_code=404)
+    if not hmac.compare_digest(x_debug_token, DEBUG_PROFILE_TOKEN):
+        return JSONResponse(content={"error": "Invalid debug token"}, status_code=403)
+    if seconds > DEBUG_PROFILE_MAX_SECONDS:
+        return JSONResponse(
+            content={"error": f"seconds must be <= {DEBUG_PROFILE_MAX_SECONDS}"},
+            status_code=400,
+        )
+    if not profile_session.acquire():
+        return JSONResponse(content={"error": "A profile is already running"}, status_code=409)
+
+    try:
+        if mode == "next_job":
+            handle = profile_session.arm_next_job(interval)
+            finished = await asyncio.to_thread(handle["done"].wait, seconds)
+            if not finished:
+                return JSONResponse(
+                    content={"error": f"No job finished within {seconds}s"},
+                    status_code=408,
+                )
+            profile = handle["profiler"]
+        else:
+            profile = await asyncio.to_thread(profile_session.profile_for, seconds, interval)
+    finally:
+        profile_session.release()
+
+    if format == "speedscope":
+        return JSONResponse(content=profile.to_speedscope())
+    return PlainTextResponse(content=profile.to_collapsed())
+
+
 @app.get("/metrics", response_class=PlainTextResponse)
 async def get_metrics() -> Response:
     """
@@ -228,10 +1098,22 @@ async def get_configuration():
         "config": get_config_summary(),
         "endpoints": {
             "process_wav": "/process-wav/",
+            "process_midi": "/process-midi/",
+            "process_wav_variants": "/process-wav/variants",
+            "process_midi_variants": "/process-midi/variants",
+            "batches": "/batches/",
+            "batch_status": "/batches/{batch_id}",
+            "batch_results": "/batches/{batch_id}/results",
             "download": "/download/{filename}",
+            "submit_job": "/jobs/",
+            "job_status": "/jobs/{job_id}",
+            "job_events": "/jobs/{job_id}/events",
+            "job_trace": "/jobs/{job_id}/trace",
+            "debug_profile": "/debug/profile",
             "metrics": "/metrics",
             "workflow_diagram": "/workflow-diagram",
             "health": "/health",
+            "ready": "/ready",
             "status": "/status",
             "docs": "/docs"
         },
@@ -250,6 +1132,7 @@ async def get_ollama_status():
     Check Ollama connection status and available models.
     
     Returns:
-        Ollama connection status and model availability
+        Ollama connection status and model availability of OLLAMA_HOST, plus
+        the health of every host in the pool
     """
-    return check_ollama_connection()
+    return {**check_ollama_connection(), "pool": ollama_pool.snapshot()}
@@ -0,0 +1,200 @@
+"""
+Admission control for pipeline jobs.
+
+Caps how many jobs may be running or waiting at once and how much estimated
+work (seconds of audio) they may add up to. Jobs beyond the caps are rejected
+straight away with a suggested Retry-After, so a burst of long uploads
+degrades into fast 429s instead of swapping or OOM-killing the container.
+"""
+
+import math
+import threading
+import time
+from typing import Optional
+
+from src.core.config import (
+    PIPELINE_WORKERS,
+    ADMISSION_MAX_QUEUED,
+    ADMISSION_MAX_COST_SECONDS,
+)
+from src.utils.metrics import (
+    admission_in_flight,
+    admission_queue_depth,
+    admission_cost_in_flight,
+    admission_rejections_total,
+)
+
+# Initial guess for a job's duration, used for Retry-After until jobs complete
+_DEFAULT_JOB_SECONDS = 30.0
+# Weight of the newest job in the moving average of job durations
+_EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Raised when a job cannot be admitted right now."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Job rejected ({reason}); retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """An admitted job's claim on capacity."""
+
+    __slots__ = ("cost", "admitted_at", "started_at")
+
+    def __init__(self, cost: float):
+        self.cost = cost
+        self.admitted_at = time.time()
+        self.started_at: Optional[float] = None
+
+
+class AdmissionController:
+    """Thread-safe bookkeeping of admitted jobs against the configured caps."""
+
+    def __init__(self, max_concurrent: int = PIPELINE_WORKERS, max_queued: int = ADMISSION_MAX_QUEUED,
+                 max_cost: float = ADMISSION_MAX_COST_SECONDS):
+        """
+        Args:
+            max_concurrent: Jobs that run at once (the pipeline worker count)
+            max_queued: Jobs allowed to wait for a worker; beyond this, reject
+            max_cost: Budget of estimated cost (audio seconds) across all
+                admitted jobs; 0 disables the budget
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max_queued
+        self.max_cost = max_cost
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._admitted = 0
+        self._running = 0
+        self._cost = 0.0
+        self._avg_job_seconds = _DEFAULT_JOB_SECONDS
+
+    @property
+    def queued(self) -> int:
+        return self._admitted - self._running
+
+    def _retry_after(self, jobs_ahead: int) -> int:
+        """Seconds until roughly ``jobs_ahead`` jobs have drained through the workers."""
+        waves = max(1, math.ceil(jobs_ahead / self.max_concurrent))
+        return max(1, math.ceil(waves * self._avg_job_seconds))
+
+    def _reject(self, reason: str, jobs_ahead: int):
+        admission_rejections_total.labels(reason=reason).inc()
+        raise AdmissionRejected(reason, self._retry_after(jobs_ahead))
+
+    def check_capacity(self):
+        """
+        Cheap pre-check before an upload is read: reject if the queue is full.
+
+        Raises:
+            AdmissionRejected
+        """
+        with self._lock:
+            if self._admitted >= self.max_concurrent + self.max_queued:
+                self._reject("queue_full", self.queued + 1)
+
+    def admit(self, cost: float) -> Ticket:
+        """
+        Admit a job of estimated ``cost`` or reject it.
+
+        A job is always admitted when nothing else is, so a single job larger
+        than the whole budget can still run on an idle worker.
+
+        Raises:
+            AdmissionRejected
+        """
+        with self._lock:
+            if self._admitted >= self.max_concurrent + self.max_queued:
+                self._reject("queue_full", self.queued + 1)
+            if self.max_cost > 0 and self._admitted > 0 and self._cost + cost > self.max_cost:
+                self._reject("cost_budget", self._admitted)
+
+            self._admitted += 1
+            self._cost += cost
+            self._update_gauges()
+            return Ticket(cost)
+
+    def admit_when_idle(self, cost: float, stop: Optional[threading.Event] = None) -> Optional[Ticket]:
+        """
+        Admit a background job once a worker is free, blocking until then.
+
+        Background jobs (batch groups) never queue behind the workers, so
+        interactive requests keep their queue slots and always go first.
+
+        Returns:
+            The ticket, or None if ``stop`` was set while waiting
+        """
+        with self._released:
+            while True:
+                if stop is not None and stop.is_set():
+                    return None
+                within_budget = (
+                    self.max_cost <= 0 or self._admitted == 0 or self._cost + cost <= self.max_cost
+                )
+                if self._admitted < self.max_concurrent and within_budget:
+                    break
+                self._released.wait(timeout=1.0)
+
+            self._admitted += 1
+            self._cost += cost
+            self._update_gauges()
+            return Ticket(cost)
+
+    def start(self, ticket: Ticket):
+        """Mark an admitted job as picked up by a worker."""
+        with self._lock:
+            ticket.started_at = time.time()
+            self._running += 1
+            self._update_gauges()
+
+    def finish(self, ticket: Ticket):
+        """Release a job's capacity once it has finished or failed."""
+        with self._lock:
+            if ticket.started_at is not None:
+                self._running -= 1
+                duration = time.time() - ticket.started_at
+                self._avg_job_seconds += _EWMA_ALPHA * (duration - self._avg_job_seconds)
+            self._admitted -= 1
+            self._cost -= ticket.cost
+            self._update_gauges()
+            self._released.notify_all()
+
+    def _update_gauges(self):
+        admission_in_flight.set(self._running)
+        admission_queue_depth.set(self.queued)
+        admission_cost_in_flight.set(self._cost)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": self.queued,
+                "cost_in_flight": round(self._cost, 3),
+                "max_concurrent": self.max_concurrent,
+                "max_queued": self.max_queued,
+                "max_cost": self.max_cost,
+                "avg_job_seconds": round(self._avg_job_seconds, 3),
+            }
+
+
+admission_controller = AdmissionController()
+
+
+def estimate_job_cost(path: str, input_type: str) -> float:
+    """
+    Estimate a job's cost in seconds of audio.
+
+    WAV durations come from the header alone. MIDI jobs skip transcription,
+    so their cost is the length of the piece they render.
+    """
+    if input_type == "midi":
+        import pretty_midi
+
+        return pretty_midi.PrettyMIDI(path).get_end_time()
+
+    from src.utils.audio_utils import get_audio_duration
+
+    return get_audio_duration(path)
@@ -0,0 +1,306 @@
+"""
+Content-addressed artifact store.
+
+Uploads, intermediate note lists and rendered outputs are stored once under
+the SHA-256 of their content, so repeated uploads and identical results take
+no extra disk. Every artifact has a JSON metadata sidecar (kind, media type,
+size, timestamps, expiry). A background collector removes expired artifacts
+and evicts the least recently used ones when the store grows past its quota,
+sparing artifacts that unfinished work still needs (see ``add_pin_source``).
+
+Layout:
+    <root>/objects/<first two hex chars>/<sha256><ext>       content
+    <root>/objects/<first two hex chars>/<sha256>.meta.json  metadata
+    <root>/incoming/                                         partial writes
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src.core.config import (
+    ARTIFACT_STORE_PATH,
+    ARTIFACT_TTL_SECONDS,
+    ARTIFACT_MAX_BYTES,
+    ARTIFACT_GC_INTERVAL,
+)
+
+_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+_EXT_RE = re.compile(r"^\.[a-z0-9]{1,8}$")
+_CHUNK = 1024 * 1024
+
+
+def is_artifact_id(value: str) -> bool:
+    return bool(_ID_RE.match(value or ""))
+
+
+def _safe_ext(filename: Optional[str]) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if _EXT_RE.match(ext) else ""
+
+
+class ArtifactStore:
+    """Content-addressed files with metadata, TTL and a total-size quota."""
+
+    def __init__(self, root: str = ARTIFACT_STORE_PATH, default_ttl: float = ARTIFACT_TTL_SECONDS,
+                 max_bytes: int = ARTIFACT_MAX_BYTES):
+        self.root = root
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self._objects = os.path.join(root, "objects")
+        self._incoming = os.path.join(root, "incoming")
+        self._lock = threading.RLock()
+        self._pin_sources: List[Callable[[], Iterable[str]]] = []
+        os.makedirs(self._objects, exist_ok=True)
+        os.makedirs(self._incoming, exist_ok=True)
+
+    # ------------------------------------------------------------------ paths
+
+    def _dir(self, artifact_id: str) -> str:
+        return os.path.join(self._objects, artifact_id[:2])
+
+    def _meta_path(self, artifact_id: str) -> str:
+        return os.path.join(self._dir(artifact_id), f"{artifact_id}.meta.json")
+
+    def path(self, artifact_id: str) -> Optional[str]:
+        """Path of an artifact's content, or None if it is not stored."""
+        meta = self.get(artifact_id)
+        if meta is None:
+            return None
+        return os.path.join(self._dir(artifact_id), artifact_id + meta.get("ext", ""))
+
+    def temp_path(self, suffix: str = "") -> str:
+        """A fresh path inside the store, for writers that need a file path (see put_file)."""
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self._incoming)
+        os.close(fd)
+        return path
+
+    # --------------------------------------------------------------- metadata
+
+    def get(self, artifact_id: str) -> Optional[Dict]:
+        """Metadata for an artifact, or None if unknown or malformed ID."""
+        if not is_artifact_id(artifact_id):
+            return None
+        try:
+            with open(self._meta_path(artifact_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, meta: Dict):
+        path = self._meta_path(meta["id"])
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def touch(self, artifact_id: str):
+        """Record an access, which protects the artifact from LRU eviction."""
+        with self._lock:
+            meta = self.get(artifact_id)
+            if meta is not None:
+                meta["last_access"] = time.time()
+                self._write_meta(meta)
+
+    # ---------------------------------------------------------------- writing
+
+    def _commit(self, tmp_path: str, digest: str, size: int, kind: str, media_type: str,
+                filename: Optional[str], ttl: Optional[float], extra: Optional[Dict]) -> Dict:
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        with self._lock:
+            meta = self.get(digest)
+            if meta is not None and os.path.exists(self.path(digest)):
+                # Deduplicated: keep the stored copy, extend its lifetime
+                os.remove(tmp_path)
+                meta["last_access"] = now
+                meta["expires_at"] = max(meta.get("expires_at") or 0, now + ttl) if ttl > 0 else None
+            else:
+                ext = _safe_ext(filename)
+                os.makedirs(self._dir(digest), exist_ok=True)
+                os.replace(tmp_path, os.path.join(self._dir(digest), digest + ext))
+                meta = {
+                    "id": digest,
+                    "kind": kind,
+                    "media_type": media_type,
+                    "filename": os.path.basename(filename) if filename else None,
+                    "ext": ext,
+                    "size": size,
+                    "created_at": now,
+                    "last_access": now,
+                    "expires_at": now + ttl if ttl > 0 else None,
+                }
+            if extra:
+                meta.setdefault("extra", {}).update(extra)
+            self._write_meta(meta)
+            return meta
+
+    def put_bytes(self, data: bytes, kind: str, media_type: str = "application/octet-stream",
+                  filename: Optional[str] = None, ttl: Optional[float] = None,
+                  extra: Optional[Dict] = None) -> Dict:
+        """
+        Store ``data`` and return its metadata.
+
+        Args:
+            kind: What the artifact is (upload, notes, edited_notes, output, ...)
+            filename: Original name; only its extension is used for storage
+            ttl: Seconds to keep the artifact (default ARTIFACT_TTL_SECONDS,
+                0 keeps it until evicted by the size quota)
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        tmp_path = self.temp_path()
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        return self._commit(tmp_path, digest, len(data), kind, media_type, filename, ttl, extra)
+
+    def put_json(self, value, kind: str, ttl: Optional[float] = None, extra: Optional[Dict] = None) -> Dict:
+        """Store a JSON-serializable value (compact, key-sorted, so equal values dedupe)."""
+        data = json.dumps(value, separators=(",", ":"), sort_keys=True).encode()
+        return self.put_bytes(data, kind, "application/json", "value.json", ttl, extra)
+
+    def put_file(self, path: str, kind: str, media_type: str = "application/octet-stream",
+                 filename: Optional[str] = None, ttl: Optional[float] = None,
+                 extra: Optional[Dict] = None) -> Dict:
+        """
+        Move the file at ``path`` into the store and return its metadata.
+
+        The file is moved, not copied, so write it under ``temp_path()`` to
+        stay on the store's filesystem.
+        """
+        sha = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK), b""):
+                sha.update(chunk)
+                size += len(chunk)
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(self._incoming):
+            tmp_path = self.temp_path()
+            os.replace(path, tmp_path)
+            path = tmp_path
+        return self._commit(path, sha.hexdigest(), size, kind, media_type,
+                            filename or os.path.basename(path), ttl, extra)
+
+    def read_json(self, artifact_id: str):
+        path = self.path(artifact_id)
+        if path is None:
+            raise KeyError(artifact_id)
+        with open(path) as f:
+            return json.load(f)
+
+    # ------------------------------------------------------------- collection
+
+    def delete(self, artifact_id: str):
+        with self._lock:
+            path = self.path(artifact_id)
+            for p in (path, self._meta_path(artifact_id)):
+                if p and os.path.exists(p):
+                    os.remove(p)
+
+    def list(self) -> List[Dict]:
+        entries = []
+        for bucket in os.listdir(self._objects):
+            bucket_dir = os.path.join(self._objects, bucket)
+            if not os.path.isdir(bucket_dir):
+                continue
+            for name in os.listdir(bucket_dir):
+                if name.endswith(".meta.json"):
+                    meta = self.get(name[:-len(".meta.json")])
+                    if meta is not None:
+                        entries.append(meta)
+        return entries
+
+    def add_pin_source(self, source: Callable[[], Iterable[str]]):
+        """
+        Register ``source``, called on each collection for the IDs of
+        artifacts in use (e.g. by unfinished jobs). Those are neither expired
+        nor evicted, though they still count towards the quota.
+        """
+        self._pin_sources.append(source)
+
+    def pinned(self) -> set:
+        return {artifact_id for source in self._pin_sources for artifact_id in source()}
+
+    def gc(self, now: Optional[float] = None) -> Dict:
+        """
+        Remove expired artifacts, then evict least recently used ones until
+        the store is within its size quota, skipping pinned artifacts. Stale
+        partial writes are removed too.
+        """
+        now = time.time() if now is None else now
+        expired = evicted = 0
+        pinned = self.pinned()
+        with self._lock:
+            live = []
+            for meta in self.list():
+                if meta["id"] in pinned:
+                    live.append(meta)
+                elif meta.get("expires_at") and meta["expires_at"] <= now:
+                    self.delete(meta["id"])
+                    expired += 1
+                else:
+                    live.append(meta)
+
+            total = sum(m["size"] for m in live)
+            if self.max_bytes > 0 and total > self.max_bytes:
+                for meta in sorted(live, key=lambda m: m["last_access"]):
+                    if total <= self.max_bytes:
+                        break
+                    if meta["id"] in pinned:
+                        continue
+                    self.delete(meta["id"])
+                    total -= meta["size"]
+                    evicted += 1
+
+            for name in os.listdir(self._incoming):
+                path = os.path.join(self._incoming, name)
+                if now - os.path.getmtime(path) > 3600:
+                    os.remove(path)
+
+        return {"expired": expired, "evicted": evicted, "total_bytes": total}
+
+    def usage(self) -> Dict:
+        entries = self.list()
+        return {"artifacts": len(entries), "total_bytes": sum(m["size"] for m in entries),
+                "max_bytes": self.max_bytes}
+
+
+class ArtifactCollector:
+    """Background thread that runs the store's garbage collection periodically."""
+
+    def __init__(self, store: ArtifactStore, interval: float = ARTIFACT_GC_INTERVAL):
+        self.store = store
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return self
+        self._thread = threading.Thread(target=self._run, name="artifact-gc", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.store.gc()
+            except OSError:
+                pass  # a file vanished mid-scan; the next pass catches up
+            except Exception as e:
+                # e.g. the pinned artifacts could not be listed: collect nothing this pass
+                print(f"Artifact collection skipped: {type(e).__name__}: {e}")
+
+
+artifact_store = ArtifactStore()
+artifact_collector = ArtifactCollector(artifact_store)
@@ -1,17 +1,171 @@
-import librosa
+import os
+import struct
+
+import numpy as np
 import pretty_midi
 
+WAV_EXTENSIONS = (".wav", ".wave")
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# (format, bytes per sample) -> numpy dtype usable with np.memmap
+_WAV_DTYPES = {
+    ("pcm", 1): np.dtype("u1"),
+    ("pcm", 2): np.dtype("<i2"),
+    ("pcm", 4): np.dtype("<i4"),
+    ("float", 4): np.dtype("<f4"),
+    ("float", 8): np.dtype("<f8"),
+}
+
+
+def is_wav(filepath):
+    return str(filepath).lower().endswith(WAV_EXTENSIONS)
 
-def load_audio(filepath):
+
+def read_wav_info(filepath):
     """
-    Loads an audio file without resampling.
+    Reads format and duration from a WAV header without decoding any samples.
+
+    Returns:
+        dict with sample_rate, channels, sample_width (bytes), format
+        ("pcm" or "float"), n_frames, duration (seconds), data_offset and
+        data_size (bytes)
+    """
+    with open(filepath, "rb") as f:
+        riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+        if riff not in (b"RIFF", b"RF64") or wave != b"WAVE":
+            raise ValueError(f"Not a WAV file: {filepath}")
+
+        fmt = None
+        file_size = os.fstat(f.fileno()).st_size
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"WAV file has no data chunk: {filepath}")
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+
+            if chunk_id == b"fmt ":
+                body = f.read(chunk_size)
+                format_tag, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                if format_tag == _WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    # First two bytes of the SubFormat GUID carry the real format tag
+                    format_tag = struct.unpack("<H", body[24:26])[0]
+                if format_tag == _WAVE_FORMAT_PCM:
+                    kind = "pcm"
+                elif format_tag == _WAVE_FORMAT_IEEE_FLOAT:
+                    kind = "float"
+                else:
+                    raise ValueError(f"Unsupported WAV format tag {format_tag:#x}: {filepath}")
+                fmt = {
+                    "sample_rate": sample_rate,
+                    "channels": channels,
+                    "sample_width": bits // 8,
+                    "format": kind,
+                }
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"WAV data chunk precedes fmt chunk: {filepath}")
+                data_offset = f.tell()
+                # Streamed writers leave the size unset; clamp to what is on disk
+                data_size = min(chunk_size, file_size - data_offset)
+                frame_size = fmt["channels"] * fmt["sample_width"]
+                n_frames = data_size // frame_size
+                return {
+                    **fmt,
+                    "n_frames": n_frames,
+                    "duration": n_frames / fmt["sample_rate"],
+                    "data_offset": data_offset,
+                    "data_size": n_frames * frame_size,
+                }
+            else:
+                # Chunks are word-aligned
+                f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+def get_audio_duration(filepath):
+    """Returns the duration in seconds, from the header alone for WAV files."""
+    if is_wav(filepath):
+        return read_wav_info(filepath)["duration"]
+
+    import librosa  # heavy import, only needed for non-WAV formats
+
+    return librosa.get_duration(path=filepath)
+
+
+def read_wav_frames(filepath, start_frame=0, num_frames=None, info=None):
+    """
+    Memory-maps a range of WAV frames without copying or decoding.
+
+    Returns:
+        np.memmap of shape (frames, channels) in the file's native dtype.
+        Pages are only read from disk when the array is touched.
+    """
+    info = info or read_wav_info(filepath)
+    dtype = _WAV_DTYPES.get((info["format"], info["sample_width"]))
+    if dtype is None:
+        raise ValueError(
+            f"Cannot memory-map {info['sample_width'] * 8}-bit {info['format']} WAV: {filepath}"
+        )
+
+    start_frame = max(0, min(start_frame, info["n_frames"]))
+    available = info["n_frames"] - start_frame
+    count = available if num_frames is None else max(0, min(num_frames, available))
+    if count == 0:
+        return np.zeros((0, info["channels"]), dtype=dtype)
+
+    frame_size = info["channels"] * info["sample_width"]
+    return np.memmap(
+        filepath,
+        dtype=dtype,
+        mode="r",
+        offset=info["data_offset"] + start_frame * frame_size,
+        shape=(count, info["channels"]),
+    )
+
+
+def to_float_mono(frames):
+    """Converts native WAV frames of shape (frames, channels) to float32 mono in [-1, 1]."""
+    if frames.dtype == np.uint8:
+        samples = (frames.astype(np.float32) - 128.0) / 128.0
+    elif frames.dtype.kind == "i":
+        samples = frames.astype(np.float32) / float(np.iinfo(frames.dtype).max + 1)
+    else:
+        samples = frames.astype(np.float32)
+    return samples.mean(axis=1) if samples.shape[1] > 1 else samples[:, 0]
+
+
+def load_audio(filepath, offset=0.0, duration=None):
+    """
+    Loads an audio file (or a window of it) without resampling.
+
+    WAV files are read through a memory map, so only the requested window
+    is decoded. Other formats fall back to librosa.
 
     Returns:
         y (np.ndarray): audio waveform
         sr (int): sample rate
         duration (float): seconds
     """
-    y, sr = librosa.load(filepath, sr=None)
+    if is_wav(filepath):
+        try:
+            info = read_wav_info(filepath)
+            sr = info["sample_rate"]
+            frames = read_wav_frames(
+                filepath,
+                start_frame=int(offset * sr),
+                num_frames=None if duration is None else int(duration * sr),
+                info=info,
+            )
+            y = to_float_mono(frames)
+            return y, sr, len(y) / sr
+        except ValueError:
+            pass  # e.g. 24-bit PCM; let librosa handle it
+
+    import librosa  # heavy import, deferred until audio is actually loaded
+
+    y, sr = librosa.load(filepath, sr=None, offset=offset, duration=duration)
     duration = len(y) / sr
     return y, sr, duration
 
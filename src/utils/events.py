@@ -0,0 +1,232 @@
+"""
+Per-job progress events.
+
+Pipeline code emits events (stage transitions, estimated progress, LLM token
+counts, the final result) into the stream of the job bound to the current
+context; outside a job ``emit`` is a no-op, like tracing spans. Streams are
+kept in a ring buffer so clients can subscribe late, or reconnect, and replay
+what they missed (see ``JobEvents.stream``).
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from src.core.config import JOB_EVENTS_BUFFER_SIZE
+
+# Event types after which a stream is complete
+TERMINAL_EVENTS = ("result", "error")
+
+
+class JobEvents:
+    """The event history of one job, plus its live subscribers."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.created_at = time.time()
+        self.status = "queued"
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._subscribers: List[tuple] = []
+
+    def emit(self, event_type: str, **data):
+        """Append an event and push it to subscribers. Safe from any thread."""
+        with self._lock:
+            event = {"id": len(self.events) + 1, "type": event_type, "time": time.time(), **data}
+            self.events.append(event)
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def start(self, **data):
+        """Mark the job as picked up by a worker."""
+        self.status = "running"
+        self.emit("started", **data)
+
+    def complete(self, result: dict):
+        self.status, self.result = "completed", result
+        self.emit("result", **result)
+
+    def fail(self, error: str):
+        self.status, self.error = "failed", error
+        self.emit("error", error=error)
+
+    async def stream(self, after_id: int = 0, heartbeat: float = 15.0) -> AsyncIterator[Optional[dict]]:
+        """
+        Yield events with an ID above ``after_id``: history first, then live
+        ones, until a terminal event. Yields None after ``heartbeat`` seconds
+        without events so callers can keep the connection alive.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            backlog = [e for e in self.events if e["id"] > after_id]
+            self._subscribers.append((loop, queue))
+        try:
+            for event in backlog:
+                yield event
+                if event["type"] in TERMINAL_EVENTS:
+                    return
+            last_id = backlog[-1]["id"] if backlog else after_id
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event["id"] <= last_id:
+                    continue  # already sent from the backlog
+                last_id = event["id"]
+                yield event
+                if event["type"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            with self._lock:
+                self._subscribers.remove((loop, queue))
+
+    def to_dict(self) -> dict:
+        summary = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "events": len(self.events),
+        }
+        if self.result is not None:
+            summary["result"] = self.result
+        if self.error is not None:
+            summary["error"] = self.error
+        return summary
+
+
+class EventRecorder:
+    """Ring buffer of the most recent jobs' event streams, keyed by job ID."""
+
+    def __init__(self, max_jobs: int = JOB_EVENTS_BUFFER_SIZE):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, JobEvents]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str) -> JobEvents:
+        job = JobEvents(job_id)
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id: str) -> Optional[JobEvents]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+event_recorder = EventRecorder()
+
+_current_job: ContextVar[Optional[JobEvents]] = ContextVar("current_job_events", default=None)
+
+
+@contextmanager
+def bind(job: JobEvents):
+    """Make ``job`` the target of ``emit`` for the enclosed block."""
+    token = _current_job.set(job)
+    try:
+        yield job
+    finally:
+        _current_job.reset(token)
+
+
+def current() -> Optional[JobEvents]:
+    return _current_job.get()
+
+
+def emit(event_type: str, **data):
+    """Emit an event for the current job, if any."""
+    job = _current_job.get()
+    if job is not None:
+        job.emit(event_type, **data)
+
+
+def token_reporter(interval: float = 0.25, **data):
+    """
+    Callback for streamed LLM output that emits ``llm_tokens`` events with
+    the running token count, at most once per ``interval`` seconds.
+    Returns None outside a job.
+    """
+    job = _current_job.get()
+    if job is None:
+        return None
+    last_emit = [0.0]
+
+    def report(tokens: int, done: bool = False):
+        now = time.time()
+        if done or now - last_emit[0] >= interval:
+            last_emit[0] = now
+            job.emit("llm_tokens", tokens=tokens, done=done, **data)
+
+    return report
+
+
+class ProgressEstimator:
+    """
+    Estimates how long a stage takes per second of audio from recent runs.
+
+    Transcription and rendering are single library calls with no progress
+    callbacks, so their percent progress is extrapolated from elapsed time.
+    """
+
+    _DEFAULT_RATES = {"transcription": 0.3, "render": 0.1}
+    _EWMA_ALPHA = 0.2
+
+    def __init__(self):
+        self._rates = dict(self._DEFAULT_RATES)
+        self._lock = threading.Lock()
+
+    def expected(self, stage: str, audio_seconds: float) -> float:
+        with self._lock:
+            return max(0.1, self._rates.get(stage, 0.1) * audio_seconds)
+
+    def observe(self, stage: str, audio_seconds: float, seconds: float):
+        if audio_seconds <= 0:
+            return
+        with self._lock:
+            rate = self._rates.get(stage, seconds / audio_seconds)
+            self._rates[stage] = rate + self._EWMA_ALPHA * (seconds / audio_seconds - rate)
+
+
+progress_estimator = ProgressEstimator()
+
+
+@contextmanager
+def stage_progress(stage: str, audio_seconds: float, interval: float = 0.5):
+    """
+    Emit estimated ``progress`` events for ``stage`` while the block runs,
+    then learn from its actual duration. No-op outside a job.
+    """
+    job = _current_job.get()
+    if job is None or audio_seconds <= 0:
+        yield
+        return
+
+    expected = progress_estimator.expected(stage, audio_seconds)
+    start = time.time()
+    stop = threading.Event()
+
+    def tick():
+        while not stop.wait(interval):
+            percent = min(95.0, 100.0 * (time.time() - start) / expected)
+            job.emit("progress", stage=stage, percent=round(percent, 1), estimated=True)
+
+    ticker = threading.Thread(target=tick, name=f"progress-{stage}", daemon=True)
+    ticker.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        ticker.join()
+    progress_estimator.observe(stage, audio_seconds, time.time() - start)
+    job.emit("progress", stage=stage, percent=100.0, estimated=False)
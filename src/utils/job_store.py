@@ -0,0 +1,320 @@
+"""
+Durable job store.
+
+Records every job's inputs and state in SQLite, and a checkpoint per
+completed stage pointing at the stage's output in the artifact store. After
+a restart, unfinished jobs are resumed from their last checkpoint; a client
+retrying a failed job (same upload and prompt) picks up where it failed; and
+transcriptions are reused by any job on the same upload.
+
+Checkpoint names:
+    notes                       transcription + midi_to_json output
+    edited_notes / output       LLM edit and render of a single-goal job
+    variant:<i>:edited_notes    the same per variant of a variants job
+    variant:<i>:output
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from src.core.config import JOB_STORE_PATH, JOB_HEARTBEAT_INTERVAL
+from src.utils.artifact_store import artifact_store
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id      TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    input_type  TEXT NOT NULL,
+    upload_id   TEXT NOT NULL,
+    prompt      TEXT NOT NULL,
+    goals       TEXT,
+    status      TEXT NOT NULL,
+    owner       TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    result      TEXT,
+    error       TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_input ON jobs (upload_id, input_type, status);
+CREATE TABLE IF NOT EXISTS owners (
+    owner        TEXT PRIMARY KEY,
+    heartbeat_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job_id      TEXT NOT NULL,
+    stage       TEXT NOT NULL,
+    artifact_id TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    PRIMARY KEY (job_id, stage)
+);
+"""
+
+# Statuses of jobs that have not finished
+UNFINISHED = ("queued", "running")
+
+
+# Owners missing this many heartbeats are considered dead
+_MISSED_HEARTBEATS = 3
+
+_owner_id = {}
+
+
+def _owner() -> str:
+    """
+    This process's owner ID. Includes a per-process nonce so a restarted
+    process (which may well get the same PID in a container) never mistakes
+    its predecessor's jobs for its own.
+    """
+    pid = os.getpid()
+    if pid not in _owner_id:
+        _owner_id[pid] = f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}"
+    return _owner_id[pid]
+
+
+class Checkpoint:
+    """
+    Stage checkpoints of one job, seeded with those of earlier attempts.
+
+    ``load`` only returns checkpoints whose artifact still exists, so an
+    evicted artifact simply means the stage runs again.
+    """
+
+    def __init__(self, store: "JobStore", job_id: str, inherited: Dict[str, str]):
+        self.store = store
+        self.job_id = job_id
+        self._checkpoints = dict(inherited)
+        self.resumed: List[str] = []
+
+    def load(self, stage: str) -> Optional[str]:
+        artifact_id = self._checkpoints.get(stage)
+        if artifact_id is None or artifact_store.path(artifact_id) is None:
+            return None
+        if stage not in self.resumed:
+            self.resumed.append(stage)
+        return artifact_id
+
+    def save(self, stage: str, artifact_id: str):
+        self._checkpoints[stage] = artifact_id
+        self.store.save_checkpoint(self.job_id, stage, artifact_id)
+
+
+class JobStore:
+    """SQLite-backed job records and stage checkpoints. Safe across threads and processes."""
+
+    def __init__(self, path: str = JOB_STORE_PATH, heartbeat_interval: float = JOB_HEARTBEAT_INTERVAL):
+        self.path = path
+        self.heartbeat_interval = heartbeat_interval
+        self._stop = threading.Event()
+        self._heartbeat_thread = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connect()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        # A SQLite connection must not be used across fork(): a forked worker
+        # (gunicorn with preload_app) opens its own
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+
+    def _after_fork(self):
+        # The parent's connection is abandoned, not closed: closing it from the
+        # child could release locks the parent still relies on
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat_thread = None
+        self._connect()
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params)
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # ------------------------------------------------------------------- jobs
+
+    def create(self, job_id: str, input_type: str, upload_id: str, prompt: str = "",
+               goals: Optional[List[str]] = None):
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (job_id, kind, input_type, upload_id, prompt, goals, status, owner,"
+            " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+            (job_id, "variants" if goals is not None else "single", input_type, upload_id, prompt,
+             json.dumps(goals) if goals is not None else None, _owner(), now, now),
+        )
+
+    def mark_running(self, job_id: str):
+        self._execute(
+            "UPDATE jobs SET status = 'running', owner = ?, attempts = attempts + 1, updated_at = ?"
+            " WHERE job_id = ?",
+            (_owner(), time.time(), job_id),
+        )
+
+    def complete(self, job_id: str, result: dict):
+        self._execute(
+            "UPDATE jobs SET status = 'completed', result = ?, error = NULL, updated_at = ? WHERE job_id = ?",
+            (json.dumps(result), time.time(), job_id),
+        )
+
+    def fail(self, job_id: str, error: str):
+        self._execute(
+            "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE job_id = ?",
+            (error, time.time(), job_id),
+        )
+
+    def active_artifacts(self) -> List[str]:
+        """Uploads and checkpointed artifacts of unfinished jobs, which must not be collected."""
+        rows = self._query(
+            "SELECT upload_id AS artifact_id FROM jobs WHERE status IN (?, ?)"
+            " UNION SELECT c.artifact_id FROM checkpoints c JOIN jobs j ON j.job_id = c.job_id"
+            " WHERE j.status IN (?, ?)",
+            (*UNFINISHED, *UNFINISHED),
+        )
+        return [row["artifact_id"] for row in rows]
+
+    def get(self, job_id: str) -> Optional[dict]:
+        rows = self._query("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        if not rows:
+            return None
+        job = dict(rows[0])
+        job["goals"] = json.loads(job["goals"]) if job["goals"] else None
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["checkpoints"] = self.checkpoints(job_id)
+        return job
+
+    # -------------------------------------------------------------- ownership
+
+    def heartbeat(self):
+        self._execute(
+            "INSERT OR REPLACE INTO owners (owner, heartbeat_at) VALUES (?, ?)", (_owner(), time.time())
+        )
+
+    def start_heartbeat(self):
+        """Keep marking this process alive, so other processes don't claim its jobs."""
+        self.heartbeat()
+        if self._heartbeat_thread is not None or self.heartbeat_interval <= 0:
+            return
+        self._stop.clear()
+        self._heartbeat_thread = threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+
+    def stop_heartbeat(self):
+        self._stop.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join()
+            self._heartbeat_thread = None
+        self._execute("DELETE FROM owners WHERE owner = ?", (_owner(),))
+
+    def _beat(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                self.heartbeat()
+            except sqlite3.Error:
+                pass  # database busy; the next beat retries
+
+    def claim_orphaned(self) -> List[dict]:
+        """
+        Take over unfinished jobs whose owning process stopped heartbeating.
+
+        Each job is claimed with a conditional update, so when several
+        workers start at once only one resumes it.
+        """
+        cutoff = time.time() - _MISSED_HEARTBEATS * max(self.heartbeat_interval, 1)
+        alive = {
+            row["owner"]
+            for row in self._query("SELECT owner FROM owners WHERE heartbeat_at >= ?", (cutoff,))
+        }
+        claimed = []
+        for row in self._query(
+            "SELECT job_id, owner FROM jobs WHERE status IN (?, ?) ORDER BY created_at", UNFINISHED
+        ):
+            if row["owner"] in alive:
+                continue
+            cursor = self._execute(
+                "UPDATE jobs SET owner = ?, status = 'queued', updated_at = ?"
+                " WHERE job_id = ? AND owner IS ?",
+                (_owner(), time.time(), row["job_id"], row["owner"]),
+            )
+            if cursor.rowcount == 1:
+                claimed.append(self.get(row["job_id"]))
+        return claimed
+
+    # ------------------------------------------------------------ checkpoints
+
+    def save_checkpoint(self, job_id: str, stage: str, artifact_id: str):
+        self._execute(
+            "INSERT OR REPLACE INTO checkpoints (job_id, stage, artifact_id, created_at) VALUES (?, ?, ?, ?)",
+            (job_id, stage, artifact_id, time.time()),
+        )
+
+    def checkpoints(self, job_id: str) -> Dict[str, str]:
+        rows = self._query("SELECT stage, artifact_id FROM checkpoints WHERE job_id = ?", (job_id,))
+        return {row["stage"]: row["artifact_id"] for row in rows}
+
+    def checkpoint(self, job_id: str) -> Checkpoint:
+        """
+        Checkpoints for ``job_id``, inheriting reusable stages:
+
+        * its own checkpoints (when resuming after a restart);
+        * those of the latest failed attempt with the same upload and goals
+          (a client retry);
+        * the notes of any job on the same upload, since transcription
+          doesn't depend on the goal.
+        """
+        job = self.get(job_id)
+        inherited: Dict[str, str] = {}
+
+        rows = self._query(
+            "SELECT c.artifact_id FROM checkpoints c JOIN jobs j ON j.job_id = c.job_id"
+            " WHERE j.upload_id = ? AND j.input_type = ? AND c.stage = 'notes'"
+            " ORDER BY c.created_at DESC LIMIT 1",
+            (job["upload_id"], job["input_type"]),
+        )
+        if rows:
+            inherited["notes"] = rows[0]["artifact_id"]
+
+        rows = self._query(
+            "SELECT job_id FROM jobs WHERE upload_id = ? AND input_type = ? AND kind = ?"
+            " AND prompt = ? AND goals IS ? AND status = 'failed' AND job_id != ?"
+            " ORDER BY updated_at DESC LIMIT 1",
+            (job["upload_id"], job["input_type"], job["kind"], job["prompt"],
+             json.dumps(job["goals"]) if job["goals"] is not None else None, job_id),
+        )
+        if rows:
+            inherited.update(self.checkpoints(rows[0]["job_id"]))
+
+        inherited.update(job["checkpoints"])
+        return Checkpoint(self, job_id, inherited)
+
+    def prune(self, older_than: float) -> int:
+        """Delete finished jobs (and their checkpoints) last updated before ``older_than``."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM checkpoints WHERE job_id IN (SELECT job_id FROM jobs"
+                " WHERE status NOT IN (?, ?) AND updated_at < ?)",
+                (*UNFINISHED, older_than),
+            )
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status NOT IN (?, ?) AND updated_at < ?",
+                (*UNFINISHED, older_than),
+            )
+            self._conn.execute(
+                "DELETE FROM owners WHERE heartbeat_at < ?", (older_than,)
+            )
+        return cursor.rowcount
+
+
+job_store = JobStore()
+artifact_store.add_pin_source(job_store.active_artifacts)
@@ -6,11 +6,21 @@ Provides comprehensive metrics for audio processing and agent performance tracki
 
 from typing import Dict, Any, Optional, List
 from datetime import datetime
+import sys
+import threading
 import time
+import tracemalloc
 import asyncio
 from functools import wraps
 from contextlib import contextmanager
 
+from src.core.config import (
+    METRICS_SAMPLE_INTERVAL,
+    METRICS_TRACEMALLOC,
+    METRICS_MULTIPROC_DIR,
+    METRICS_CACHE_TTL,
+)
+
 from prometheus_client import (
     Counter,
     Histogram,
@@ -25,6 +35,11 @@ from prometheus_client import (
 # Create a custom registry for our metrics
 REGISTRY = CollectorRegistry()
 
+# In multiprocess mode (PROMETHEUS_MULTIPROC_DIR set before startup) every
+# process writes its samples to per-PID files in that directory and /metrics
+# aggregates them at scrape time. Gauges declare how they are aggregated.
+MULTIPROCESS_MODE = bool(METRICS_MULTIPROC_DIR)
+
 # =============================================================================
 # System-wide Metrics
 # =============================================================================
@@ -54,6 +69,7 @@ workflow_duration = Histogram(
 workflow_active = Gauge(
     'composition_assistant_workflow_active',
     'Number of currently active workflows',
+    multiprocess_mode='livesum',
     registry=REGISTRY
 )
 
@@ -73,6 +89,56 @@ api_request_duration = Histogram(
     registry=REGISTRY
 )
 
+job_queue_wait = Histogram(
+    'composition_assistant_job_queue_wait_seconds',
+    'Time a job waits for a pipeline worker before it starts',
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120),
+    registry=REGISTRY
+)
+
+admission_in_flight = Gauge(
+    'composition_assistant_admission_in_flight',
+    'Admitted jobs currently running on a pipeline worker',
+    multiprocess_mode='livesum',
+    registry=REGISTRY
+)
+
+admission_queue_depth = Gauge(
+    'composition_assistant_admission_queue_depth',
+    'Admitted jobs waiting for a pipeline worker',
+    multiprocess_mode='livesum',
+    registry=REGISTRY
+)
+
+admission_cost_in_flight = Gauge(
+    'composition_assistant_admission_cost_in_flight_seconds',
+    'Estimated cost (seconds of audio) of all admitted jobs',
+    multiprocess_mode='livesum',
+    registry=REGISTRY
+)
+
+admission_rejections_total = Counter(
+    'composition_assistant_admission_rejections_total',
+    'Jobs rejected by admission control',
+    ['reason'],  # reason: queue_full, cost_budget
+    registry=REGISTRY
+)
+
+coalesced_requests_total = Counter(
+    'composition_assistant_coalesced_requests_total',
+    'Calls that joined an identical call already in flight instead of running',
+    ['scope'],  # scope: job, transcription, llm
+    registry=REGISTRY
+)
+
+pipeline_stage_duration = Histogram(
+    'composition_assistant_pipeline_stage_duration_seconds',
+    'Duration of each pipeline stage',
+    ['stage'],  # stage: transcription, midi_to_json, reduce, llm, parse, render
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120),
+    registry=REGISTRY
+)
+
 # =============================================================================
 # Audio Processing Metrics
 # =============================================================================
@@ -120,6 +186,20 @@ notes_extracted = Summary(
     registry=REGISTRY
 )
 
+note_reduction_ratio = Histogram(
+    'composition_assistant_note_reduction_ratio',
+    'Fraction of extracted notes kept by note reduction',
+    buckets=(0.1, 0.25, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0),
+    registry=REGISTRY
+)
+
+notes_removed_total = Counter(
+    'composition_assistant_notes_removed_total',
+    'Notes removed by note reduction',
+    ['reason'],  # reason: short, quiet, merged, duplicate
+    registry=REGISTRY
+)
+
 # =============================================================================
 # LLM Agent Metrics
 # =============================================================================
@@ -139,6 +219,82 @@ llm_request_duration = Histogram(
     registry=REGISTRY
 )
 
+llm_route_decisions_total = Counter(
+    'composition_assistant_llm_route_decisions_total',
+    'Models chosen by the LLM router',
+    # reason: single_model, complexity, latency_budget
+    ['model', 'category', 'reason'],
+    registry=REGISTRY
+)
+
+llm_fallbacks_total = Counter(
+    'composition_assistant_llm_fallbacks_total',
+    'Retries on a larger model after a response failed validation',
+    ['from_model', 'to_model'],
+    registry=REGISTRY
+)
+
+llm_hedges_total = Counter(
+    'composition_assistant_llm_hedges_total',
+    'Duplicate LLM requests sent after the first was slower than the hedge delay',
+    # kind: host (same model elsewhere), model (smaller model); winner: primary, hedge, none
+    ['kind', 'winner'],
+    registry=REGISTRY
+)
+
+llm_timeouts_total = Counter(
+    'composition_assistant_llm_timeouts_total',
+    'LLM calls that missed their deadline',
+    ['model'],
+    registry=REGISTRY
+)
+
+llm_slot_wait = Histogram(
+    'composition_assistant_llm_slot_wait_seconds',
+    'Time LLM calls waited for one of the Ollama host\'s parallel slots',
+    ['host'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120),
+    registry=REGISTRY
+)
+
+llm_in_flight = Gauge(
+    'composition_assistant_llm_in_flight',
+    'LLM calls currently holding an Ollama host slot',
+    ['host'],
+    multiprocess_mode='livesum',
+    registry=REGISTRY
+)
+
+ollama_host_available = Gauge(
+    'composition_assistant_ollama_host_available',
+    'Whether an Ollama host is up and not ejected (1) or skipped (0)',
+    ['host'],
+    multiprocess_mode='max',
+    registry=REGISTRY
+)
+
+ollama_host_outstanding = Gauge(
+    'composition_assistant_ollama_host_outstanding',
+    'LLM calls routed to an Ollama host and not finished (queued or running)',
+    ['host'],
+    multiprocess_mode='livesum',
+    registry=REGISTRY
+)
+
+ollama_host_requests_total = Counter(
+    'composition_assistant_ollama_host_requests_total',
+    'LLM calls per Ollama host by outcome',
+    ['host', 'status'],
+    registry=REGISTRY
+)
+
+ollama_host_ejections_total = Counter(
+    'composition_assistant_ollama_host_ejections_total',
+    'Times an Ollama host was ejected after consecutive failures',
+    ['host'],
+    registry=REGISTRY
+)
+
 llm_response_length = Summary(
     'composition_assistant_llm_response_length_chars',
     'Length of LLM responses in characters',
@@ -205,9 +361,91 @@ errors_total = Counter(
 memory_usage = Gauge(
     'composition_assistant_memory_usage_bytes',
     'Current memory usage in bytes',
+    multiprocess_mode='livesum',  # total across live workers
+    registry=REGISTRY
+)
+
+cpu_usage = Gauge(
+    'composition_assistant_cpu_usage_percent',
+    'Process CPU usage in percent of one core, averaged over the sample interval',
+    multiprocess_mode='livesum',
+    registry=REGISTRY
+)
+
+stage_memory = Histogram(
+    'composition_assistant_stage_memory_bytes',
+    'Process memory growth while a pipeline stage ran',
+    # kind: python_peak (tracemalloc), rss_delta, rss_peak_growth (high-water mark).
+    # The figures are process-wide: exclusive="false" means other stages ran
+    # at the same time and their memory is included.
+    ['stage', 'kind', 'exclusive'],
+    buckets=(1e6, 4e6, 16e6, 64e6, 128e6, 256e6, 512e6, 1e9, 2e9, 4e9),
     registry=REGISTRY
 )
 
+# =============================================================================
+# Memory Sampling Helpers
+# =============================================================================
+
+# Stages being measured by track_memory, and those that overlapped another one
+_memory_lock = threading.Lock()
+_memory_active: set = set()
+_memory_overlapped: set = set()
+
+
+def _current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, if psutil is available."""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def _peak_rss() -> Optional[int]:
+    """Process RSS high-water mark in bytes, if the platform reports it."""
+    try:
+        import resource
+    except ImportError:
+        return None  # not available on Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class ResourceSampler:
+    """Background thread that refreshes the RSS and CPU gauges on a fixed interval."""
+
+    def __init__(self, interval: float = METRICS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return self
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        try:
+            import psutil
+        except ImportError:
+            return  # psutil not installed
+        process = psutil.Process()
+        process.cpu_percent(None)  # first call only primes the counter
+        while not self._stop.wait(self.interval):
+            memory_usage.set(process.memory_info().rss)
+            cpu_usage.set(process.cpu_percent(None))
+
+
 # =============================================================================
 # Metric Collection Utilities
 # =============================================================================
@@ -229,6 +467,10 @@ class MetricsCollector:
         
         self._initialized = True
         self.start_time = time.time()
+        self._cache: Optional[bytes] = None
+        self._cache_time = 0.0
+        self._cache_lock = threading.Lock()
+        self._multiprocess_registry: Optional[CollectorRegistry] = None
         
         # Set system info
         system_info.info({
@@ -250,6 +492,71 @@ class MetricsCollector:
             else:
                 histogram.observe(duration)
     
+    @contextmanager
+    def track_stage(self, stage: str, timings: Optional[Dict[str, float]] = None):
+        """
+        Context manager to time one pipeline stage.
+
+        The duration is observed in the stage histogram and, if a dict is
+        given, stored under ``timings[stage]`` for the per-job breakdown.
+        """
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - start_time
+            pipeline_stage_duration.labels(stage=stage).observe(duration)
+            if timings is not None:
+                timings[stage] = round(duration, 4)
+
+    @contextmanager
+    def track_memory(self, stage: str, usage: Optional[Dict[str, int]] = None):
+        """
+        Context manager to measure the process's memory growth during one
+        pipeline stage.
+
+        RSS delta and RSS high-water-mark growth cover native allocations
+        (TensorFlow, FluidSynth). When METRICS_TRACEMALLOC is on, the
+        tracemalloc peak covers Python allocations as well. All of them are
+        process-wide, so they are only the stage's own while no other stage
+        runs: the metric is labelled ``exclusive`` accordingly.
+
+        If a dict is given, the measurements are stored in it by kind, only
+        for exclusive runs.
+        """
+        measurement = object()
+        with _memory_lock:
+            # Every stage running alongside another one is not exclusive
+            exclusive = not _memory_active
+            _memory_overlapped.update(_memory_active)
+            _memory_active.add(measurement)
+        if METRICS_TRACEMALLOC and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracing_python = tracemalloc.is_tracing()
+        if tracing_python:
+            python_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        rss_start = _current_rss()
+        peak_start = _peak_rss()
+        try:
+            yield
+        finally:
+            measured = {}
+            if tracing_python:
+                measured["python_peak"] = max(0, tracemalloc.get_traced_memory()[1] - python_start)
+            if rss_start is not None:
+                measured["rss_delta"] = _current_rss() - rss_start
+            if peak_start is not None:
+                measured["rss_peak_growth"] = _peak_rss() - peak_start
+            with _memory_lock:
+                _memory_active.discard(measurement)
+                exclusive = exclusive and measurement not in _memory_overlapped
+                _memory_overlapped.discard(measurement)
+            for kind, value in measured.items():
+                stage_memory.labels(stage=stage, kind=kind, exclusive=str(exclusive).lower()).observe(max(0, value))
+            if usage is not None and exclusive:
+                usage.update(measured)
+
     def track_workflow(self):
         """Decorator to track complete workflow execution."""
         def decorator(func):
@@ -315,8 +622,10 @@ class MetricsCollector:
                     
                     return result
                 except Exception as e:
-                    status = "error"
-                    errors_total.labels(stage="llm", error_type=type(e).__name__).inc()
+                    # Abandoned requests (see src.clients.transport) aren't errors
+                    status = getattr(e, "metric_status", "error")
+                    if status != "cancelled":
+                        errors_total.labels(stage="llm", error_type=type(e).__name__).inc()
                     raise
                 finally:
                     duration = time.time() - start_time
@@ -358,10 +667,66 @@ class MetricsCollector:
         """Record number of notes extracted."""
         notes_extracted.observe(count)
     
+    def record_note_reduction(self, stats: dict):
+        """Record what note reduction kept and removed (see src.utils.note_reduction)."""
+        if stats["before"]:
+            note_reduction_ratio.observe(stats["after"] / stats["before"])
+        for reason in ("short", "quiet", "merged", "duplicate"):
+            if stats[reason]:
+                notes_removed_total.labels(reason=reason).inc(stats[reason])
+
     def record_notes_modified(self, count: int):
         """Record number of notes modified."""
         notes_modified.observe(count)
     
+    def record_queue_wait(self, seconds: float):
+        """Record how long a job waited for a pipeline worker."""
+        job_queue_wait.observe(seconds)
+
+    def record_llm_route(self, model: str, category: str, reason: str):
+        """Record the model the router picked for a request."""
+        llm_route_decisions_total.labels(model=model, category=category, reason=reason).inc()
+
+    def record_llm_fallback(self, from_model: str, to_model: str):
+        """Record a retry on a larger model after invalid output."""
+        llm_fallbacks_total.labels(from_model=from_model, to_model=to_model).inc()
+
+    def record_llm_hedge(self, kind: str, winner: str):
+        """Record a hedged LLM request and which request answered."""
+        llm_hedges_total.labels(kind=kind, winner=winner).inc()
+
+    def record_llm_timeout(self, model: str):
+        """Record an LLM call abandoned at its deadline."""
+        llm_timeouts_total.labels(model=model).inc()
+
+    def record_llm_slot_wait(self, host: str, seconds: float):
+        """Record how long an LLM call queued for a host slot."""
+        llm_slot_wait.labels(host=host).observe(seconds)
+
+    def set_llm_in_flight(self, host: str, count: int):
+        """Set the number of LLM calls in flight on a host."""
+        llm_in_flight.labels(host=host).set(count)
+
+    def set_ollama_host_available(self, host: str, available: bool):
+        """Set whether an Ollama host currently takes calls."""
+        ollama_host_available.labels(host=host).set(1 if available else 0)
+
+    def set_ollama_host_outstanding(self, host: str, count: int):
+        """Set the number of calls outstanding on an Ollama host."""
+        ollama_host_outstanding.labels(host=host).set(count)
+
+    def record_ollama_host_request(self, host: str, status: str):
+        """Record the outcome of an LLM call on an Ollama host."""
+        ollama_host_requests_total.labels(host=host, status=status).inc()
+
+    def record_ollama_host_ejection(self, host: str):
+        """Record an Ollama host being ejected from the pool."""
+        ollama_host_ejections_total.labels(host=host).inc()
+
+    def record_coalesced(self, scope: str):
+        """Record a call served by an identical one already in flight."""
+        coalesced_requests_total.labels(scope=scope).inc()
+
     def record_output_file(self, format: str, file_size: int, status: str = "success"):
         """Record output file generation metrics."""
         output_generation_total.labels(format=format, status=status).inc()
@@ -389,14 +754,43 @@ class MetricsCollector:
             pass  # psutil not installed
     
     def get_metrics(self) -> bytes:
-        """Generate Prometheus metrics output."""
-        self.update_resource_metrics()
-        return generate_latest(REGISTRY)
+        """
+        Generate Prometheus metrics output.
+
+        Rendered output is cached for METRICS_CACHE_TTL seconds, since in
+        multiprocess mode every scrape reads and merges all per-PID files.
+        """
+        with self._cache_lock:
+            now = time.time()
+            if self._cache is not None and now - self._cache_time < METRICS_CACHE_TTL:
+                return self._cache
+
+            self.update_resource_metrics()
+            self._cache = generate_latest(self._scrape_registry())
+            self._cache_time = now
+            return self._cache
+
+    def _scrape_registry(self) -> CollectorRegistry:
+        """Registry to render: the in-process one, or an aggregating one."""
+        if not MULTIPROCESS_MODE:
+            return REGISTRY
+        if self._multiprocess_registry is None:
+            from prometheus_client import multiprocess
+
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            # Info metrics are not stored in the shared files; serve ours directly
+            registry.register(system_info)
+            self._multiprocess_registry = registry
+        return self._multiprocess_registry
 
 
 # Global metrics collector instance
 metrics_collector = MetricsCollector()
 
+# Background RSS/CPU sampler; started from the API lifespan hook
+resource_sampler = ResourceSampler()
+
 
 def get_metrics_output() -> bytes:
     """Get current metrics in Prometheus format."""
@@ -1,7 +1,11 @@
+import contextvars
 import pretty_midi
 from dotenv import load_dotenv
 import os
 
+from src.utils.metrics import metrics_collector
+from src.utils import tracing
+
 load_dotenv()   # looks for .env in current working dir or up the tree
 
 # Now safe defaults + override from .env
@@ -10,10 +14,39 @@ DEFAULT_SOUNDFONT = os.getenv(
     "/app/FluidR3_GM/FluidR3_GM.sf2"          # fallback for Docker if .env missing
 )
 
+# Per-note fields naming the track (MIDI instrument) a note belongs to
+TRACK_FIELDS = ("track", "program", "is_drum")
+
+
+def split_tracks(notes_json):
+    """
+    Group notes by track, in order of first appearance.
+
+    Returns:
+        list of (track, notes) pairs: ``track`` holds the notes' TRACK_FIELDS
+        (empty for notes without them), ``notes`` the notes without them
+    """
+    tracks = {}
+    for n in notes_json:
+        track = {f: n[f] for f in TRACK_FIELDS if f in n}
+        key = tuple(track.items())
+        if key not in tracks:
+            tracks[key] = (track, [])
+        tracks[key][1].append({k: v for k, v in n.items() if k not in TRACK_FIELDS})
+    return list(tracks.values())
+
+
+def join_tracks(tracks):
+    """Inverse of ``split_tracks``: one list with each note tagged with its track."""
+    return [{**n, **track} for track, notes in tracks for n in notes]
+
+
+@metrics_collector.track_midi_conversion("to_json")
 def midi_to_json(midi_input):
     """
     Convert a PrettyMIDI object or a MIDI file path into JSON-readable note events.
-    Returns a list of dicts with keys: pitch, start, end, velocity.
+    Returns a list of dicts with keys: pitch, start, end, velocity, and the
+    track (instrument index), program and is_drum of the note's instrument.
     """
     if isinstance(midi_input, pretty_midi.PrettyMIDI):
         midi = midi_input
@@ -23,23 +56,71 @@ def midi_to_json(midi_input):
         raise TypeError("midi_input must be a file path or PrettyMIDI object")
 
     notes_json = []
-    for instrument in midi.instruments:
+    for index, instrument in enumerate(midi.instruments):
         for note in instrument.notes:
             notes_json.append({
                 "pitch": note.pitch,
                 "start": note.start,
                 "end": note.end,
-                "velocity": note.velocity
+                "velocity": note.velocity,
+                "track": index,
+                "program": int(instrument.program),
+                "is_drum": bool(instrument.is_drum),
             })
 
     return notes_json
 
+
+def _instrument(track, notes):
+    instrument = pretty_midi.Instrument(
+        program=int(track.get("program", 0)), is_drum=bool(track.get("is_drum", False))
+    )
+    for n in notes:
+        instrument.notes.append(
+            pretty_midi.Note(
+                pitch=int(n["pitch"]),
+                start=float(n["start"]),
+                end=float(n["end"]),
+                velocity=int(n["velocity"]),
+            )
+        )
+    return instrument
+
+
+def mix_waveforms(waveforms):
+    """
+    Sum waveforms of different lengths and normalize the peak to 1, as
+    PrettyMIDI.fluidsynth does. Each track is added to a preallocated buffer
+    in one numpy operation.
+    """
+    import numpy as np
+
+    mix = np.zeros(max((len(w) for w in waveforms), default=0))
+    for waveform in waveforms:
+        mix[:len(waveform)] += waveform
+    peak = np.abs(mix).max() if len(mix) else 0.0
+    return mix / peak if peak > 0 else mix
+
+
+def _synthesize_track(track, notes, soundfont):
+    with tracing.span("synthesize_track", notes=len(notes), program=track.get("program", 0)):
+        return _instrument(track, notes).fluidsynth(fs=44100, sf2_path=soundfont)
+
+
+@metrics_collector.track_midi_conversion("to_wav")
 def json_to_wav(
     notes_json,
     output_path,
-    soundfont = DEFAULT_SOUNDFONT
-
+    soundfont=DEFAULT_SOUNDFONT,
+    executor=None,
 ):
+    """
+    Render note events to a WAV file, each track with its own program.
+
+    With an ``executor`` and several tracks, tracks are synthesized
+    concurrently (one FluidSynth instance each) and mixed; otherwise they
+    are synthesized in turn by one instance.
+    """
     import os
     import numpy as np
     import pretty_midi
@@ -49,24 +130,22 @@ def json_to_wav(
     if not os.path.isfile(soundfont):
         raise FileNotFoundError(f"SoundFont not found at {soundfont}")
 
-    # JSON → PrettyMIDI
-    midi = pretty_midi.PrettyMIDI()
-    instrument = pretty_midi.Instrument(program=0)
-
-    for n in notes_json:
-        instrument.notes.append(
-            pretty_midi.Note(
-                pitch=int(n["pitch"]),
-                start=float(n["start"]),
-                end=float(n["end"]),
-                velocity=int(n["velocity"]),
-            )
-        )
-
-    midi.instruments.append(instrument)
+    tracks = split_tracks(notes_json)
 
     # Render audio (float32, range ~[-1, 1])
-    audio = midi.fluidsynth(fs=44100, sf2_path=soundfont)
+    with tracing.span("synthesize", notes=len(notes_json), tracks=len(tracks)):
+        if executor is not None and len(tracks) > 1:
+            # Each task gets a copy of the current context so its span joins the trace
+            futures = [
+                executor.submit(contextvars.copy_context().run, _synthesize_track, track, notes, soundfont)
+                for track, notes in tracks
+            ]
+            audio = mix_waveforms([future.result() for future in futures])
+        else:
+            # JSON → PrettyMIDI
+            midi = pretty_midi.PrettyMIDI()
+            midi.instruments.extend(_instrument(track, notes) for track, notes in tracks)
+            audio = midi.fluidsynth(fs=44100, sf2_path=soundfont)
 
     # 🔑 Convert float32 → int16 (THIS IS THE FIX)
     audio = np.clip(audio, -1.0, 1.0)
@@ -80,4 +159,5 @@ def json_to_wav(
         channels=1,
     )
 
-    segment.export(output_path, format="wav")
+    with tracing.span("export", format="wav", samples=len(audio_int16)):
+        segment.export(output_path, format="wav")
@@ -0,0 +1,117 @@
+"""
+Note reduction between note extraction and the LLM.
+
+Transcriptions are noisy: ghost notes, very short blips, the same pitch
+re-triggered a few milliseconds apart, near-silent velocities. Every note
+costs prompt and completion tokens and render time, so those are dropped or
+merged before the notes reach the LLM. Filtering and merging run on numpy
+arrays over all tracks at once.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+from src.core.config import (
+    NOTE_MIN_DURATION,
+    NOTE_MIN_VELOCITY,
+    NOTE_ONSET_WINDOW,
+    NOTE_QUANTIZE_GRID,
+)
+from src.utils.midi_json import TRACK_FIELDS
+
+# Times are rounded to this many decimals (milliseconds); more only costs tokens
+_TIME_DECIMALS = 3
+# Merging works on integer microseconds, so offsetting times stays exact
+_TICKS_PER_SECOND = 1_000_000
+
+
+def reduce_notes(notes_json: List[dict], min_duration: float = NOTE_MIN_DURATION,
+                 min_velocity: int = NOTE_MIN_VELOCITY, onset_window: float = NOTE_ONSET_WINDOW,
+                 quantize_grid: float = NOTE_QUANTIZE_GRID) -> Tuple[List[dict], dict]:
+    """
+    Drop and merge notes that don't carry musical information.
+
+    In order:
+    1. notes shorter than ``min_duration`` seconds or with a velocity below
+       ``min_velocity`` are dropped;
+    2. with ``quantize_grid`` (seconds) set, starts and ends snap to the grid
+       (notes keep at least one grid step);
+    3. notes of the same pitch and track that overlap (one starts before
+       the other ends; notes that only touch are repeated notes and stay
+       apart), or whose onsets fall in the same ``onset_window``-second
+       bucket, become one note spanning them all, with the loudest velocity.
+
+    Returns:
+        (notes sorted by track and start, stats) where stats counts notes
+        ``before``, ``after`` and removed as ``short``, ``quiet``,
+        ``merged`` (overlapping) and ``duplicate`` (repeated onset)
+    """
+    stats = {"before": len(notes_json), "after": 0, "short": 0, "quiet": 0, "merged": 0, "duplicate": 0}
+    if not notes_json:
+        return [], stats
+
+    # Tracks as small integers; their fields are put back on the output notes
+    tracks, track_ids = {}, []
+    for n in notes_json:
+        track = tuple((f, n[f]) for f in TRACK_FIELDS if f in n)
+        track_ids.append(tracks.setdefault(track, len(tracks)))
+    track_id = np.array(track_ids, dtype=np.int64)
+    pitch = np.array([int(n["pitch"]) for n in notes_json], dtype=np.int64)
+    start = np.array([float(n["start"]) for n in notes_json])
+    end = np.array([float(n["end"]) for n in notes_json])
+    velocity = np.array([int(n["velocity"]) for n in notes_json], dtype=np.int64)
+
+    # 1. Blips and ghost notes
+    short = (end - start) < min_duration
+    quiet = ~short & (velocity < min_velocity)
+    stats["short"], stats["quiet"] = int(short.sum()), int(quiet.sum())
+    keep = ~(short | quiet)
+    track_id, pitch, start, end, velocity = (a[keep] for a in (track_id, pitch, start, end, velocity))
+    if not len(pitch):
+        return [], stats
+
+    # 2. Grid quantization
+    if quantize_grid > 0:
+        start = np.round(start / quantize_grid) * quantize_grid
+        end = np.maximum(np.round(end / quantize_grid) * quantize_grid, start + quantize_grid)
+
+    # 3. Merge runs of the same pitch on the same track
+    start = np.round(start * _TICKS_PER_SECOND).astype(np.int64)
+    end = np.round(end * _TICKS_PER_SECOND).astype(np.int64)
+    window = round(onset_window * _TICKS_PER_SECOND)
+    # Onset buckets: notes repeating an onset within one bucket are duplicates
+    bucket = start // window if window > 0 else np.arange(len(start))
+    order = np.lexsort((start, pitch, track_id))
+    track_id, pitch, start, end, velocity, bucket = (
+        a[order] for a in (track_id, pitch, start, end, velocity, bucket)
+    )
+    group = np.concatenate(([0], np.cumsum((np.diff(track_id) != 0) | (np.diff(pitch) != 0))))
+    # Running max of end within each group: offsetting groups apart lets one
+    # cumulative max over the whole array stand in for a per-group one
+    offset = group * (end.max() - min(start.min(), 0) + 1)
+    reach = np.maximum.accumulate(end + offset) - offset
+    same_group = np.concatenate(([False], group[1:] == group[:-1]))
+    overlaps = same_group & np.concatenate(([False], start[1:] < reach[:-1]))
+    repeated = same_group & ~overlaps & np.concatenate(([False], np.diff(bucket) == 0))
+    stats["merged"], stats["duplicate"] = int(overlaps.sum()), int(repeated.sum())
+    heads = np.flatnonzero(~(overlaps | repeated))
+    # Each run spans from its first start to the latest end among its notes
+    run_end = np.maximum.reduceat(end, heads)
+    run_velocity = np.maximum.reduceat(velocity, heads)
+
+    # Back to note dicts, in track then time order
+    track_fields = list(tracks)
+    result_order = np.lexsort((pitch[heads], start[heads], track_id[heads]))
+    reduced = []
+    for i in result_order:
+        head = heads[i]
+        reduced.append({
+            "pitch": int(pitch[head]),
+            "start": round(int(start[head]) / _TICKS_PER_SECOND, _TIME_DECIMALS),
+            "end": round(int(run_end[i]) / _TICKS_PER_SECOND, _TIME_DECIMALS),
+            "velocity": int(run_velocity[i]),
+            **dict(track_fields[track_id[head]]),
+        })
+    stats["after"] = len(reduced)
+    return reduced, stats
@@ -0,0 +1,226 @@
+"""
+On-demand sampling profiler for live API workers.
+
+A background thread periodically snapshots every thread's Python stack with
+``sys._current_frames()`` and counts identical stacks. Nothing is hooked into
+the interpreter, so overhead is limited to the sampling thread itself and the
+profiler can be attached to a running process at any time.
+
+Pipeline stages register themselves per thread (see ``stage``), so samples
+taken while a job runs are prefixed with the stage they belong to. Stages
+also record which next-job profile (if any) their job is under, so that
+profile only samples its own job's threads.
+
+Profiles export as collapsed stacks (flamegraph.pl / speedscope input) or as
+speedscope's own JSON format.
+"""
+
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# thread id -> stack of (stage name, profiler of its job) currently running on that thread
+_thread_stages: Dict[int, List[Tuple[str, Optional["SamplingProfiler"]]]] = {}
+# The next-job profile of the job running in this context; worker threads
+# inherit it through copied contexts
+_job_profiler: contextvars.ContextVar = contextvars.ContextVar("job_profiler", default=None)
+
+Frame = Tuple[str, str, int]  # (qualified name, file, first line)
+
+
+@contextmanager
+def stage(name: str):
+    """Mark the current thread as running pipeline stage ``name``."""
+    stages = _thread_stages.setdefault(threading.get_ident(), [])
+    stages.append((name, _job_profiler.get()))
+    try:
+        yield
+    finally:
+        stages.pop()
+        if not stages:
+            _thread_stages.pop(threading.get_ident(), None)
+
+
+def _frame_key(frame) -> Frame:
+    code = frame.f_code
+    return (getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno)
+
+
+class SamplingProfiler:
+    """Samples thread stacks at a fixed interval until stopped."""
+
+    def __init__(self, interval: float = 0.01, thread_ids: Optional[Iterable[int]] = None,
+                 staged_threads: bool = False):
+        """
+        Args:
+            interval: Seconds between samples
+            thread_ids: Only sample these threads (default: all threads)
+            staged_threads: Also sample any thread currently running a
+                pipeline stage of the job this profiler was set up for
+                (see ``ProfileSession.job``), even if not listed in ``thread_ids``
+        """
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        self.staged_threads = staged_threads
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.time()
+        return self
+
+    def _wanted(self, thread_id: int) -> bool:
+        if self.thread_ids is None:
+            return True
+        if thread_id in self.thread_ids:
+            return True
+        if not self.staged_threads:
+            return False
+        return any(owner is self for _, owner in _thread_stages.get(thread_id, ()))
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or not self._wanted(thread_id):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_key(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                stages = _thread_stages.get(thread_id)
+                if stages:
+                    stack.insert(0, (f"[stage:{stages[-1][0]}]", "", 0))
+                self.samples[tuple(stack)] += 1
+                self.sample_count += 1
+
+    def to_collapsed(self) -> str:
+        """Collapsed-stack text: one ``frame;frame;frame count`` line per stack."""
+        lines = []
+        for stack, count in self.samples.most_common():
+            names = [
+                name if not file else f"{name} ({os.path.basename(file)}:{line})"
+                for name, file, line in stack
+            ]
+            lines.append(f"{';'.join(names)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self, name: str = "Composition Assistant") -> dict:
+        """speedscope file-format JSON with one sampled profile."""
+        frames: List[dict] = []
+        frame_index: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            indices = []
+            for key in stack:
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frame = {"name": key[0]}
+                    if key[1]:
+                        frame.update(file=key[1], line=key[2])
+                    frames.append(frame)
+                indices.append(frame_index[key])
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        duration = (self.stopped_at or time.time()) - (self.started_at or time.time())
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "composition-assistant",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(duration, 6),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class ProfileSession:
+    """Coordinates on-demand profiles so only one runs at a time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.busy = False
+        self._armed: Optional[dict] = None
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.busy:
+                return False
+            self.busy = True
+            return True
+
+    def release(self):
+        with self._lock:
+            self.busy = False
+            self._armed = None
+
+    def profile_for(self, seconds: float, interval: float) -> SamplingProfiler:
+        """Profile every thread for ``seconds``. Blocking; call after acquire()."""
+        profiler = SamplingProfiler(interval=interval).start()
+        time.sleep(seconds)
+        return profiler.stop()
+
+    def arm_next_job(self, interval: float) -> dict:
+        """
+        Profile the next job run. Call after acquire().
+
+        Returns a handle whose ``done`` event is set when the job finishes;
+        ``handle["profiler"]`` then holds the result.
+        """
+        handle = {"interval": interval, "done": threading.Event(), "profiler": None}
+        with self._lock:
+            self._armed = handle
+        return handle
+
+    @contextmanager
+    def job(self):
+        """Wrap a job run; profiles it if a next-job profile is armed."""
+        with self._lock:
+            handle, self._armed = self._armed, None
+        if handle is None:
+            yield
+            return
+
+        profiler = SamplingProfiler(
+            interval=handle["interval"],
+            thread_ids=[threading.get_ident()],
+            staged_threads=True,
+        )
+        token = _job_profiler.set(profiler)
+        profiler.start()
+        try:
+            yield
+        finally:
+            _job_profiler.reset(token)
+            handle["profiler"] = profiler.stop()
+            handle["done"].set()
+
+
+profile_session = ProfileSession()
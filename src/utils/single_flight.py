@@ -0,0 +1,132 @@
+"""
+Single-flight coalescing of identical in-flight work.
+
+While a call for a key is running, further calls with the same key don't
+start their own; they wait for the running one and get its result, or its
+exception. A burst of N identical requests costs one pipeline run. Keys are
+only held while in flight; finished results are not cached here (completed
+stages are reused through the artifact store and job checkpoints instead).
+
+Waiters get a deep copy of the result, so callers may mutate what they get.
+"""
+
+import asyncio
+import copy
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from src.core.config import COALESCE_REQUESTS
+from src.utils import events
+from src.utils import tracing
+from src.utils.metrics import metrics_collector
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with equal keys, from threads or coroutines."""
+
+    def __init__(self, scope: str, enabled: bool = COALESCE_REQUESTS):
+        """
+        Args:
+            scope: Label for metrics and events ("job", "transcription", "llm")
+            enabled: When False every call runs on its own
+        """
+        self.scope = scope
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run ``fn(*args, **kwargs)`` unless an identical call is in flight.
+
+        Returns:
+            (result, shared) where ``shared`` is True if another caller ran it
+
+        Raises:
+            Whatever the call that ran raised
+        """
+        if not self.enabled:
+            return fn(*args, **kwargs), False
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            start_time = time.time()
+            self._joined()
+            call.done.wait()
+            tracing.add_span(f"{self.scope}_coalesced", start_time, time.time())
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable],
+                       on_join: Optional[Callable[[], None]] = None) -> Tuple[Any, bool]:
+        """
+        Coroutine version of ``do``: awaits ``fn()`` unless an identical call
+        is in flight. The work runs as a task of its own, so a caller that
+        goes away (cancelled request) doesn't cancel it for the others.
+
+        Args:
+            on_join: Called right away if this caller joins another's call,
+                e.g. to release capacity it reserved for running it itself
+        """
+        if not self.enabled:
+            return await fn(), False
+
+        with self._lock:
+            task = self._tasks.get(key)
+            leader = task is None
+            if leader:
+                # The task copies the current context, so it runs under the leader's job
+                task = self._tasks[key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda _: self._forget(key, task))
+
+        if leader:
+            return await asyncio.shield(task), False
+        self._joined()
+        if on_join is not None:
+            on_join()
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result), True
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    def _joined(self):
+        metrics_collector.record_coalesced(self.scope)
+        events.emit("coalesced", scope=self.scope)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._tasks)
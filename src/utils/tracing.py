@@ -0,0 +1,206 @@
+"""
+Per-job trace recording for Composition Assistant.
+
+A lightweight in-process span recorder: each job gets a trace made of nested,
+timed spans with attributes (note counts, token counts, ...). Recent traces are
+kept in a ring buffer and can be exported as Chrome trace-event JSON, which
+loads directly in chrome://tracing, Perfetto or speedscope. No external
+collector is needed.
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from src.core.config import TRACE_BUFFER_SIZE
+
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """A single timed operation within a trace."""
+
+    __slots__ = ("span_id", "parent_id", "name", "start", "end", "thread_id", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[int] = None, start: float = None):
+        self.span_id = next(_span_ids)
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time() if start is None else start
+        self.end: Optional[float] = None
+        self.thread_id = threading.get_ident()
+        self.attributes: Dict[str, Any] = {}
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self, end: float = None):
+        self.end = time.time() if end is None else end
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+
+class Trace:
+    """All spans recorded for one job."""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.created_at = time.time()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Export as Chrome trace-event JSON (complete "X" events, microseconds)."""
+        with self._lock:
+            spans = list(self.spans)
+
+        pid = os.getpid()
+        # Small, stable thread ids read better in trace viewers
+        tids = {}
+        events = []
+        for span in spans:
+            tid = tids.setdefault(span.thread_id, len(tids) + 1)
+            end = span.end if span.end is not None else time.time()
+            events.append({
+                "name": span.name,
+                "cat": "pipeline",
+                "ph": "X",
+                "ts": round((span.start - self.created_at) * 1e6, 1),
+                "dur": round((end - span.start) * 1e6, 1),
+                "pid": pid,
+                "tid": tid,
+                "args": {
+                    **span.attributes,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                },
+            })
+        for thread_id, tid in tids.items():
+            events.append({
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": f"thread-{thread_id}"},
+            })
+
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "trace_id": self.trace_id,
+                "created_at": self.created_at,
+            },
+        }
+
+
+class TraceRecorder:
+    """Ring buffer of the most recent traces, keyed by job ID."""
+
+    def __init__(self, max_traces: int = TRACE_BUFFER_SIZE):
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start_trace(self, trace_id: str) -> Trace:
+        trace = Trace(trace_id)
+        with self._lock:
+            self._traces[trace_id] = trace
+            self._traces.move_to_end(trace_id)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        return trace
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+    def recent_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._traces.keys())
+
+
+trace_recorder = TraceRecorder()
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def start_trace(trace_id: str):
+    """Start a new trace and make it current for the enclosed block."""
+    trace = trace_recorder.start_trace(trace_id)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Record a span nested under the current one.
+
+    Outside of a trace this is a no-op that still yields a Span, so callers
+    can set attributes unconditionally.
+    """
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    s = Span(name, parent_id=parent.span_id if parent else None)
+    s.set_attributes(**attributes)
+    if trace is None:
+        yield s
+        return
+
+    trace.add(s)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except Exception as e:
+        s.set_attributes(error=type(e).__name__)
+        raise
+    finally:
+        s.finish()
+        _current_span.reset(token)
+
+
+def add_span(name: str, start: float, end: float, **attributes) -> Optional[Span]:
+    """Record an already-finished span (e.g. phases reported by a server)."""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    parent = _current_span.get()
+    s = Span(name, parent_id=parent.span_id if parent else None, start=start)
+    s.set_attributes(**attributes)
+    s.finish(end)
+    trace.add(s)
+    return s
+
+
+def set_attributes(**attributes):
+    """Attach attributes to the current span, if any."""
+    s = _current_span.get()
+    if s is not None:
+        s.set_attributes(**attributes)
@@ -1,14 +1,48 @@
-from basic_pitch.inference import predict
+import threading
+
 import pretty_midi
 import numpy as np
 
+from src.utils.metrics import metrics_collector
+
+# basic_pitch pulls in TensorFlow, so it is imported on first use rather than
+# at module load. The loaded model is cached and reused across requests.
+_model = None
+_model_lock = threading.Lock()
+
+
+def load_transcription_model():
+    """
+    Load (once) and return the basic-pitch model.
+
+    Safe to call from a background warm-up thread; concurrent callers
+    wait for the first load to finish.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from basic_pitch import ICASSP_2022_MODEL_PATH
+                from basic_pitch.inference import Model
+
+                _model = Model(ICASSP_2022_MODEL_PATH)
+    return _model
+
+
+def is_transcription_model_loaded() -> bool:
+    """Return True once the basic-pitch model has been loaded."""
+    return _model is not None
+
+
+@metrics_collector.track_transcription()
 def transcribe_audio(audio_path: str) -> pretty_midi.PrettyMIDI:
     """
     Transcribe WAV to a PrettyMIDI object, handling
     both tuple and dict return formats from basic_pitch.predict().
     """
+    from basic_pitch.inference import predict
 
-    result = predict(audio_path)
+    result = predict(audio_path, load_transcription_model())
 
     # Case 1: predict returns (model_out, midi_obj, note_events)
     if isinstance(result, tuple) and len(result) >= 2:
@@ -0,0 +1,197 @@
+"""
+Background warm-up of heavy pipeline dependencies.
+
+Importing the API must stay cheap so uvicorn can answer /health right away.
+The expensive pieces (the basic-pitch TensorFlow model, the SoundFont and the
+Ollama model) are loaded here in a background thread started from the FastAPI
+lifespan hook, and their state is reported by the /ready endpoint.
+
+Under gunicorn with preload_app, ``preload_shared`` runs in the master before
+it forks the workers, so the libraries it imports are shared copy-on-write
+instead of loaded once per worker. The master must stay fork-safe: it imports
+TensorFlow but builds no model (TensorFlow's thread pools start with the
+first model and don't survive a fork), and starts no threads. Each worker
+then loads the model itself in its lifespan warm-up.
+"""
+
+import importlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from src.core.config import WARMUP_RETRY_INTERVAL
+from src.utils.midi_json import DEFAULT_SOUNDFONT
+
+# Read size used when pulling the SoundFont into the page cache
+_SOUNDFONT_READ_CHUNK = 8 * 1024 * 1024
+
+COMPONENTS = ("transcription_model", "soundfont", "ollama_model")
+
+# Heavy libraries the pipeline imports on first use. basic_pitch.inference
+# imports TensorFlow (and the other backends installed) without building a model.
+SHARED_MODULES = ("basic_pitch.inference", "librosa", "scipy.signal", "fluidsynth", "ollama", "httpx")
+
+
+class WarmupState:
+    """Thread-safe record of which components are warm."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = None
+        self.components: Dict[str, Dict[str, Any]] = {
+            name: {"status": "pending"} for name in COMPONENTS
+        }
+
+    def update(self, name: str, **fields):
+        with self._lock:
+            self.components[name].update(fields)
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return all(c["status"] == "ready" for c in self.components.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": all(c["status"] == "ready" for c in self.components.values()),
+                "started_at": self.started_at,
+                "components": {name: dict(c) for name, c in self.components.items()},
+            }
+
+
+warmup_state = WarmupState()
+
+
+def _warm_transcription_model():
+    from src.utils.transcribe import load_transcription_model
+
+    load_transcription_model()
+
+
+def _warm_soundfont():
+    path = os.path.expanduser(DEFAULT_SOUNDFONT)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"SoundFont not found at {path}")
+    # Read the file once so the first render hits the page cache, not the disk
+    with open(path, "rb") as f:
+        while f.read(_SOUNDFONT_READ_CHUNK):
+            pass
+
+
+def _warm_ollama_model():
+    from src.clients.host_pool import ollama_pool
+    from src.clients.llm import warm_up_model
+    from src.clients.router import model_router
+
+    # Every model the router may pick, on every host, so none of them
+    # cold-starts a request. Ready once each model is loaded somewhere.
+    for model in model_router.names:
+        errors = []
+        for host in ollama_pool.urls:
+            try:
+                warm_up_model(model, host)
+            except Exception as e:
+                errors.append(f"{host}: {e}")
+        if len(errors) == len(ollama_pool.urls):
+            raise RuntimeError(f"Could not load {model}: " + "; ".join(errors))
+
+
+_WARMERS: Dict[str, Callable[[], None]] = {
+    "transcription_model": _warm_transcription_model,
+    "soundfont": _warm_soundfont,
+    "ollama_model": _warm_ollama_model,
+}
+
+
+def warm_component(name: str):
+    """Warm a single component and record the outcome."""
+    warmup_state.update(name, status="warming")
+    start_time = time.time()
+    try:
+        _WARMERS[name]()
+    except Exception as e:
+        warmup_state.update(
+            name,
+            status="error",
+            error=str(e),
+            duration_seconds=round(time.time() - start_time, 3),
+        )
+    else:
+        warmup_state.update(
+            name,
+            status="ready",
+            error=None,
+            duration_seconds=round(time.time() - start_time, 3),
+        )
+
+
+def run_warmup(retry_interval: float = WARMUP_RETRY_INTERVAL):
+    """
+    Warm every component in turn. Blocking; run it off the event loop.
+
+    Components that fail (typically Ollama not being up yet) are retried
+    every ``retry_interval`` seconds until they succeed. A non-positive
+    interval disables retries.
+    """
+    warmup_state.started_at = time.time()
+    for name in COMPONENTS:
+        warm_component(name)
+
+    while retry_interval > 0:
+        failed = [
+            name for name, c in warmup_state.snapshot()["components"].items()
+            if c["status"] == "error"
+        ]
+        if not failed:
+            break
+        time.sleep(retry_interval)
+        for name in failed:
+            warm_component(name)
+
+
+def start_warmup() -> threading.Thread:
+    """Start warm-up in a daemon thread and return the thread."""
+    thread = threading.Thread(target=run_warmup, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def os_thread_count() -> int:
+    """Threads of this process, native ones included (Linux; else Python threads only)."""
+    try:
+        return len(os.listdir("/proc/self/task"))
+    except OSError:
+        return threading.active_count()
+
+
+def preload_shared(modules: List[str] = SHARED_MODULES) -> Dict[str, Any]:
+    """
+    Import ``modules`` and read the SoundFont into the page cache, in a
+    process about to fork workers. Missing modules are skipped.
+
+    Returns:
+        Which modules loaded, how long it took, and the process's thread
+        count afterwards (forking is only safe at 1)
+    """
+    start_time = time.time()
+    loaded, skipped = [], {}
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            skipped[name] = f"{type(e).__name__}: {e}"
+        else:
+            loaded.append(name)
+    try:
+        _warm_soundfont()
+    except OSError as e:
+        skipped["soundfont"] = str(e)
+    else:
+        loaded.append("soundfont")
+    return {
+        "loaded": loaded,
+        "skipped": skipped,
+        "duration_seconds": round(time.time() - start_time, 3),
+        "threads": os_thread_count(),
+    }
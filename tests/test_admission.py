@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from src.utils.admission import AdmissionController, AdmissionRejected
+
+
+def test_admits_up_to_workers_plus_queue():
+    controller = AdmissionController(max_concurrent=1, max_queued=1, max_cost=0)
+    controller.admit(10)
+    controller.admit(10)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit(10)
+    assert rejected.value.reason == "queue_full"
+    assert rejected.value.retry_after >= 1
+    with pytest.raises(AdmissionRejected):
+        controller.check_capacity()
+
+
+def test_cost_budget():
+    controller = AdmissionController(max_concurrent=4, max_queued=4, max_cost=100)
+    controller.admit(60)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit(50)
+    assert rejected.value.reason == "cost_budget"
+    controller.admit(40)
+
+
+def test_oversized_job_admitted_when_idle():
+    controller = AdmissionController(max_concurrent=1, max_queued=0, max_cost=100)
+    ticket = controller.admit(500)
+    assert ticket.cost == 500
+
+
+def test_finish_releases_capacity():
+    controller = AdmissionController(max_concurrent=1, max_queued=0, max_cost=0)
+    ticket = controller.admit(10)
+    controller.start(ticket)
+    assert controller.snapshot()["running"] == 1
+    controller.finish(ticket)
+    snapshot = controller.snapshot()
+    assert snapshot["running"] == 0 and snapshot["queued"] == 0 and snapshot["cost_in_flight"] == 0
+    controller.admit(10)
+
+
+def test_unstarted_ticket_can_be_finished():
+    controller = AdmissionController(max_concurrent=1, max_queued=1, max_cost=0)
+    ticket = controller.admit(10)
+    controller.finish(ticket)
+    assert controller.snapshot()["queued"] == 0
+
+
+def test_admit_when_idle_waits_for_a_worker():
+    controller = AdmissionController(max_concurrent=1, max_queued=4, max_cost=0)
+    busy = controller.admit(10)
+    tickets = []
+    thread = threading.Thread(target=lambda: tickets.append(controller.admit_when_idle(10)))
+    thread.start()
+    thread.join(0.1)
+    assert tickets == []
+    controller.finish(busy)
+    thread.join(5)
+    assert len(tickets) == 1 and tickets[0] is not None
+
+
+def test_admit_when_idle_gives_up_when_stopped():
+    controller = AdmissionController(max_concurrent=1, max_queued=0, max_cost=0)
+    controller.admit(10)
+    stop = threading.Event()
+    stop.set()
+    assert controller.admit_when_idle(10, stop) is None
@@ -0,0 +1,127 @@
+import struct
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from src.utils.audio_utils import get_audio_duration, load_audio, read_wav_frames, read_wav_info
+
+
+def chunk(chunk_id, body):
+    padding = b"\0" if len(body) % 2 else b""
+    return chunk_id + struct.pack("<I", len(body)) + body + padding
+
+
+def fmt_chunk(channels=1, sample_rate=8000, bits=16, format_tag=1, extensible_tag=None):
+    block_align = channels * bits // 8
+    body = struct.pack("<HHIIHH", format_tag, channels, sample_rate, sample_rate * block_align,
+                       block_align, bits)
+    if extensible_tag is not None:
+        # cbSize, valid bits, channel mask, then the SubFormat GUID
+        body += struct.pack("<HHI", 22, bits, 0) + struct.pack("<H", extensible_tag) + b"\0" * 14
+    return chunk(b"fmt ", body)
+
+
+def write_wav(path, chunks, riff_size=None):
+    body = b"WAVE" + b"".join(chunks)
+    size = len(body) if riff_size is None else riff_size
+    path.write_bytes(b"RIFF" + struct.pack("<I", size) + body)
+    return str(path)
+
+
+def pcm16(samples):
+    return np.asarray(samples, dtype="<i2").tobytes()
+
+
+def test_header_fields(tmp_path):
+    path = write_wav(tmp_path / "a.wav", [fmt_chunk(channels=2), chunk(b"data", pcm16(range(16)))])
+    info = read_wav_info(path)
+    assert info["sample_rate"] == 8000
+    assert info["channels"] == 2
+    assert info["sample_width"] == 2
+    assert info["format"] == "pcm"
+    assert info["n_frames"] == 8
+    assert info["duration"] == 8 / 8000
+    assert info["data_offset"] == 12 + 24 + 8
+
+
+def test_skips_unknown_chunks_including_odd_length_padding(tmp_path):
+    path = write_wav(tmp_path / "a.wav", [
+        chunk(b"LIST", b"abc"),  # odd length: followed by a pad byte
+        fmt_chunk(),
+        chunk(b"fact", b"\0" * 4),
+        chunk(b"data", pcm16([1, 2, 3])),
+    ])
+    info = read_wav_info(path)
+    assert info["n_frames"] == 3
+    assert read_wav_frames(path)[:, 0].tolist() == [1, 2, 3]
+
+
+def test_extensible_format_uses_the_subformat(tmp_path):
+    path = write_wav(tmp_path / "a.wav", [
+        fmt_chunk(bits=32, format_tag=0xFFFE, extensible_tag=3),
+        chunk(b"data", np.array([0.5, -0.5], dtype="<f4").tobytes()),
+    ])
+    assert read_wav_info(path)["format"] == "float"
+    assert read_wav_frames(path)[:, 0].tolist() == [0.5, -0.5]
+
+
+def test_unset_data_size_is_clamped_to_the_file(tmp_path):
+    data = chunk(b"data", pcm16(range(10)))
+    data = data[:4] + struct.pack("<I", 0xFFFFFFFF) + data[8:]
+    path = write_wav(tmp_path / "a.wav", [fmt_chunk(), data], riff_size=0xFFFFFFFF)
+    assert read_wav_info(path)["n_frames"] == 10
+
+
+@pytest.mark.parametrize("chunks", [
+    [],
+    [chunk(b"data", pcm16([1]))],
+    [fmt_chunk(format_tag=0x55), chunk(b"data", pcm16([1]))],
+])
+def test_malformed_headers_raise(tmp_path, chunks):
+    with pytest.raises(ValueError):
+        read_wav_info(write_wav(tmp_path / "a.wav", chunks))
+
+
+def test_not_a_wav(tmp_path):
+    path = tmp_path / "a.wav"
+    path.write_bytes(b"ID3" + b"\0" * 20)
+    with pytest.raises(ValueError):
+        read_wav_info(str(path))
+
+
+def test_frame_ranges_are_clamped(tmp_path):
+    path = write_wav(tmp_path / "a.wav", [fmt_chunk(), chunk(b"data", pcm16(range(10)))])
+    assert read_wav_frames(path, start_frame=7)[:, 0].tolist() == [7, 8, 9]
+    assert read_wav_frames(path, start_frame=2, num_frames=3)[:, 0].tolist() == [2, 3, 4]
+    assert read_wav_frames(path, start_frame=8, num_frames=5).shape == (2, 1)
+    assert read_wav_frames(path, start_frame=20).shape == (0, 1)
+
+
+def test_load_audio_window_is_float_mono(tmp_path):
+    stereo = pcm16([16384, -16384] * 8000)
+    path = write_wav(tmp_path / "a.wav", [fmt_chunk(channels=2), chunk(b"data", stereo)])
+    y, sr, duration = load_audio(path, offset=0.25, duration=0.5)
+    assert sr == 8000
+    assert duration == 0.5
+    assert y.dtype == np.float32
+    assert np.allclose(y, 0.0)
+    assert get_audio_duration(path) == 1.0
+
+
+def test_24_bit_pcm_falls_back_to_librosa(tmp_path, monkeypatch):
+    path = write_wav(tmp_path / "a.wav", [fmt_chunk(bits=24), chunk(b"data", b"\0" * 9)])
+    with pytest.raises(ValueError):
+        read_wav_frames(path)
+
+    calls = []
+
+    def load(filepath, sr, offset, duration):
+        calls.append(filepath)
+        return np.zeros(3, dtype=np.float32), 8000
+
+    monkeypatch.setitem(sys.modules, "librosa", types.SimpleNamespace(load=load))
+    y, sr, _ = load_audio(path)
+    assert calls == [path]
+    assert len(y) == 3 and sr == 8000
@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.agents import batch as batch_module
+from src.agents.batch import BatchItem, BatchManager
+from src.utils.artifact_store import ArtifactStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ArtifactStore(root=str(tmp_path), max_bytes=3000)
+    monkeypatch.setattr(batch_module, "artifact_store", store)
+    return store
+
+
+def uploads(store, count):
+    return [store.put_bytes(bytes([i]) * 1000, "upload", filename=f"{i}.mid")["id"] for i in range(count)]
+
+
+def items_for(upload_ids):
+    return [BatchItem(i, f"{i}.mid", "transpose up", "midi", upload_id)
+            for i, upload_id in enumerate(upload_ids)]
+
+
+def test_unpinned_uploads_are_evicted(store):
+    upload_ids = uploads(store, 5)
+    store.gc()
+    assert sum(store.get(upload_id) is not None for upload_id in upload_ids) == 3
+
+
+def test_uploads_of_unfinished_batches_are_pinned(store, monkeypatch):
+    manager = BatchManager(ThreadPoolExecutor(max_workers=1))
+    # Keep the batch waiting, as if no worker were free yet
+    monkeypatch.setattr(manager, "_feed", lambda batch: None)
+    upload_ids = uploads(store, 5)
+    batch = manager.submit(items_for(upload_ids))
+
+    store.gc()
+    assert all(store.get(upload_id) is not None for upload_id in upload_ids)
+
+    batch.done.set()
+    store.gc()
+    assert sum(store.get(upload_id) is not None for upload_id in upload_ids) == 3
+
+
+def test_outputs_of_unfinished_batches_are_pinned(store, monkeypatch):
+    manager = BatchManager(ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(manager, "_feed", lambda batch: None)
+    upload_id = uploads(store, 1)[0]
+    batch = manager.submit(items_for([upload_id]))
+    output_id = store.put_bytes(b"o" * 1000, "output")["id"]
+    batch.items[0].result = {"artifacts": {"upload": upload_id, "output": output_id}}
+
+    assert set(manager.active_artifacts()) == {upload_id, output_id}
+
+
+def test_expired_upload_fails_its_items_clearly(store):
+    manager = BatchManager(ThreadPoolExecutor(max_workers=1))
+    upload_id = uploads(store, 1)[0]
+    store.delete(upload_id)
+    batch = batch_module.Batch(items_for([upload_id, upload_id]))
+
+    manager._feed(batch)
+
+    assert batch.done.is_set()
+    assert [item.status for item in batch.items] == ["failed", "failed"]
+    assert all("Upload expired" in item.error for item in batch.items)
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from src.clients.hedging import race
+from src.clients.transport import LLMTimeout
+
+
+def answer_after(seconds, value, seen=None):
+    def request(cancelled):
+        if seen is not None:
+            seen.append(cancelled)
+        cancelled.wait(seconds)
+        return value
+    return request
+
+
+def fail(cancelled):
+    raise RuntimeError("down")
+
+
+def test_fast_primary_wins_without_a_hedge():
+    hedged = []
+    answer, winner = race(answer_after(0, "a"), hedge=answer_after(0, "b", hedged), hedge_after=1.0)
+    assert (answer, winner) == ("a", "primary")
+    assert hedged == []
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    seen = []
+    answer, winner = race(answer_after(2, "a", seen), hedge=answer_after(0, "b"), hedge_after=0.05)
+    assert (answer, winner) == ("b", "hedge")
+    assert seen[0].is_set()
+
+
+def test_failed_primary_hedges_right_away():
+    start = time.time()
+    answer, winner = race(fail, hedge=answer_after(0, "b"), hedge_after=5.0)
+    assert (answer, winner) == ("b", "hedge")
+    assert time.time() - start < 1.0
+
+
+def test_invalid_answer_loses_to_a_valid_one():
+    def validate(answer):
+        if answer != "good":
+            raise ValueError(answer)
+
+    answer, winner = race(answer_after(0, "bad"), hedge=answer_after(0.05, "good"), hedge_after=0,
+                          validate=validate)
+    assert (answer, winner) == ("good", "hedge")
+
+
+def test_primary_answer_returned_when_nothing_is_valid():
+    def validate(answer):
+        raise ValueError(answer)
+
+    answer, winner = race(answer_after(0, "a"), hedge=answer_after(0, "b"), hedge_after=0,
+                          validate=validate)
+    assert (answer, winner) == ("a", "primary")
+
+
+def test_primary_error_raised_when_everything_fails():
+    def other(cancelled):
+        raise KeyError("hedge")
+
+    with pytest.raises(RuntimeError):
+        race(fail, hedge=other, hedge_after=0)
+
+
+def test_deadline_raises_and_cancels():
+    seen = []
+    with pytest.raises(LLMTimeout):
+        race(answer_after(5, "a", seen), deadline=time.time() + 0.05)
+    assert seen[0].is_set()
+
+
+def test_request_runs_in_the_callers_context():
+    import contextvars
+
+    var = contextvars.ContextVar("var", default=None)
+    var.set("job-1")
+    answer, _ = race(lambda cancelled: (var.get(), threading.current_thread().name))
+    assert answer[0] == "job-1"
+    assert answer[1].startswith("llm")
@@ -0,0 +1,37 @@
+import pytest
+
+from src.utils.http_files import parse_range
+
+
+def test_closed_range():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+
+
+def test_open_ended_range_runs_to_the_end():
+    assert parse_range("bytes=500-", 1000) == (500, 999)
+
+
+def test_end_past_the_file_is_clamped():
+    assert parse_range("bytes=900-5000", 1000) == (900, 999)
+
+
+def test_suffix_range():
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=-5000", 1000) == (0, 999)
+
+
+@pytest.mark.parametrize("header", ["bytes=-", "items=0-10", "bytes=0-10,20-30", "garbage"])
+def test_unsupported_ranges_fall_through(header):
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=50-10", "bytes=-0"])
+def test_unsatisfiable_ranges_raise(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1000)
+
+
+@pytest.mark.parametrize("header", ["bytes=0-", "bytes=-100", "bytes=0-0", "bytes=0-1,2-3"])
+def test_any_range_of_an_empty_file_is_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 0)
@@ -0,0 +1,76 @@
+from src.utils.note_reduction import reduce_notes
+
+
+def note(start, end, pitch=60, velocity=80, **fields):
+    return {"pitch": pitch, "start": start, "end": end, "velocity": velocity, **fields}
+
+
+def spans(notes):
+    return [(n["pitch"], n["start"], n["end"]) for n in notes]
+
+
+def test_repeated_notes_stay_separate():
+    notes = [note(0.0, 0.5), note(0.5, 1.0), note(1.0, 1.5)]
+    reduced, stats = reduce_notes(notes)
+    assert spans(reduced) == [(60, 0.0, 0.5), (60, 0.5, 1.0), (60, 1.0, 1.5)]
+    assert stats["merged"] == 0 and stats["duplicate"] == 0
+
+
+def test_touching_notes_after_quantizing_stay_separate():
+    notes = [note(0.0, 0.49), note(0.51, 1.0)]
+    reduced, stats = reduce_notes(notes, quantize_grid=0.125)
+    assert spans(reduced) == [(60, 0.0, 0.5), (60, 0.5, 1.0)]
+    assert stats["merged"] == 0
+
+
+def test_overlapping_notes_merge_with_loudest_velocity():
+    notes = [note(0.0, 0.6, velocity=50), note(0.5, 1.0, velocity=90), note(0.9, 1.2, velocity=70)]
+    reduced, stats = reduce_notes(notes)
+    assert spans(reduced) == [(60, 0.0, 1.2)]
+    assert reduced[0]["velocity"] == 90
+    assert stats["merged"] == 2
+
+
+def test_duplicate_onsets_in_one_bucket_merge():
+    notes = [note(0.100, 0.11), note(0.110, 0.3)]
+    reduced, stats = reduce_notes(notes, min_duration=0, onset_window=0.03)
+    assert spans(reduced) == [(60, 0.1, 0.3)]
+    assert stats["duplicate"] == 1
+
+
+def test_onsets_in_different_buckets_stay_separate():
+    # 0.119 and 0.121 are close, but on either side of the 0.12 bucket edge
+    notes = [note(0.119, 0.12), note(0.121, 0.3)]
+    reduced, stats = reduce_notes(notes, min_duration=0, onset_window=0.03)
+    assert len(reduced) == 2
+    assert stats["duplicate"] == 0
+
+
+def test_zero_onset_window_merges_no_duplicates():
+    notes = [note(0.1, 0.2), note(0.2, 0.3)]
+    reduced, _ = reduce_notes(notes, onset_window=0)
+    assert len(reduced) == 2
+
+
+def test_other_pitches_and_tracks_are_not_merged():
+    notes = [
+        note(0.0, 1.0, pitch=60, track=0, program=0, is_drum=False),
+        note(0.5, 1.5, pitch=62, track=0, program=0, is_drum=False),
+        note(0.5, 1.5, pitch=60, track=1, program=33, is_drum=False),
+    ]
+    reduced, stats = reduce_notes(notes)
+    assert len(reduced) == 3
+    assert stats["merged"] == 0
+    assert {n["track"] for n in reduced} == {0, 1}
+    assert [n["program"] for n in reduced if n["track"] == 1] == [33]
+
+
+def test_short_and_quiet_notes_are_dropped():
+    notes = [note(0.0, 0.01), note(1.0, 2.0, velocity=3), note(2.0, 3.0)]
+    reduced, stats = reduce_notes(notes, min_duration=0.03, min_velocity=10)
+    assert spans(reduced) == [(60, 2.0, 3.0)]
+    assert stats == {"before": 3, "after": 1, "short": 1, "quiet": 1, "merged": 0, "duplicate": 0}
+
+
+def test_empty_input():
+    assert reduce_notes([]) == ([], {"before": 0, "after": 0, "short": 0, "quiet": 0, "merged": 0, "duplicate": 0})
@@ -0,0 +1,49 @@
+import contextvars
+import threading
+import time
+
+from src.utils import profiler
+from src.utils.profiler import ProfileSession
+
+
+def busy(seconds):
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+
+
+def run_stage(name, seconds):
+    with profiler.stage(name):
+        busy(seconds)
+
+
+def test_next_job_profile_samples_only_that_jobs_threads():
+    session = ProfileSession()
+    handle = session.arm_next_job(interval=0.005)
+
+    def other_job():
+        # A job already running when the profile was armed
+        run_stage("other", 0.3)
+
+    other = threading.Thread(target=other_job)
+    other.start()
+
+    with session.job():
+        # Stages of the profiled job run on worker threads with a copied context
+        context = contextvars.copy_context()
+        worker = threading.Thread(target=context.run, args=(run_stage, "mine", 0.2))
+        worker.start()
+        worker.join()
+    other.join()
+
+    stages = {stack[0][0] for stack in handle["profiler"].samples}
+    assert "[stage:mine]" in stages
+    assert "[stage:other]" not in stages
+    assert handle["done"].is_set()
+
+
+def test_jobs_run_without_an_armed_profile():
+    session = ProfileSession()
+    with session.job():
+        run_stage("plain", 0)
+    assert profiler._thread_stages == {}
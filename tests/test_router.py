@@ -0,0 +1,50 @@
+import pytest
+
+from src.clients.router import classify_goal, parse_models
+
+
+@pytest.mark.parametrize("goal, category", [
+    ("Reharmonize in Dorian mode", "harmonic"),
+    ("add some swing", "rhythmic"),
+    ("transpose up a step", "simple"),
+    ("make it sound happier", "general"),
+])
+def test_classify_goal(goal, category):
+    assert classify_goal(goal)[0] == category
+
+
+def test_most_demanding_category_wins():
+    assert classify_goal("transpose up and change the chords") == ("harmonic", 2.0)
+
+
+@pytest.mark.parametrize("goal", [
+    "update the ending",
+    "make it uplifting",
+    "accent the downbeat",
+    "a more modern feel",
+    "play moderately",
+    "better for keyboard",
+    "stepwise melody",
+])
+def test_keywords_match_whole_words(goal):
+    assert classify_goal(goal)[0] == "general"
+
+
+@pytest.mark.parametrize("goal, category", [
+    ("reharmonize the bridge", "harmonic"),
+    ("richer chords", "harmonic"),
+    ("change the key", "harmonic"),
+    ("syncopated bass", "rhythmic"),
+    ("transposed by two semitones", "simple"),
+])
+def test_stems_match_word_forms(goal, category):
+    assert classify_goal(goal)[0] == category
+
+
+def test_parse_models_last_is_unbounded():
+    models = parse_models("small=1000, large=8000")
+    assert models == [{"name": "small", "max_tokens": 1000}, {"name": "large", "max_tokens": None}]
+
+
+def test_parse_models_falls_back_to_default():
+    assert parse_models("", default_model="m") == [{"name": "m", "max_tokens": None}]
@@ -0,0 +1,80 @@
+import threading
+import time
+
+from src.clients.serving import FairSlots, LLMServingManager
+
+
+def test_acquire_within_the_limit():
+    slots = FairSlots(2)
+    assert slots.acquire("a")
+    assert slots.acquire("a")
+    assert not slots.acquire("a", timeout=0.05)
+    slots.release()
+    assert slots.acquire("a", timeout=0.05)
+    assert slots.snapshot() == {"limit": 2, "in_flight": 2, "waiting": 0}
+
+
+def test_waiters_take_turns_between_owners():
+    slots = FairSlots(1)
+    slots.acquire("holder")
+    order = []
+
+    def wait(owner, label):
+        slots.acquire(owner)
+        order.append(label)
+        slots.release()
+
+    threads = []
+    # Job "a" fans out three calls before job "b" asks for one
+    for owner, label in (("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")):
+        thread = threading.Thread(target=wait, args=(owner, label))
+        thread.start()
+        threads.append(thread)
+        while slots.snapshot()["waiting"] < len(threads):
+            time.sleep(0.01)
+    slots.release()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["a1", "b1", "a2", "a3"]
+
+
+def test_cancelled_wait_returns_false_and_withdraws():
+    slots = FairSlots(1)
+    slots.acquire("holder")
+    cancelled = threading.Event()
+    result = []
+    thread = threading.Thread(target=lambda: result.append(slots.acquire("a", cancelled=cancelled)))
+    thread.start()
+    while slots.snapshot()["waiting"] < 1:
+        time.sleep(0.01)
+    cancelled.set()
+    thread.join(5)
+
+    assert result == [False]
+    assert slots.snapshot()["waiting"] == 0
+
+
+def test_timed_out_waiter_does_not_block_the_next():
+    slots = FairSlots(1)
+    slots.acquire("holder")
+    assert not slots.acquire("a", timeout=0.05)
+    slots.release()
+    assert slots.acquire("b", timeout=0.05)
+
+
+def test_per_host_cap_is_split_between_workers():
+    assert LLMServingManager(max_parallel=4, workers=2).max_parallel == 2
+    assert LLMServingManager(max_parallel=1, workers=4).max_parallel == 1
+
+
+def test_num_ctx_grows_in_powers_of_two_and_is_reused():
+    manager = LLMServingManager(num_ctx_min=1024, num_ctx_max=8192)
+    assert manager.num_ctx("h", "m", 600) == 2048
+    assert manager.num_ctx("h", "m", 100) == 2048
+    assert manager.num_ctx("h", "m", 100000) == 8192
+
+
+def test_num_ctx_with_a_non_positive_minimum_terminates():
+    manager = LLMServingManager(num_ctx_min=0, num_ctx_max=8192)
+    assert manager.num_ctx("h", "m", 600) == 2048
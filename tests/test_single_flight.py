@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_run_once():
+    flight = SingleFlight("test", enabled=True)
+    calls = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return {"value": 1}
+
+    results = []
+
+    def call():
+        results.append(flight.do("key", work))
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for t in threads:
+        t.start()
+    while flight._calls and flight._calls["key"].waiters < 3:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert all(result == {"value": 1} for result, _ in results)
+    assert flight.in_flight() == 0
+
+
+def test_waiters_get_copies():
+    flight = SingleFlight("test", enabled=True)
+    started = threading.Event()
+    release = threading.Event()
+
+    def work():
+        started.set()
+        release.wait(5)
+        return {"notes": []}
+
+    leader = []
+    thread = threading.Thread(target=lambda: leader.append(flight.do("key", work)))
+    thread.start()
+    started.wait(5)
+    waiter = []
+    joiner = threading.Thread(target=lambda: waiter.append(flight.do("key", work)))
+    joiner.start()
+    while flight._calls["key"].waiters < 1:
+        time.sleep(0.01)
+    release.set()
+    thread.join(5)
+    joiner.join(5)
+
+    waiter[0][0]["notes"].append(1)
+    assert leader[0][0] == {"notes": []}
+
+
+def test_errors_reach_every_caller_and_free_the_key():
+    flight = SingleFlight("test", enabled=True)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: 2) == (2, False)
+
+
+def test_disabled_runs_every_call():
+    flight = SingleFlight("test", enabled=False)
+    assert flight.do("key", lambda: 1) == (1, False)
+    assert flight.in_flight() == 0
+
+
+def test_async_calls_run_once_and_call_on_join():
+    flight = SingleFlight("test", enabled=True)
+    calls = []
+    joined = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [1, 2]
+
+    async def main():
+        return await asyncio.gather(
+            flight.do_async("key", work),
+            flight.do_async("key", work, on_join=lambda: joined.append(1)),
+        )
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert results == [([1, 2], False), ([1, 2], True)]
+    assert joined == [1]
+    assert flight.in_flight() == 0
+
+
+def test_async_leader_cancellation_does_not_cancel_the_work():
+    flight = SingleFlight("test", enabled=True)
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("key", work))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do_async("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await waiter
+
+    assert asyncio.run(main()) == ("done", True)
@@ -278,22 +278,23 @@ export default function App() {
     setProcessingStep("Uploading audio...");
 
     try {
-      setProcessingStep("Transcribing to MIDI...");
-      await new Promise(r => setTimeout(r, 500));
-      
-      setProcessingStep("Analyzing with AI...");
-      const resp = await fetch(`${API_URL}/process-wav/`, {
+      // Submit without waiting for the pipeline, then follow its progress events
+      const resp = await fetch(`${API_URL}/jobs/`, {
         method: "POST",
         body: formData,
       });
 
+      if (resp.status === 429) {
+        const retryAfter = resp.headers.get("Retry-After");
+        throw new Error(`Server is busy, try again in ${retryAfter || "a few"} seconds`);
+      }
       if (!resp.ok) throw new Error("Processing failed");
 
-      setProcessingStep("Generating new audio...");
-      const data = await resp.json();
-      const filename = data.filename;
+      const job = await resp.json();
+      const result = await followJob(job.events_url, job.status_url);
 
-      const audioResp = await fetch(`${API_URL}/download/${filename}`);
+      setProcessingStep("Generating new audio... downloading");
+      const audioResp = await fetch(`${API_URL}${result.download_url}`);
       const blob = await audioResp.blob();
       const url = URL.createObjectURL(blob);
 
@@ -308,6 +309,66 @@ export default function App() {
     }
   };
 
+  // Poll the job's status until it finishes, for when its event stream fails
+  const pollJob = async (statusUrl) => {
+    for (;;) {
+      const resp = await fetch(`${API_URL}${statusUrl}`);
+      if (!resp.ok) throw new Error("Job status unavailable");
+      const job = await resp.json();
+      if (job.status === "completed") return job.result;
+      if (job.status === "failed") throw new Error(job.error);
+      await new Promise((r) => setTimeout(r, 2000));
+    }
+  };
+
+  // Resolve with the job's result once its event stream reports it,
+  // updating the progress text as stage events arrive
+  const followJob = (eventsUrl, statusUrl) =>
+    new Promise((resolve, reject) => {
+      const source = new EventSource(`${API_URL}${eventsUrl}`);
+      const stageLabels = {
+        transcription: "Transcribing to MIDI...",
+        midi_to_json: "Transcribing to MIDI...",
+        llm: "Analyzing with AI...",
+        parse: "Analyzing with AI...",
+        render: "Generating new audio...",
+      };
+
+      source.addEventListener("queued", () => setProcessingStep("Uploading audio... queued"));
+      source.addEventListener("stage", (e) => {
+        const event = JSON.parse(e.data);
+        if (event.status === "started" && stageLabels[event.stage]) {
+          setProcessingStep(stageLabels[event.stage]);
+        }
+      });
+      source.addEventListener("progress", (e) => {
+        const event = JSON.parse(e.data);
+        if (stageLabels[event.stage]) {
+          setProcessingStep(`${stageLabels[event.stage]} ${Math.round(event.percent)}%`);
+        }
+      });
+      source.addEventListener("llm_tokens", (e) => {
+        const event = JSON.parse(e.data);
+        setProcessingStep(`Analyzing with AI... ${event.tokens} tokens`);
+      });
+      source.addEventListener("result", (e) => {
+        source.close();
+        resolve(JSON.parse(e.data));
+      });
+      source.addEventListener("error", (e) => {
+        // Server-sent "error" events carry data; connection errors do not
+        // and are retried by EventSource itself, unless it gave up (an
+        // error response such as 404): then poll the job's status instead
+        if (e.data) {
+          source.close();
+          reject(new Error(JSON.parse(e.data).error));
+        } else if (source.readyState === EventSource.CLOSED) {
+          setProcessingStep("Waiting for the result...");
+          pollJob(statusUrl).then(resolve, reject);
+        }
+      });
+    });
+
   const reuseOutputAsInput = () => {
     if (!outputBlob) return;
     const newFile = new File([outputBlob], "transformed_audio.wav", { type: "audio/wav" });